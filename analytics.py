@@ -0,0 +1,431 @@
+"""Daily rollup tables for revenue and client growth, maintained incrementally.
+
+Usage:
+    python analytics.py rebuild    # create the tables and triggers, recompute every rollup row
+    python analytics.py catch-up   # recompute the days recorded in the change log
+"""
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from mysql.connector import Error, errorcode
+from config import Config
+from utils import get_db_connection
+
+ROLLUP_TABLES_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS analytics_daily_revenue (
+        day DATE NOT NULL,
+        payment_status VARCHAR(32) NOT NULL,
+        form_type VARCHAR(64) NOT NULL,
+        total_amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+        payment_count INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, payment_status, form_type)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS analytics_daily_new_clients (
+        day DATE NOT NULL PRIMARY KEY,
+        new_clients INT NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS analytics_change_log (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        rollup VARCHAR(32) NOT NULL,
+        day DATE NOT NULL
+    )
+    """,
+]
+
+# Triggers recording every day whose rollup rows a source change affects. Updates and
+# deletes record the row's previous day as well, so a payment whose date moves is
+# removed from the old day's totals.
+ROLLUP_TRIGGERS = {
+    'analytics_form_payments_insert': """
+        CREATE TRIGGER analytics_form_payments_insert AFTER INSERT ON form_payments FOR EACH ROW
+        INSERT INTO analytics_change_log (rollup, day)
+        SELECT 'revenue', DATE(NEW.payment_date) FROM DUAL WHERE NEW.payment_date IS NOT NULL
+    """,
+    'analytics_form_payments_update': """
+        CREATE TRIGGER analytics_form_payments_update AFTER UPDATE ON form_payments FOR EACH ROW
+        INSERT INTO analytics_change_log (rollup, day)
+        SELECT 'revenue', changed.day FROM (
+            SELECT DATE(OLD.payment_date) AS day
+            UNION
+            SELECT DATE(NEW.payment_date)
+        ) changed
+        WHERE changed.day IS NOT NULL
+          AND NOT (OLD.payment_date <=> NEW.payment_date AND OLD.amount <=> NEW.amount
+                   AND OLD.payment_status <=> NEW.payment_status AND OLD.form_id <=> NEW.form_id)
+    """,
+    'analytics_form_payments_delete': """
+        CREATE TRIGGER analytics_form_payments_delete AFTER DELETE ON form_payments FOR EACH ROW
+        INSERT INTO analytics_change_log (rollup, day)
+        SELECT 'revenue', DATE(OLD.payment_date) FROM DUAL WHERE OLD.payment_date IS NOT NULL
+    """,
+    # A form's type is a revenue dimension: re-bucket the days of its payments
+    'analytics_tax_forms_update': """
+        CREATE TRIGGER analytics_tax_forms_update AFTER UPDATE ON tax_forms FOR EACH ROW
+        INSERT INTO analytics_change_log (rollup, day)
+        SELECT DISTINCT 'revenue', DATE(payment_date) FROM form_payments
+        WHERE form_id = NEW.id AND payment_date IS NOT NULL AND NOT (OLD.form_type <=> NEW.form_type)
+    """,
+    'analytics_tax_forms_delete': """
+        CREATE TRIGGER analytics_tax_forms_delete AFTER DELETE ON tax_forms FOR EACH ROW
+        INSERT INTO analytics_change_log (rollup, day)
+        SELECT DISTINCT 'revenue', DATE(payment_date) FROM form_payments
+        WHERE form_id = OLD.id AND payment_date IS NOT NULL
+    """,
+    'analytics_users_insert': """
+        CREATE TRIGGER analytics_users_insert AFTER INSERT ON users FOR EACH ROW
+        INSERT INTO analytics_change_log (rollup, day)
+        SELECT 'client_growth', DATE(NEW.created_at) FROM DUAL WHERE NEW.created_at IS NOT NULL
+    """,
+    'analytics_users_update': """
+        CREATE TRIGGER analytics_users_update AFTER UPDATE ON users FOR EACH ROW
+        INSERT INTO analytics_change_log (rollup, day)
+        SELECT 'client_growth', changed.day FROM (
+            SELECT DATE(OLD.created_at) AS day
+            UNION
+            SELECT DATE(NEW.created_at)
+        ) changed
+        WHERE changed.day IS NOT NULL
+          AND NOT (OLD.created_at <=> NEW.created_at AND OLD.role <=> NEW.role)
+    """,
+    'analytics_users_delete': """
+        CREATE TRIGGER analytics_users_delete AFTER DELETE ON users FOR EACH ROW
+        INSERT INTO analytics_change_log (rollup, day)
+        SELECT 'client_growth', DATE(OLD.created_at) FROM DUAL WHERE OLD.created_at IS NOT NULL
+    """,
+}
+
+# Change log rows folded into the rollups per transaction
+CHANGE_LOG_BATCH_SIZE = 1000
+
+# Each rollup's rows for a half-open date range, aggregated from the raw tables. Used to
+# recompute days, and read directly while the rollup table doesn't exist yet.
+ROLLUPS = {
+    'revenue': {
+        'table': 'analytics_daily_revenue',
+        'columns': '(day, payment_status, form_type, total_amount, payment_count)',
+        'source': """
+            SELECT DATE(fp.payment_date) AS day, fp.payment_status AS payment_status,
+                COALESCE(tf.form_type, 'unknown') AS form_type, SUM(fp.amount) AS total_amount,
+                COUNT(*) AS payment_count
+            FROM form_payments fp
+            LEFT JOIN tax_forms tf ON fp.form_id = tf.id
+            WHERE fp.payment_date >= %s AND fp.payment_date < %s
+            GROUP BY DATE(fp.payment_date), fp.payment_status, COALESCE(tf.form_type, 'unknown')
+        """,
+    },
+    'client_growth': {
+        'table': 'analytics_daily_new_clients',
+        'columns': '(day, new_clients)',
+        'source': """
+            SELECT DATE(created_at) AS day, COUNT(*) AS new_clients
+            FROM users
+            WHERE role = 'client' AND created_at >= %s AND created_at < %s
+            GROUP BY DATE(created_at)
+        """,
+    },
+}
+
+# Expressions mapping a rollup `day` to the start of its period
+PERIOD_EXPRESSIONS = {
+    'day': "day",
+    'week': "day - INTERVAL WEEKDAY(day) DAY",
+    'month': "day - INTERVAL (DAYOFMONTH(day) - 1) DAY",
+    'year': "MAKEDATE(YEAR(day), 1)",
+}
+
+REVENUE_DIMENSIONS = ['payment_status', 'form_type']
+
+# Named MySQL lock so only one worker process runs a catch-up at a time
+CATCH_UP_LOCK = 'analytics_rollup_catch_up'
+
+
+def _day_range(day):
+    return day, day + timedelta(days=1)
+
+
+def _recompute_statement(rollup):
+    return f"INSERT INTO {rollup['table']} {rollup['columns']} {rollup['source']}"
+
+
+def _recompute_days(cursor, rollup, days):
+    table = rollup['table']
+    for day in days:
+        cursor.execute(f"DELETE FROM {table} WHERE day = %s", (day,))
+        cursor.execute(_recompute_statement(rollup), _day_range(day))
+
+
+def _select_rollup(cursor, name, query, params, date_from, date_to):
+    """Run `query` with {source} as a rollup table, or the raw tables if it doesn't exist yet
+
+    `date_from` / `date_to` (inclusive) bound the raw aggregation; the query's own day
+    filter still applies on top of it.
+    """
+    rollup = ROLLUPS[name]
+    try:
+        cursor.execute(query.format(source=rollup['table']), params)
+    except Error as e:
+        if e.errno != errorcode.ER_NO_SUCH_TABLE:
+            raise
+        print(f"{rollup['table']} doesn't exist yet (run `python analytics.py rebuild`); aggregating the raw rows")
+        source = f"({rollup['source']}) AS {rollup['table']}"
+        cursor.execute(query.format(source=source), (date_from, date_to + timedelta(days=1), *params))
+    return cursor.fetchall()
+
+
+def create_rollup_objects(cursor):
+    """Create the rollup tables and (re)install the change log triggers; deploy-time DDL"""
+    for ddl in ROLLUP_TABLES_DDL:
+        cursor.execute(ddl)
+    for name, ddl in ROLLUP_TRIGGERS.items():
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute(ddl)
+
+
+def rebuild_rollups():
+    """Create the rollup tables and triggers, then recompute every rollup row from the raw tables"""
+    conn = get_db_connection()
+    if not conn:
+        raise Error(msg="No database connection available")
+    cursor = conn.cursor()
+    try:
+        create_rollup_objects(cursor)
+        # Changes committed after this point are logged again and folded in by the next catch-up
+        cursor.execute("DELETE FROM analytics_change_log")
+        conn.commit()
+        for rollup in ROLLUPS.values():
+            table = rollup['table']
+            cursor.execute(f"DELETE FROM {table}")
+            # The per-day statement's date filter is widened to cover every row
+            cursor.execute(_recompute_statement(rollup), (date(1000, 1, 1), date(9999, 12, 31)))
+            conn.commit()
+            print(f"Rebuilt {table}")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def catch_up_rollups():
+    """Recompute the days recorded in the change log and remove the processed entries
+
+    The triggers log both the previous and the new day of every inserted, updated or
+    deleted source row, so moved and deleted payments or clients and form type changes
+    are all reflected. Only log rows read by this run are deleted; entries committed
+    meanwhile stay for the next run. Issues no DDL: the tables and triggers are
+    created by rebuild_rollups().
+
+    Returns:
+        dict: Number of recomputed days per rollup, or None if another process holds the lock.
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise Error(msg="No database connection available")
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (CATCH_UP_LOCK,))
+        if not cursor.fetchone()[0]:
+            return None
+        try:
+            recomputed = dict.fromkeys(ROLLUPS, 0)
+            while True:
+                cursor.execute(
+                    "SELECT id, rollup, day FROM analytics_change_log ORDER BY id LIMIT %s",
+                    (CHANGE_LOG_BATCH_SIZE,)
+                )
+                entries = cursor.fetchall()
+                if not entries:
+                    break
+                for name, rollup in ROLLUPS.items():
+                    days = sorted({day for _, entry_rollup, day in entries if entry_rollup == name})
+                    _recompute_days(cursor, rollup, days)
+                    recomputed[name] += len(days)
+                ids = [entry[0] for entry in entries]
+                placeholders = ', '.join(['%s'] * len(ids))
+                cursor.execute(f"DELETE FROM analytics_change_log WHERE id IN ({placeholders})", tuple(ids))
+                conn.commit()
+                if len(entries) < CHANGE_LOG_BATCH_SIZE:
+                    break
+            return recomputed
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (CATCH_UP_LOCK,))
+            cursor.fetchall()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+class RollupRefresher:
+    """Runs catch_up_rollups() on a daemon thread every `interval` seconds
+
+    Analytics reads and dashboard refreshes only call start(), so no request waits for
+    a catch-up. Across worker processes the named lock lets one of them do the work.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self.last_error = None
+
+    def start(self):
+        """Start the background catch-up thread if it isn't running yet"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='analytics-rollups', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                catch_up_rollups()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                if isinstance(e, Error) and e.errno == errorcode.ER_NO_SUCH_TABLE:
+                    print("Analytics rollup tables don't exist yet; run `python analytics.py rebuild`")
+                else:
+                    print(f"Error catching up analytics rollups: {e}")
+            time.sleep(self.interval)
+
+
+rollup_refresher = RollupRefresher(Config.ANALYTICS_CATCH_UP_INTERVAL)
+
+
+def parse_group_by(group_by, dimensions):
+    """Split a `group_by` value like 'month,payment_status' into (period, [dimensions])
+
+    Raises:
+        ValueError: On an unknown period or dimension.
+    """
+    period = 'day'
+    selected = []
+    for part in filter(None, (group_by or '').split(',')):
+        part = part.strip()
+        if part in PERIOD_EXPRESSIONS:
+            period = part
+        elif part in dimensions:
+            selected.append(part)
+        else:
+            raise ValueError(f"Unsupported group_by value: {part}")
+    return period, selected
+
+
+def get_revenue_rollup(date_from, date_to, group_by='day', payment_status=None):
+    """Revenue totals per period (and optionally per payment_status / form_type) between two dates
+
+    Args:
+        date_from (date): First day included.
+        date_to (date): Last day included.
+        group_by (str): Comma-separated period (day, week, month, year) and dimensions.
+        payment_status (str): Only include payments with this status.
+
+    Returns:
+        list: Rows of {'period', <dimensions>, 'revenue', 'payments'}, or None on error.
+
+    Raises:
+        ValueError: If group_by is invalid.
+    """
+    period, dimensions = parse_group_by(group_by, REVENUE_DIMENSIONS)
+    rollup_refresher.start()
+    select_columns = [f"{PERIOD_EXPRESSIONS[period]} AS period"] + dimensions
+    query = f"""
+        SELECT {', '.join(select_columns)}, SUM(total_amount) AS revenue, SUM(payment_count) AS payments
+        FROM {{source}}
+        WHERE day >= %s AND day <= %s
+    """
+    params = [date_from, date_to]
+    if payment_status:
+        query += " AND payment_status = %s"
+        params.append(payment_status)
+    group_columns = ['period'] + dimensions
+    query += f" GROUP BY {', '.join(group_columns)} ORDER BY {', '.join(group_columns)}"
+    conn = None
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return None
+        cursor = conn.cursor(dictionary=True)
+        rows = _select_rollup(cursor, 'revenue', query, tuple(params), date_from, date_to)
+        cursor.close()
+        for row in rows:
+            row['period'] = row['period'].isoformat()
+            row['revenue'] = float(row['revenue'] or 0)
+            row['payments'] = int(row['payments'] or 0)
+        return rows
+    except Error as e:
+        print(f"Error fetching revenue rollup: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+
+def get_client_growth_rollup(date_from, date_to, group_by='month'):
+    """New client counts per period between two dates (inclusive)
+
+    Returns:
+        list: Rows of {'period', 'new_clients'}, or None on error.
+
+    Raises:
+        ValueError: If group_by is invalid.
+    """
+    period, _ = parse_group_by(group_by, [])
+    rollup_refresher.start()
+    query = f"""
+        SELECT {PERIOD_EXPRESSIONS[period]} AS period, SUM(new_clients) AS new_clients
+        FROM {{source}}
+        WHERE day >= %s AND day <= %s
+        GROUP BY period
+        ORDER BY period
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return None
+        cursor = conn.cursor(dictionary=True)
+        rows = _select_rollup(cursor, 'client_growth', query, (date_from, date_to), date_from, date_to)
+        cursor.close()
+        for row in rows:
+            row['period'] = row['period'].isoformat()
+            row['new_clients'] = int(row['new_clients'] or 0)
+        return rows
+    except Error as e:
+        print(f"Error fetching client growth rollup: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else None
+    if command == 'rebuild':
+        rebuild_rollups()
+        return 0
+    if command == 'catch-up':
+        result = catch_up_rollups()
+        if result is None:
+            print("Another process is already catching up the rollups")
+            return 1
+        print(f"Recomputed days: {result}")
+        return 0
+    print(__doc__)
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
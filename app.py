@@ -1,13 +1,29 @@
-from flask import Flask, jsonify, request, send_from_directory, send_file
+from flask import Flask, Response, jsonify, request, send_from_directory
 from flask_cors import CORS
-from methods import get_user_tax_forms, get_tax_form_by_id, get_tax_forms_by_type, get_all_users, get_all_clients, get_files_for_form, get_all_appointments, get_all_services, get_form_payments, get_form_pricing_configs, update_form_pricing_config, get_notifications, mark_notification_read, archive_notification, unarchive_notification, mark_all_notifications_read, get_all_form_payments, get_all_tax_forms_by_type, get_user_by_email, set_reset_token, send_reset_email, get_user_by_reset_token, clear_reset_token, update_user_password, get_db_connection, get_dashboard_main_widgets_data, get_client_growth_data
-from utils import jwt_required, admin_required, client_or_admin_required, generate_jwt_token, get_current_user
+from methods import get_user_tax_forms, get_tax_form_by_id, get_tax_forms_by_type, get_all_users, get_all_clients, get_files_for_form, get_all_appointments, get_all_services, get_form_payments, update_form_pricing_config, get_notifications, mark_notification_read, archive_notification, unarchive_notification, mark_all_notifications_read, get_all_form_payments, get_all_tax_forms_by_type, get_user_by_email, set_reset_token, send_reset_email, get_user_by_reset_token, clear_reset_token, update_user_password, get_db_connection, get_dashboard_main_widgets_data, get_client_growth_data, form_pricing_configs_cache, services_cache, booking_config_cache, get_change_fingerprint, TaxFormFileSnapshot, get_form_file
+from utils import jwt_required, admin_required, client_or_admin_required, generate_jwt_token, get_current_user, is_not_modified, resolve_byte_range, content_disposition_header, decode_cursor, get_pagination_args, stream_json_array, get_token_cache_stats, cached_json_response, fingerprint_etag, conditional_response, with_weak_etag
+from db_pool import get_pool_stats, PoolTimeoutError
+from dashboard import main_widgets_snapshot, invalidate_dashboard_snapshot
+from analytics import get_revenue_rollup, get_client_growth_rollup
+from passwords import password_hasher, PasswordWorkerBusy
+from mailer import mail_queue, MailQueueFull
+from serialization import AppJSONProvider
+from compression import compress_response
+import metrics
+import sql_profiler
+from pricing import quote_engine, PricingError
+from readiness import worker_readiness
+from uploads import serve_upload, serve_blob
+from config import Config
 import os
-import bcrypt
 import secrets
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 
 app = Flask(__name__)
+app.json = AppJSONProvider(app)
+app.after_request(compress_response)
+metrics.init_app(app)
+sql_profiler.init_app(app)
 CORS(app, resources={
     r"/api/*": {
         "origins": ["http://localhost:8080"],
@@ -19,7 +35,7 @@ CORS(app, resources={
     }
 })
 
-UPLOADS_DIR = os.environ.get('UPLOADS_DIR', '/opt/app/accverse-backend/uploads/tax_forms').rstrip('/\\')
+UPLOADS_DIR = Config.UPLOADS_DIR
 
 print("UPLOADS_DIR:", UPLOADS_DIR)
 
@@ -47,7 +63,7 @@ def login():
             return jsonify({'error': 'Account not verified.'}), 403
 
         # Check password
-        if not bcrypt.checkpw(password.encode('utf-8'), user['password'].encode('utf-8')):
+        if not password_hasher.check_password(password, user['password']):
             return jsonify({'error': 'Invalid email or password.'}), 401
 
         # Generate JWT token
@@ -65,6 +81,11 @@ def login():
                 'role': user['role']
             }
         })
+    except PasswordWorkerBusy as e:
+        print(f"Login rejected: {e}")
+        return jsonify({'error': 'Too many login attempts in progress. Please try again shortly.'}), 503, {'Retry-After': '1'}
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Login error: {e}")
         return jsonify({'error': 'Login failed'}), 500
@@ -85,6 +106,11 @@ def request_password_reset():
         set_reset_token(user['id'], token, expiry)
         send_reset_email(user['email'], token)
         return jsonify({'success': True})
+    except MailQueueFull as e:
+        print(f"Password reset request rejected: {e}")
+        return jsonify({'error': 'Could not send the reset email. Please try again shortly.'}), 503, {'Retry-After': '30'}
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Password reset request error: {e}")
         return jsonify({'error': 'Password reset request failed'}), 500
@@ -105,10 +131,15 @@ def reset_password():
         if expiry < datetime.now(timezone.utc):
             return jsonify({'error': 'Token expired.'}), 400
         # Update password
-        hashed = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        hashed = password_hasher.hash_password(new_password)
         update_user_password(user['id'], hashed)
         clear_reset_token(user['id'])
         return jsonify({'success': True})
+    except PasswordWorkerBusy as e:
+        print(f"Password reset rejected: {e}")
+        return jsonify({'error': 'Server is busy. Please try again shortly.'}), 503, {'Retry-After': '1'}
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Password reset error: {e}")
         return jsonify({'error': 'Password reset failed'}), 500
@@ -123,11 +154,19 @@ def get_user_forms(user_id):
         # Users can only access their own forms unless they're admin
         if current_user['role'] != 'admin' and current_user['user_id'] != user_id:
             return jsonify({'error': 'Access denied'}), 403
+
+        # Unchanged polls are answered from a cheap probe, before loading the forms
+        etag = fingerprint_etag(get_change_fingerprint('user_tax_forms', (user_id,)))
+        not_modified = conditional_response(etag)
+        if not_modified:
+            return not_modified
             
         forms = get_user_tax_forms(user_id)
         if forms is None:
             return jsonify({'error': 'Failed to fetch tax forms'}), 500
-        return jsonify(forms)
+        return with_weak_etag(jsonify(forms), etag)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Get user forms error: {e}")
         return jsonify({'error': 'Failed to fetch tax forms'}), 500
@@ -135,22 +174,33 @@ def get_user_forms(user_id):
 @app.route('/api/dashboard/main_widgets', methods=['GET'])
 @admin_required
 def get_dashboard_widgets():
-    """Get data for the main dashboard widgets"""
+    """Get data for the main dashboard widgets from the in-memory snapshot"""
     try:
-        data = get_dashboard_main_widgets_data()
+        data = main_widgets_snapshot.get()
         if data is None:
             return jsonify({'error': 'Failed to fetch dashboard data'}), 500
-            
-        # Serialize datetime objects to ISO 8601 format string
-        for appt in data.get('upcoming_appointments', []):
-            if 'start_time' in appt and isinstance(appt['start_time'], datetime):
-                appt['start_time'] = appt['start_time'].isoformat()
-
         return jsonify(data)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Dashboard widgets error: {e}")
         return jsonify({'error': 'Failed to fetch dashboard data'}), 500
 
+@app.route('/api/dashboard/main_widgets/refresh', methods=['POST'])
+@admin_required
+def refresh_dashboard_widgets():
+    """Recompute the dashboard snapshot immediately and return it"""
+    try:
+        data = main_widgets_snapshot.refresh()
+        if data is None:
+            return jsonify({'error': 'Failed to refresh dashboard data'}), 500
+        return jsonify(data)
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        print(f"Dashboard refresh error: {e}")
+        return jsonify({'error': 'Failed to refresh dashboard data'}), 500
+
 @app.route('/api/tax-forms/<form_id>', methods=['GET'])
 @client_or_admin_required
 def get_form(form_id):
@@ -166,6 +216,8 @@ def get_form(form_id):
             return jsonify({'error': 'Access denied'}), 403
             
         return jsonify(form)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Get form error: {e}")
         return jsonify({'error': 'Failed to fetch tax form'}), 500
@@ -184,6 +236,8 @@ def get_forms_by_type(user_id, form_type):
         if forms is None:
             return jsonify({'error': 'Failed to fetch tax forms'}), 500
         return jsonify(forms)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Get forms by type error: {e}")
         return jsonify({'error': 'Failed to fetch tax forms'}), 500
@@ -191,12 +245,18 @@ def get_forms_by_type(user_id, form_type):
 @app.route('/api/users', methods=['GET'])
 @admin_required
 def get_users():
-    """Get all users"""
+    """Get all users (streamed, or one page with ?limit=&cursor=)"""
     try:
-        users = get_all_users()
+        try:
+            limit, cursor = get_pagination_args(cursor_length=2)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        users = get_all_users(limit, cursor)
         if users is None:
             return jsonify({'error': 'Failed to fetch users'}), 500
-        return jsonify(users)
+        return jsonify(users) if limit else stream_json_array(users)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Get users error: {e}")
         return jsonify({'error': 'Failed to fetch users'}), 500
@@ -204,12 +264,18 @@ def get_users():
 @app.route('/api/clients', methods=['GET'])
 @admin_required
 def get_clients():
-    """Get all clients (users with role 'client')"""
+    """Get all clients (users with role 'client'), streamed or paged"""
     try:
-        clients = get_all_clients()
+        try:
+            limit, cursor = get_pagination_args(cursor_length=2)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        clients = get_all_clients(limit, cursor)
         if clients is None:
             return jsonify({'error': 'Failed to fetch clients'}), 500
-        return jsonify(clients)
+        return jsonify(clients) if limit else stream_json_array(clients)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Get clients error: {e}")
         return jsonify({'error': 'Failed to fetch clients'}), 500
@@ -220,6 +286,8 @@ def api_get_files_for_form(form_id):
     try:
         files = get_files_for_form(form_id)
         return jsonify(files)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Get files for form error: {e}")
         return jsonify({'error': 'Failed to fetch files'}), 500
@@ -228,10 +296,20 @@ def api_get_files_for_form(form_id):
 @admin_required
 def get_appointments():
     try:
-        appointments = get_all_appointments()
+        try:
+            limit, cursor = get_pagination_args(cursor_length=3)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        etag = fingerprint_etag(get_change_fingerprint('appointments'))
+        not_modified = conditional_response(etag)
+        if not_modified:
+            return not_modified
+        appointments = get_all_appointments(limit, cursor)
         if appointments is None:
             return jsonify({'error': 'Failed to fetch appointments'}), 500
-        return jsonify(appointments)
+        return with_weak_etag(jsonify(appointments) if limit else stream_json_array(appointments), etag)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Get appointments error: {e}")
         return jsonify({'error': 'Failed to fetch appointments'}), 500
@@ -239,14 +317,14 @@ def get_appointments():
 @app.route('/api/services', methods=['GET'])
 @jwt_required()
 def get_services():
+    """Get the services catalogue (cached, with ETag / Last-Modified revalidation)"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT id, name, duration FROM services")
-        services = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return jsonify(services)
+        entry = services_cache.get()
+        if entry is None:
+            return jsonify({'error': 'Failed to fetch services'}), 500
+        return cached_json_response(entry)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Get services error: {e}")
         return jsonify({'error': 'Failed to fetch services'}), 500
@@ -260,11 +338,18 @@ def get_user_form_payments(user_id):
         # Users can only access their own payments unless they're admin
         if current_user['role'] != 'admin' and current_user['user_id'] != user_id:
             return jsonify({'error': 'Access denied'}), 403
+
+        etag = fingerprint_etag(get_change_fingerprint('user_form_payments', (user_id,)))
+        not_modified = conditional_response(etag)
+        if not_modified:
+            return not_modified
             
         payments = get_form_payments(user_id)
         if payments is None:
             return jsonify({'error': 'Failed to fetch form payments'}), 500
-        return jsonify(payments)
+        return with_weak_etag(jsonify(payments), etag)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Get user form payments error: {e}")
         return jsonify({'error': 'Failed to fetch form payments'}), 500
@@ -272,20 +357,16 @@ def get_user_form_payments(user_id):
 @app.route('/uploads/tax_forms/<path:filename>')
 @jwt_required()
 def serve_uploaded_file(filename):
+    """Serve an uploaded file with ETag / Last-Modified validators and Range support
+
+    With UPLOAD_SENDFILE_MODE set, only the auth check and validators run here and the
+    front proxy streams the file (X-Accel-Redirect for nginx, X-Sendfile for Apache/lighttpd).
+    """
     try:
-        print("Original filename:", repr(filename))
-        filename = filename.replace("\\", "/")
-        print("Normalized filename:", repr(filename))
-        file_path = f"{UPLOADS_DIR}/{filename}"
-        print("Trying to send file:", file_path)
-        print("UPLOADS_DIR exists:", os.path.isdir(UPLOADS_DIR))
-        print("File exists:", os.path.isfile(file_path))
-        dir_path = os.path.dirname(file_path)
-        print("Directory listing for", dir_path, ":", os.listdir(dir_path) if os.path.isdir(dir_path) else "Not a directory")
-        if not os.path.isfile(file_path):
-            print("File not found!")
+        response = serve_upload(UPLOADS_DIR, filename)
+        if response is None:
             return "File not found", 404
-        return send_file(file_path)
+        return response
     except Exception as e:
         print(f"Serve uploaded file error: {e}")
         return jsonify({'error': 'Failed to serve file'}), 500
@@ -293,70 +374,76 @@ def serve_uploaded_file(filename):
 @app.route('/api/tax-form-files/blob/<int:file_id>', methods=['GET'])
 @jwt_required()
 def get_tax_form_file_blob(file_id):
+    """Stream a file's content, honouring Range, If-None-Match and If-Modified-Since
+
+    Content moved to the blob store is sent from disk (or by the front proxy, see
+    UPLOAD_SENDFILE_MODE). The rest is streamed out of MySQL in chunks from one snapshot,
+    with the stored SHA-256 of the content as its ETag.
+    """
+    snapshot = TaxFormFileSnapshot(file_id)
+    streaming = False
     try:
-        print(f"Received request for file_id: {file_id}")
-        conn = get_db_connection()
-        print(f"Database connection: {conn}")
-        cursor = conn.cursor(dictionary=True)
-        print("Created DB cursor")
-        query = 'SELECT file_name, file_type, file_blobs FROM tax_form_files WHERE id = %s'
-        print(f"Executing query: {query} with file_id={file_id}")
-        cursor.execute(query, (file_id,))
-        file = cursor.fetchone()
-        print(f"Fetched file row: {file}")
-        cursor.close()
-        print("Closed DB cursor")
-        conn.close()
-        print("Closed DB connection")
-        if not file or not file['file_blobs']:
-            print("File not found or file_blobs is empty")
+        info = snapshot.open().info
+        if info and info['blob_sha256']:
+            snapshot.close()
+            response = serve_blob(info['blob_sha256'], mimetype=info['file_type'], file_name=info['file_name'])
+            if response is None:
+                print(f"Blob {info['blob_sha256']} of tax form file {file_id} is missing from the blob store")
+                return 'File not found', 404
+            return response
+        if not info or not info['blob_size']:
             return 'File not found', 404
-        from flask import send_file
-        import io
-        print(f"Preparing to send file: {file['file_name']}, type: {file['file_type']}, size: {len(file['file_blobs'])} bytes")
-        return send_file(
-            io.BytesIO(file['file_blobs']),
-            mimetype=file['file_type'],
-            as_attachment=False,
-            download_name=file['file_name']
-        )
+
+        total_length = info['blob_size']
+        etag = info['content_sha256']
+        last_modified = info['content_updated_at']
+
+        response = Response(mimetype=info['file_type'] or 'application/octet-stream')
+        response.set_etag(etag)
+        if last_modified:
+            response.last_modified = last_modified
+        response.headers['Accept-Ranges'] = 'bytes'
+        response.headers['Content-Disposition'] = content_disposition_header('inline', info['file_name'])
+
+        if is_not_modified(etag=etag, last_modified=last_modified):
+            response.status_code = 304
+            return response
+
+        byte_range = resolve_byte_range(total_length, etag=etag, last_modified=last_modified)
+        if byte_range is False:
+            response.status_code = 416
+            response.headers['Content-Range'] = f"bytes */{total_length}"
+            return response
+
+        start, stop = byte_range or (0, total_length)
+        if byte_range:
+            response.status_code = 206
+            response.headers['Content-Range'] = f"bytes {start}-{stop - 1}/{total_length}"
+        response.response = snapshot.iter_range(start, stop)
+        response.content_length = stop - start
+        # Releases the snapshot even if the body is never read (HEAD, client gone)
+        response.call_on_close(snapshot.close)
+        streaming = True
+        return response
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Get tax form file blob error: {e}")
         return jsonify({'error': 'Failed to fetch file'}), 500
+    finally:
+        if not streaming:
+            snapshot.close()
 
 @app.route('/api/tax-form-files/<form_id>/file/<file_name>', methods=['GET'])
 @client_or_admin_required
 def api_get_file_blob(form_id, file_name):
     try:
-        import json
-        from flask import jsonify
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        query = "SELECT files FROM tax_form_files WHERE tax_form_id = %s"
-        cursor.execute(query, (form_id,))
-        row = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        if row and row['files']:
-            try:
-                files_list = json.loads(row['files'])
-                print(f"Looking for file_name: {file_name} in form_id: {form_id}")
-                for file in files_list:
-                    print(f"Comparing DB file_name: {file.get('file_name')} to requested: {file_name}")
-                    if file.get('file_name') == file_name:
-                        print("File matched!")
-                        return jsonify({
-                            'file_blob': file.get('file_blob'),
-                            'file_type': file.get('file_type'),
-                            'file_name': file.get('file_name')
-                        })
-                print("No file matched.")
-                return jsonify({'error': 'File not found'}), 404
-            except Exception as e:
-                print(f"Error parsing files: {e}")
-                return jsonify({'error': 'Error parsing files'}), 500
-        print("No files found for form_id.")
-        return jsonify({'error': 'File not found'}), 404
+        file = get_form_file(form_id, file_name)
+        if file is None:
+            return jsonify({'error': 'File not found'}), 404
+        return jsonify(file)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Get file blob error: {e}")
         return jsonify({'error': 'Failed to fetch file'}), 500
@@ -364,12 +451,18 @@ def api_get_file_blob(form_id, file_name):
 @app.route('/api/form-pricing-configs', methods=['GET'])
 @admin_required
 def get_pricing_configs():
-    """Get all form pricing configurations"""
+    """Get all form pricing configurations
+
+    Served from the in-process cache with an ETag, so clients can revalidate with
+    If-None-Match and get a 304 until a config changes.
+    """
     try:
-        configs = get_form_pricing_configs()
-        if configs is None:
+        entry = form_pricing_configs_cache.get()
+        if entry is None:
             return jsonify({'error': 'Failed to fetch pricing configurations'}), 500
-        return jsonify(configs)
+        return cached_json_response(entry)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Get pricing configs error: {e}")
         return jsonify({'error': 'Failed to fetch pricing configurations'}), 500
@@ -387,10 +480,57 @@ def update_pricing_config(config_id):
         if updated_config is None:
             return jsonify({'error': 'Failed to update pricing configuration'}), 500
         return jsonify(updated_config)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Update pricing config error: {e}")
         return jsonify({'error': 'Failed to update pricing configuration'}), 500
 
+@app.route('/api/pricing/quote', methods=['POST'])
+@client_or_admin_required
+def get_pricing_quote():
+    """Quote subtotal, GST and total for {form_type, option, add_ons}"""
+    try:
+        data = request.get_json(silent=True) or {}
+        if not data.get('form_type') or data.get('option') is None:
+            return jsonify({'error': 'form_type and option are required'}), 400
+        quote = quote_engine.quote(data['form_type'], data['option'], data.get('add_ons') or [])
+        if quote is None:
+            return jsonify({'error': 'Failed to load pricing configurations'}), 500
+        return jsonify(quote)
+    except PricingError as e:
+        return jsonify({'error': str(e)}), 400
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        print(f"Pricing quote error: {e}")
+        return jsonify({'error': 'Failed to calculate quote'}), 500
+
+@app.route('/api/pricing/quote/batch', methods=['POST'])
+@client_or_admin_required
+def get_pricing_quotes():
+    """Quote a list of selections: {"quotes": [{form_type, option, add_ons}, ...]}
+
+    Results are returned in request order; an invalid selection gets {'error': ...} in
+    its slot instead of failing the whole batch.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        selections = data.get('quotes')
+        if not isinstance(selections, list):
+            return jsonify({'error': 'quotes must be a list'}), 400
+        if len(selections) > Config.PRICING_QUOTE_BATCH_LIMIT:
+            return jsonify({'error': f'At most {Config.PRICING_QUOTE_BATCH_LIMIT} quotes per request'}), 400
+        quotes = quote_engine.quote_many(selections)
+        if quotes is None:
+            return jsonify({'error': 'Failed to load pricing configurations'}), 500
+        return jsonify({'quotes': quotes})
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        print(f"Pricing batch quote error: {e}")
+        return jsonify({'error': 'Failed to calculate quotes'}), 500
+
 @app.route('/api/notifications', methods=['GET'])
 @jwt_required()
 def get_notifications_route():
@@ -406,11 +546,34 @@ def get_notifications_route():
         limit = request.args.get('limit', 50, type=int)
         offset = request.args.get('offset', 0, type=int)
         include_archived = request.args.get('include_archived', 'false').lower() == 'true'
+
+        # Keyset pagination when a cursor is supplied (empty for the first page)
+        cursor = None
+        if 'cursor' in request.args:
+            if limit < 1:
+                return jsonify({'error': 'limit must be positive'}), 400
+            try:
+                cursor = decode_cursor(request.args['cursor']) if request.args['cursor'] else []
+                if cursor and len(cursor) != 2:
+                    raise ValueError('notification cursors hold (created_at, id)')
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+
+        if user_id is None:
+            fingerprint = get_change_fingerprint('notifications')
+        else:
+            fingerprint = get_change_fingerprint('user_notifications', (user_id,))
+        etag = fingerprint_etag(fingerprint, user_id)
+        not_modified = conditional_response(etag)
+        if not_modified:
+            return not_modified
         
-        notifications = get_notifications(user_id, limit, offset, include_archived)
+        notifications = get_notifications(user_id, limit, offset, include_archived, cursor=cursor)
         if notifications is None:
             return jsonify({'error': 'Failed to fetch notifications'}), 500
-        return jsonify(notifications)
+        return with_weak_etag(jsonify(notifications), etag)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Get notifications error: {e}")
         return jsonify({'error': 'Failed to fetch notifications'}), 500
@@ -424,6 +587,8 @@ def mark_notification_read_route(notification_id):
         if notification is None:
             return jsonify({'error': 'Failed to mark notification as read'}), 500
         return jsonify(notification)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Mark notification read error: {e}")
         return jsonify({'error': 'Failed to mark notification as read'}), 500
@@ -437,6 +602,8 @@ def archive_notification_route(notification_id):
         if success is None:
             return jsonify({'error': 'Failed to archive notification'}), 500
         return jsonify({'success': True})
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Archive notification error: {e}")
         return jsonify({'error': 'Failed to archive notification'}), 500
@@ -450,6 +617,8 @@ def unarchive_notification_route(notification_id):
         if notification is None:
             return jsonify({'error': 'Failed to unarchive notification'}), 500
         return jsonify(notification)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Unarchive notification error: {e}")
         return jsonify({'error': 'Failed to unarchive notification'}), 500
@@ -471,6 +640,8 @@ def mark_all_notifications_read_route():
         if success is None:
             return jsonify({'error': 'Failed to mark all notifications as read'}), 500
         return jsonify({'success': True})
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Mark all notifications read error: {e}")
         return jsonify({'error': 'Failed to mark all notifications as read'}), 500
@@ -478,12 +649,18 @@ def mark_all_notifications_read_route():
 @app.route('/api/form-payments', methods=['GET'])
 @admin_required
 def get_all_form_payments_route():
-    """Get all form payments for all users"""
+    """Get all form payments for all users (streamed, or one page with ?limit=&cursor=)"""
     try:
-        payments = get_all_form_payments()
+        try:
+            limit, cursor = get_pagination_args(cursor_length=2)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        payments = get_all_form_payments(limit, cursor)
         if payments is None:
             return jsonify({'error': 'Failed to fetch form payments'}), 500
-        return jsonify(payments)
+        return jsonify(payments) if limit else stream_json_array(payments)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Get all form payments error: {e}")
         return jsonify({'error': 'Failed to fetch form payments'}), 500
@@ -497,6 +674,8 @@ def get_all_tax_forms_by_type_route(form_type):
         if forms is None:
             return jsonify({'error': 'Failed to fetch tax forms'}), 500
         return jsonify(forms)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Get all tax forms by type error: {e}")
         return jsonify({'error': 'Failed to fetch tax forms'}), 500
@@ -511,15 +690,22 @@ def update_service(service_id):
         if not name or duration is None:
             return jsonify({'error': 'Name and duration are required.'}), 400
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE services SET name=%s, duration=%s WHERE id=%s",
-            (name, duration, service_id)
-        )
-        conn.commit()
-        cursor.close()
-        conn.close()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE services SET name=%s, duration=%s WHERE id=%s",
+                (name, duration, service_id)
+            )
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+        services_cache.invalidate()
+        # Upcoming appointments on the dashboard show service names
+        invalidate_dashboard_snapshot()
         return jsonify({'success': True})
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Update service error: {e}")
         return jsonify({'error': 'Failed to update service'}), 500
@@ -527,30 +713,16 @@ def update_service(service_id):
 @app.route('/api/booking-config', methods=['GET'])
 @admin_required
 def get_booking_config():
+    """Get the booking configuration (cached, with ETag / Last-Modified revalidation)"""
     try:
-        import datetime
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM booking_config LIMIT 1")
-        config = cursor.fetchone()
-        cursor.close()
-        conn.close()
-        if config:
-            for k, v in config.items():
-                # Convert datetime.time to string (e.g., '09:00:00')
-                if isinstance(v, datetime.time):
-                    config[k] = v.strftime('%H:%M:%S')
-                # Convert datetime.timedelta to string (e.g., '01:30:00')
-                elif isinstance(v, datetime.timedelta):
-                    total_seconds = int(v.total_seconds())
-                    hours = total_seconds // 3600
-                    minutes = (total_seconds % 3600) // 60
-                    seconds = total_seconds % 60
-                    config[k] = f"{hours:02}:{minutes:02}:{seconds:02}"
-                # Convert any other non-serializable type to string
-                elif not isinstance(v, (str, int, float, bool, type(None), dict, list)):
-                    config[k] = str(v)
-        return jsonify(config)
+        entry = booking_config_cache.get()
+        if entry is None:
+            return jsonify({'error': 'Failed to fetch booking configuration'}), 500
+        # TIME columns (timedelta) are encoded as HH:MM:SS by the app's JSON provider;
+        # an empty table is still returned as null
+        return cached_json_response(entry, entry.value or None)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Get booking config error: {e}")
         return jsonify({'error': 'Failed to fetch booking configuration'}), 500
@@ -569,31 +741,191 @@ def update_booking_config(config_id):
         if None in values:
             return jsonify({'error': 'All fields are required.'}), 400
         conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(f"""
-            UPDATE booking_config SET
-                working_hours_start=%s,
-                working_hours_end=%s,
-                slot_duration=%s,
-                buffer_between_appointments=%s,
-                max_advance_booking_days=%s,
-                min_advance_booking_hours=%s,
-                max_appointments_per_day=%s,
-                max_appointments_per_user=%s,
-                allowed_booking_days=%s,
-                holidays=%s,
-                timezone=%s
-            WHERE id=%s
-        """, (*values, config_id))
-        conn.commit()
-        cursor.close()
-        conn.close()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                UPDATE booking_config SET
+                    working_hours_start=%s,
+                    working_hours_end=%s,
+                    slot_duration=%s,
+                    buffer_between_appointments=%s,
+                    max_advance_booking_days=%s,
+                    min_advance_booking_hours=%s,
+                    max_appointments_per_day=%s,
+                    max_appointments_per_user=%s,
+                    allowed_booking_days=%s,
+                    holidays=%s,
+                    timezone=%s
+                WHERE id=%s
+            """, (*values, config_id))
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+        booking_config_cache.invalidate()
         return jsonify({'success': True})
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Update booking config error: {e}")
         return jsonify({'error': 'Failed to update booking configuration'}), 500
 
+def _parse_date_arg(name, default):
+    value = request.args.get(name)
+    return date.fromisoformat(value) if value else default
+
+@app.route('/api/analytics/revenue', methods=['GET'])
+@admin_required
+def get_revenue_analytics():
+    """Revenue totals from the daily rollup, e.g. ?from=2023-01-01&to=2024-12-31&group_by=month,payment_status"""
+    try:
+        try:
+            date_to = _parse_date_arg('to', date.today())
+            date_from = _parse_date_arg('from', date_to - timedelta(days=365))
+            rows = get_revenue_rollup(
+                date_from, date_to,
+                group_by=request.args.get('group_by', 'day'),
+                payment_status=request.args.get('status')
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if rows is None:
+            return jsonify({'error': 'Failed to fetch revenue analytics'}), 500
+        return jsonify(rows)
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        print(f"Revenue analytics error: {e}")
+        return jsonify({'error': 'Failed to fetch revenue analytics'}), 500
+
+@app.route('/api/analytics/client-growth', methods=['GET'])
+@admin_required
+def get_client_growth_analytics():
+    """New clients per period from the daily rollup, e.g. ?from=2023-01-01&group_by=month"""
+    try:
+        try:
+            date_to = _parse_date_arg('to', date.today())
+            date_from = _parse_date_arg('from', date_to - timedelta(days=365))
+            rows = get_client_growth_rollup(date_from, date_to, group_by=request.args.get('group_by', 'month'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if rows is None:
+            return jsonify({'error': 'Failed to fetch client growth analytics'}), 500
+        return jsonify(rows)
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        print(f"Client growth analytics error: {e}")
+        return jsonify({'error': 'Failed to fetch client growth analytics'}), 500
+
+@app.route('/api/admin/token-cache', methods=['GET'])
+@admin_required
+def get_token_cache_stats_route():
+    """Get hit/miss counters of the verified JWT cache for this worker process"""
+    try:
+        return jsonify(get_token_cache_stats())
+    except Exception as e:
+        print(f"Get token cache stats error: {e}")
+        return jsonify({'error': 'Failed to fetch token cache stats'}), 500
+
+@app.route('/metrics', methods=['GET'])
+@admin_required
+def get_metrics():
+    """Per-route latency, status, DB and serialization metrics of this worker process (Prometheus text format)"""
+    try:
+        return Response(metrics.registry.render_prometheus(), mimetype='text/plain; version=0.0.4')
+    except Exception as e:
+        print(f"Get metrics error: {e}")
+        return jsonify({'error': 'Failed to render metrics'}), 500
+
+@app.route('/api/admin/sql-profile', methods=['GET'])
+@admin_required
+def get_sql_profile():
+    """Per-fingerprint query stats, recent slow queries and N+1 detections for this worker process"""
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        order_by = request.args.get('order_by', 'total_ms')
+        if order_by not in ('total_ms', 'count', 'p95_ms', 'max_ms', 'rows'):
+            return jsonify({'error': 'order_by must be one of total_ms, count, p95_ms, max_ms, rows'}), 400
+        return jsonify(sql_profiler.profiler.report(limit, order_by))
+    except Exception as e:
+        print(f"Get SQL profile error: {e}")
+        return jsonify({'error': 'Failed to fetch SQL profile'}), 500
+
+@app.route('/api/admin/sql-profile', methods=['DELETE'])
+@admin_required
+def reset_sql_profile():
+    """Clear the SQL profiler's statistics"""
+    try:
+        sql_profiler.profiler.reset()
+        return jsonify({'success': True})
+    except Exception as e:
+        print(f"Reset SQL profile error: {e}")
+        return jsonify({'error': 'Failed to reset SQL profile'}), 500
+
+@app.route('/api/admin/reference-cache', methods=['GET'])
+@admin_required
+def get_reference_cache_stats():
+    """Cache status of rarely-changing reference data (pricing configs, services, booking config)"""
+    try:
+        return jsonify([cache.stats() for cache in (form_pricing_configs_cache, services_cache, booking_config_cache)])
+    except Exception as e:
+        print(f"Get reference cache stats error: {e}")
+        return jsonify({'error': 'Failed to fetch reference cache stats'}), 500
+
+@app.route('/api/admin/password-hashing', methods=['GET'])
+@admin_required
+def get_password_hashing_stats():
+    """Get queue depth and latency of the bcrypt worker pool for this worker process"""
+    try:
+        return jsonify(password_hasher.stats())
+    except Exception as e:
+        print(f"Get password hashing stats error: {e}")
+        return jsonify({'error': 'Failed to fetch password hashing stats'}), 500
+
+@app.route('/api/admin/mail-queue', methods=['GET'])
+@admin_required
+def get_mail_queue_stats():
+    """Get outbound mail queue depth and delivery counters for this worker process"""
+    try:
+        return jsonify(mail_queue.stats())
+    except Exception as e:
+        print(f"Get mail queue stats error: {e}")
+        return jsonify({'error': 'Failed to fetch mail queue stats'}), 500
+
+@app.route('/api/admin/db-pool', methods=['GET'])
+@admin_required
+def get_db_pool_stats():
+    """Get connection pool usage (in use, idle, wait times) for this worker process"""
+    try:
+        return jsonify(get_pool_stats())
+    except Exception as e:
+        print(f"Get DB pool stats error: {e}")
+        return jsonify({'error': 'Failed to fetch pool stats'}), 500
+
+# Probes for load balancers and orchestrators (no authentication)
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness: the worker process is up and answering requests"""
+    return jsonify({'status': 'ok', 'pid': os.getpid()})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness: this worker is warmed up, not draining, and its pool and caches work"""
+    try:
+        ready, details = worker_readiness.check()
+        return jsonify(details), 200 if ready else 503
+    except Exception as e:
+        print(f"Readiness check error: {e}")
+        return jsonify({'status': 'unavailable'}), 503
+
 # Error handlers
+@app.errorhandler(PoolTimeoutError)
+def database_busy(error):
+    # Every pooled connection stayed busy for DB_POOL_TIMEOUT seconds
+    print(f"Database pool exhausted: {error}")
+    return jsonify({'error': 'Server is busy. Please try again shortly.'}), 503, {'Retry-After': '1'}
+
 @app.errorhandler(401)
 def unauthorized(error):
     return jsonify({'error': 'Unauthorized access'}), 401
@@ -611,4 +943,5 @@ def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
 if __name__ == '__main__':
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py)
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,561 @@
+"""Benchmark every API route against a seeded database and compare with a baseline.
+
+Run benchmarks/seed.py first. Each endpoint gets `--warmup` unmeasured requests, then
+`--requests` measured ones spread over `--concurrency` threads. The report holds, per
+endpoint: throughput, p50/p95/p99/max latency, status codes, DB queries per request and
+peak RSS. It is printed as a table and written as JSON with --output.
+
+By default requests go through the Flask test client in this process. With --url they
+are sent to a running server. That server must share JWT_SECRET_KEY and the database
+with this script. Set SQL_PROFILER_DEBUG_HEADER=true on it for query counts, which are
+then read from X-SQL-Profile and exclude queries made while a body is streamed. Pass
+--server-pid for its peak RSS.
+
+A previous report passed as --baseline is compared endpoint by endpoint. The exit
+status is 1 if any endpoint regressed by more than --tolerance, or issues more queries.
+
+Usage:
+    python benchmarks/bench_endpoints.py [--requests 50] [--concurrency 1] [--only REGEX]
+        [--url http://localhost:5000 [--server-pid PID]] [--output report.json]
+        [--baseline baseline.json] [--tolerance 0.25]
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from seed import BENCH_ADMIN_EMAIL, BENCH_PASSWORD
+from serialization import format_timedelta
+from utils import generate_jwt_token, get_db_connection
+
+REPORT_VERSION = 1
+SAMPLE_UPLOAD_NAME = 'benchmark-sample.pdf'
+SAMPLE_UPLOAD_BYTES = 256 * 1024
+
+# Latency rises below this many milliseconds are treated as noise when comparing
+LATENCY_NOISE_FLOOR_MS = 1.0
+
+_PROFILE_QUERIES_RE = re.compile(r"queries=(\d+)")
+
+
+class Endpoint:
+    """One request to benchmark; `rule` is the Flask URL rule it resolves to"""
+
+    def __init__(self, method, rule, path, role, body=None, headers=None, expect=(200,), label=None):
+        self.method = method
+        self.rule = rule
+        self.path = path
+        self.role = role
+        self.body = body
+        self.headers = headers or {}
+        self.expect = expect
+        self.name = f"{method} {rule}" + (f" [{label}]" if label else '')
+
+
+def discover_fixtures():
+    """Look up the ids the endpoints are called with in the seeded database"""
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("No database connection available (check the MYSQL_* variables)")
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("SELECT id, email, role FROM users WHERE email = %s", (BENCH_ADMIN_EMAIL,))
+        admin = cursor.fetchone()
+        if admin is None:
+            raise RuntimeError(f"{BENCH_ADMIN_EMAIL} not found; run benchmarks/seed.py first")
+        # The client with the most files exercises the heaviest per-user paths
+        cursor.execute("""
+            SELECT tf.user_id, COUNT(*) AS files
+            FROM tax_form_files f
+            JOIN tax_forms tf ON f.tax_form_id = tf.id
+            GROUP BY tf.user_id
+            ORDER BY files DESC
+            LIMIT 1
+        """)
+        row = cursor.fetchone()
+        if row is None:
+            raise RuntimeError("No tax form files found; run benchmarks/seed.py first")
+        cursor.execute("SELECT id, email, role FROM users WHERE id = %s", (row['user_id'],))
+        client = cursor.fetchone()
+        cursor.execute("""
+            SELECT f.id, f.tax_form_id, f.file_name, tf.form_type
+            FROM tax_form_files f
+            JOIN tax_forms tf ON f.tax_form_id = tf.id
+            WHERE tf.user_id = %s
+            ORDER BY f.file_size DESC
+            LIMIT 1
+        """, (client['id'],))
+        file = cursor.fetchone()
+        cursor.execute("SELECT id FROM notifications WHERE user_id = %s ORDER BY id LIMIT 1", (client['id'],))
+        notification = cursor.fetchone()
+        cursor.execute("SELECT id, name, duration FROM services ORDER BY id LIMIT 1")
+        service = cursor.fetchone()
+        cursor.execute("SELECT * FROM booking_config ORDER BY id LIMIT 1")
+        booking_config = cursor.fetchone()
+        cursor.execute("SELECT id, form_type, pricing_options, add_ons, gst_rate FROM form_pricing_configs ORDER BY id LIMIT 1")
+        pricing = cursor.fetchone()
+        return {
+            'admin': admin,
+            'client': client,
+            'file': file,
+            'notification_id': notification['id'] if notification else 0,
+            'service': service,
+            'booking_config': booking_config,
+            'pricing': pricing,
+        }
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _json_value(value):
+    return json.loads(value) if isinstance(value, (str, bytes, bytearray)) else value
+
+
+def build_endpoints(fixtures, upload_name=SAMPLE_UPLOAD_NAME):
+    """The requests to run, covering every route in app.py
+
+    Mutating endpoints write back the values they already hold (or toggle a flag), so
+    repeated runs leave the data set as it was.
+    """
+    client_id = fixtures['client']['id']
+    file = fixtures['file']
+    form_type = file['form_type']
+    notification_id = fixtures['notification_id']
+    service = fixtures['service']
+    pricing = fixtures['pricing']
+    options = _json_value(pricing['pricing_options']) or []
+    add_ons = _json_value(pricing['add_ons']) or []
+    quote = {
+        'form_type': pricing['form_type'],
+        'option': options[0]['id'] if options else 'basic',
+        'add_ons': [add_on['id'] for add_on in add_ons[:2]],
+    }
+    booking_config = {
+        key: format_timedelta(value) if isinstance(value, timedelta) else value
+        for key, value in fixtures['booking_config'].items() if key != 'id'
+    }
+    duration = service['duration']
+    service_body = {
+        'name': service['name'],
+        'duration': format_timedelta(duration) if isinstance(duration, timedelta) else duration,
+    }
+    pricing_body = {
+        'pricing_options': options,
+        'add_ons': add_ons,
+        'gst_rate': float(pricing['gst_rate']),
+    }
+
+    E = Endpoint
+    return [
+        # Public
+        E('POST', '/api/login', '/api/login', None, body={'email': BENCH_ADMIN_EMAIL, 'password': BENCH_PASSWORD}),
+        E('POST', '/api/request-password-reset', '/api/request-password-reset', None,
+          body={'email': 'nobody@example.invalid'}, expect=(404,)),
+        E('POST', '/api/reset-password', '/api/reset-password', None,
+          body={'token': 'invalid-benchmark-token', 'password': BENCH_PASSWORD}, expect=(400,)),
+        # Tax forms and files
+        E('GET', '/api/tax-forms/user/<int:user_id>', f"/api/tax-forms/user/{client_id}", 'client'),
+        E('GET', '/api/tax-forms/<form_id>', f"/api/tax-forms/{file['tax_form_id']}", 'client'),
+        E('GET', '/api/tax-forms/user/<int:user_id>/type/<form_type>',
+          f"/api/tax-forms/user/{client_id}/type/{form_type}", 'client'),
+        E('GET', '/api/tax-forms/type/<form_type>', f"/api/tax-forms/type/{form_type}", 'admin'),
+        E('GET', '/api/tax-form-files/<form_id>', f"/api/tax-form-files/{file['tax_form_id']}", 'client'),
+        E('GET', '/api/tax-form-files/blob/<int:file_id>', f"/api/tax-form-files/blob/{file['id']}", 'client'),
+        E('GET', '/api/tax-form-files/blob/<int:file_id>', f"/api/tax-form-files/blob/{file['id']}", 'client',
+          headers={'Range': 'bytes=0-65535'}, expect=(206,), label='range 64KB'),
+        E('GET', '/api/tax-form-files/<form_id>/file/<file_name>',
+          f"/api/tax-form-files/{file['tax_form_id']}/file/{file['file_name']}", 'client'),
+        E('GET', '/uploads/tax_forms/<path:filename>', f"/uploads/tax_forms/{upload_name}", 'client'),
+        # Dashboard and lists
+        E('GET', '/api/dashboard/main_widgets', '/api/dashboard/main_widgets', 'admin'),
+        E('POST', '/api/dashboard/main_widgets/refresh', '/api/dashboard/main_widgets/refresh', 'admin'),
+        E('GET', '/api/users', '/api/users', 'admin'),
+        E('GET', '/api/users', '/api/users?limit=50', 'admin', label='limit=50'),
+        E('GET', '/api/clients', '/api/clients', 'admin'),
+        E('GET', '/api/appointments', '/api/appointments', 'admin'),
+        E('GET', '/api/form-payments', '/api/form-payments', 'admin'),
+        E('GET', '/api/form-payments', '/api/form-payments?limit=50', 'admin', label='limit=50'),
+        E('GET', '/api/form-payments/user/<int:user_id>', f"/api/form-payments/user/{client_id}", 'client'),
+        # Notifications
+        E('GET', '/api/notifications', '/api/notifications', 'admin'),
+        E('GET', '/api/notifications', '/api/notifications?limit=50&cursor=', 'client', label='client keyset'),
+        E('POST', '/api/notifications/<int:notification_id>/read',
+          f"/api/notifications/{notification_id}/read", 'client'),
+        E('POST', '/api/notifications/<int:notification_id>/archive',
+          f"/api/notifications/{notification_id}/archive", 'client'),
+        E('POST', '/api/notifications/<int:notification_id>/unarchive',
+          f"/api/notifications/{notification_id}/unarchive", 'client'),
+        E('POST', '/api/notifications/mark-all-read', '/api/notifications/mark-all-read', 'client', body={}),
+        # Reference data and pricing
+        E('GET', '/api/services', '/api/services', 'client'),
+        E('PUT', '/api/services/<int:service_id>', f"/api/services/{service['id']}", 'admin', body=service_body),
+        E('GET', '/api/booking-config', '/api/booking-config', 'admin'),
+        E('PUT', '/api/booking-config/<int:config_id>', f"/api/booking-config/{fixtures['booking_config']['id']}",
+          'admin', body=booking_config),
+        E('GET', '/api/form-pricing-configs', '/api/form-pricing-configs', 'admin'),
+        E('PUT', '/api/form-pricing-configs/<int:config_id>', f"/api/form-pricing-configs/{pricing['id']}",
+          'admin', body=pricing_body),
+        E('POST', '/api/pricing/quote', '/api/pricing/quote', 'client', body=quote),
+        E('POST', '/api/pricing/quote/batch', '/api/pricing/quote/batch', 'client', body={'quotes': [quote] * 100}),
+        # Analytics
+        E('GET', '/api/analytics/revenue', '/api/analytics/revenue?group_by=month,payment_status', 'admin'),
+        E('GET', '/api/analytics/client-growth', '/api/analytics/client-growth', 'admin'),
+        # Diagnostics
+        E('GET', '/api/admin/token-cache', '/api/admin/token-cache', 'admin'),
+        E('GET', '/metrics', '/metrics', 'admin'),
+        E('GET', '/api/admin/sql-profile', '/api/admin/sql-profile', 'admin'),
+        E('DELETE', '/api/admin/sql-profile', '/api/admin/sql-profile', 'admin'),
+        E('GET', '/api/admin/reference-cache', '/api/admin/reference-cache', 'admin'),
+        E('GET', '/api/admin/password-hashing', '/api/admin/password-hashing', 'admin'),
+        E('GET', '/api/admin/mail-queue', '/api/admin/mail-queue', 'admin'),
+        E('GET', '/api/admin/db-pool', '/api/admin/db-pool', 'admin'),
+    ]
+
+
+class TestClientTransport:
+    """Sends requests through app.test_client(); DB query counts come from metrics.registry"""
+
+    rss_pid = os.getpid()
+
+    def __init__(self):
+        from app import app, UPLOADS_DIR
+        import metrics
+        self.app = app
+        self._registry = metrics.registry
+        self._local = threading.local()
+        self.uploads_dir = UPLOADS_DIR
+
+    def routes(self):
+        return {(rule.rule, method) for rule in self.app.url_map.iter_rules()
+                for method in rule.methods - {'HEAD', 'OPTIONS'} if rule.endpoint != 'static'}
+
+    def request(self, endpoint, headers):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(endpoint.path, method=endpoint.method, headers=headers, json=endpoint.body)
+        try:
+            body = response.get_data()
+        finally:
+            # Runs the call_on_close hooks that record metrics (a real server does this)
+            response.close()
+        return response.status_code, len(body), None
+
+    def db_queries(self, endpoint):
+        return self._registry.route_totals(endpoint.rule, endpoint.method)['db_queries']
+
+
+class HTTPTransport:
+    """Sends requests to a running server over one keep-alive connection per thread"""
+
+    def __init__(self, url, server_pid=None):
+        parts = urlsplit(url)
+        self._connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self._netloc = parts.netloc
+        self._prefix = parts.path.rstrip('/')
+        self._local = threading.local()
+        self.rss_pid = server_pid
+
+    def routes(self):
+        return None
+
+    def request(self, endpoint, headers):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connection_class(self._netloc, timeout=60)
+        body = None
+        if endpoint.body is not None:
+            body = json.dumps(endpoint.body).encode('utf-8')
+            headers = dict(headers, **{'Content-Type': 'application/json'})
+        try:
+            connection.request(endpoint.method, self._prefix + endpoint.path, body=body, headers=headers)
+            response = connection.getresponse()
+            data = response.read()
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            self._local.connection = None
+            raise
+        match = _PROFILE_QUERIES_RE.search(response.getheader('X-SQL-Profile') or '')
+        return response.status, len(data), int(match.group(1)) if match else None
+
+    def db_queries(self, endpoint):
+        return None
+
+
+def reset_peak_rss(pid):
+    """Reset the kernel's peak RSS (VmHWM) of `pid`; returns False if that isn't possible"""
+    if pid is None:
+        return False
+    try:
+        with open(f"/proc/{pid}/clear_refs", 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def read_peak_rss_mb(pid, was_reset):
+    if pid is not None:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        return round(int(line.split()[1]) / 1024, 1)
+        except OSError:
+            pass
+    if pid == os.getpid() and not was_reset:
+        # Lifetime peak of this process (kilobytes on Linux, bytes on macOS)
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    return None
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_endpoint(transport, endpoint, tokens, requests, warmup, concurrency, accept_encoding):
+    headers = dict(endpoint.headers)
+    if endpoint.role:
+        headers['Authorization'] = f"Bearer {tokens[endpoint.role]}"
+    if accept_encoding:
+        headers['Accept-Encoding'] = accept_encoding
+
+    for _ in range(warmup):
+        transport.request(endpoint, headers)
+
+    latencies = []
+    statuses = Counter()
+    response_bytes = [0]
+    header_queries = []
+    failures = []
+    lock = threading.Lock()
+
+    def worker(count):
+        for _ in range(count):
+            started = time.perf_counter()
+            try:
+                status, size, queries = transport.request(endpoint, headers)
+            except Exception as e:
+                with lock:
+                    failures.append(str(e))
+                    statuses['exception'] += 1
+                continue
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[str(status)] += 1
+                response_bytes[0] += size
+                if queries is not None:
+                    header_queries.append(queries)
+
+    rss_reset = reset_peak_rss(transport.rss_pid)
+    queries_before = transport.db_queries(endpoint)
+    shares = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+    threads = [threading.Thread(target=worker, args=(share,)) for share in shares if share]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    queries_after = transport.db_queries(endpoint)
+
+    if queries_before is not None and queries_after is not None and requests:
+        db_queries = round((queries_after - queries_before) / requests, 2)
+    elif header_queries:
+        db_queries = round(sum(header_queries) / len(header_queries), 2)
+    else:
+        db_queries = None
+
+    latencies.sort()
+    expected = {str(status) for status in endpoint.expect}
+    errors = sum(count for status, count in statuses.items() if status not in expected)
+    if failures:
+        print(f"  {endpoint.name}: {len(failures)} request(s) raised, e.g. {failures[0]}")
+    return {
+        'method': endpoint.method,
+        'rule': endpoint.rule,
+        'path': endpoint.path,
+        'requests': requests,
+        'concurrency': concurrency,
+        'statuses': dict(statuses),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / wall, 2) if wall else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50) * 1000, 3),
+            'p95': round(percentile(latencies, 0.95) * 1000, 3),
+            'p99': round(percentile(latencies, 0.99) * 1000, 3),
+            'mean': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+            'max': round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+        'avg_response_bytes': round(response_bytes[0] / len(latencies)) if latencies else 0,
+        'db_queries_per_request': db_queries,
+        'peak_rss_mb': read_peak_rss_mb(transport.rss_pid, rss_reset),
+        'peak_rss_per_endpoint': rss_reset,
+    }
+
+
+def ensure_sample_upload(uploads_dir, name=SAMPLE_UPLOAD_NAME):
+    """Create the file served by the /uploads/tax_forms route if it's missing"""
+    path = os.path.join(uploads_dir, name)
+    if os.path.isfile(path):
+        return
+    try:
+        os.makedirs(uploads_dir, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(os.urandom(SAMPLE_UPLOAD_BYTES))
+    except OSError as e:
+        print(f"Could not create {path} ({e}); the uploads endpoint will report errors")
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmarks(transport, endpoints, tokens, requests, warmup, concurrency, accept_encoding, target):
+    report = {
+        'version': REPORT_VERSION,
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'target': target,
+        'requests': requests,
+        'warmup': warmup,
+        'concurrency': concurrency,
+        'accept_encoding': accept_encoding,
+        'endpoints': {},
+    }
+    for endpoint in endpoints:
+        result = run_endpoint(transport, endpoint, tokens, requests, warmup, concurrency, accept_encoding)
+        report['endpoints'][endpoint.name] = result
+        print(format_result(endpoint.name, result))
+    return report
+
+
+def format_result(name, result):
+    latency = result['latency_ms']
+    queries = result['db_queries_per_request']
+    rss = result['peak_rss_mb']
+    return (f"{name:<62} {result['throughput_rps']:9.1f} req/s  p50 {latency['p50']:8.2f}  "
+            f"p95 {latency['p95']:8.2f}  p99 {latency['p99']:8.2f} ms  "
+            f"queries {'-' if queries is None else queries:>6}  rss {'-' if rss is None else rss:>7} MB"
+            + (f"  errors {result['errors']}" if result['errors'] else ''))
+
+
+def compare_reports(report, baseline, tolerance):
+    """List the endpoints that got slower, heavier or started failing relative to `baseline`
+
+    Returns:
+        list: One {'endpoint', 'metric', 'baseline', 'current'} dict per regression.
+    """
+    regressions = []
+
+    def regressed(name, metric, before, after):
+        regressions.append({'endpoint': name, 'metric': metric, 'baseline': before, 'current': after})
+
+    for name, current in report['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if previous is None:
+            continue
+        for key in ('p95', 'p99'):
+            before, after = previous['latency_ms'][key], current['latency_ms'][key]
+            if after > before * (1 + tolerance) and after - before > LATENCY_NOISE_FLOOR_MS:
+                regressed(name, f"latency_ms.{key}", before, after)
+        before, after = previous['throughput_rps'], current['throughput_rps']
+        if before and after < before * (1 - tolerance):
+            regressed(name, 'throughput_rps', before, after)
+        before, after = previous.get('db_queries_per_request'), current.get('db_queries_per_request')
+        if before is not None and after is not None and after >= before + 1:
+            regressed(name, 'db_queries_per_request', before, after)
+        before, after = previous.get('peak_rss_mb'), current.get('peak_rss_mb')
+        if (before and after is not None and previous.get('peak_rss_per_endpoint')
+                and current.get('peak_rss_per_endpoint') and after > before * (1 + tolerance)):
+            regressed(name, 'peak_rss_mb', before, after)
+        if current['errors'] > previous['errors']:
+            regressed(name, 'errors', previous['errors'], current['errors'])
+    return regressions
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Benchmark every API endpoint.')
+    parser.add_argument('--url', help='base URL of a running server (default: in-process Flask test client)')
+    parser.add_argument('--server-pid', type=int, help='pid of the server process, for peak RSS with --url')
+    parser.add_argument('--requests', type=int, default=50, help='measured requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=3, help='unmeasured requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=1, help='threads sending requests')
+    parser.add_argument('--only', help='only run endpoints whose name matches this regex')
+    parser.add_argument('--accept-encoding', default='gzip', help="Accept-Encoding to send ('' for none)")
+    parser.add_argument('--upload-file', default=SAMPLE_UPLOAD_NAME, help='file name under UPLOADS_DIR to fetch')
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--baseline', help='compare against this earlier JSON report')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed relative latency/throughput/RSS change before it counts as a regression')
+    args = parser.parse_args(argv[1:])
+    if args.requests < 1 or args.concurrency < 1:
+        parser.error('--requests and --concurrency must be positive')
+
+    if args.url:
+        transport = HTTPTransport(args.url, args.server_pid)
+    else:
+        transport = TestClientTransport()
+        if args.upload_file == SAMPLE_UPLOAD_NAME:
+            ensure_sample_upload(transport.uploads_dir)
+
+    fixtures = discover_fixtures()
+    tokens = {
+        role: generate_jwt_token(user['id'], user['email'], user['role'])
+        for role, user in (('admin', fixtures['admin']), ('client', fixtures['client']))
+    }
+    endpoints = build_endpoints(fixtures, args.upload_file)
+
+    routes = transport.routes()
+    if routes is not None:
+        missing = routes - {(endpoint.rule, endpoint.method) for endpoint in endpoints}
+        for rule, method in sorted(missing):
+            print(f"Warning: no benchmark for {method} {rule}")
+    if args.only:
+        pattern = re.compile(args.only)
+        endpoints = [endpoint for endpoint in endpoints if pattern.search(endpoint.name)]
+
+    report = run_benchmarks(transport, endpoints, tokens, args.requests, args.warmup, args.concurrency,
+                            args.accept_encoding, args.url or 'test-client')
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_reports(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression['endpoint']}: {regression['metric']} "
+                  f"{regression['baseline']} -> {regression['current']}")
+        print(f"{len(regressions)} regression(s) against {args.baseline} (tolerance {args.tolerance:.0%})")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,110 @@
+"""Benchmark JSON encoding of large payment and appointment lists.
+
+Compares the old approach (a per-row Python conversion loop followed by Flask's
+default provider) with AppJSONProvider on the stdlib encoder and on orjson.
+
+Usage:
+    python benchmarks/bench_json.py [rows] [repeats]
+"""
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from serialization import AppJSONProvider, orjson
+
+
+def make_payments(count):
+    created = datetime(2024, 1, 1, 9, 30)
+    return [{
+        'id': i,
+        'user_id': i % 500,
+        'form_id': i,
+        'form_type': 'individual_tax',
+        'form_type_name': 'individual_tax',
+        'amount': Decimal('1499.00') + i % 100,
+        'payment_status': 'completed' if i % 3 else 'pending',
+        'payment_method': 'card',
+        'transaction_id': f"txn_{i:010d}",
+        'payment_date': created + timedelta(minutes=i),
+        'created_at': created + timedelta(minutes=i),
+        'updated_at': created + timedelta(minutes=i, seconds=30),
+    } for i in range(count)]
+
+
+def make_appointments(count):
+    return [{
+        'id': i,
+        'user_id': i % 500,
+        'service_id': i % 12,
+        'appointment_date': date(2024, 1, 1) + timedelta(days=i % 365),
+        'appointment_time': timedelta(hours=9 + i % 8, minutes=30 * (i % 2)),
+        'end_time': timedelta(hours=10 + i % 8, minutes=30 * (i % 2)),
+        'status': 'confirmed',
+        'notes': 'Follow-up on lodgement',
+        'created_at': datetime(2023, 12, 1, 8) + timedelta(minutes=i),
+        'updated_at': datetime(2023, 12, 1, 8) + timedelta(minutes=i),
+    } for i in range(count)]
+
+
+def legacy_format_payment(payment):
+    if isinstance(payment['amount'], Decimal):
+        payment['amount'] = float(payment['amount'])
+    for key in ('payment_date', 'created_at', 'updated_at'):
+        if payment.get(key):
+            payment[key] = payment[key].isoformat()
+    return payment
+
+
+def legacy_format_appointment(appointment):
+    for k, v in appointment.items():
+        if isinstance(v, timedelta):
+            appointment[k] = str(v)
+    return appointment
+
+
+def legacy_encode(provider, rows, formatter):
+    # The old code converted copies of the rows in place before jsonify
+    return provider.dumps([formatter(dict(row)) for row in rows]).encode('utf-8')
+
+
+def timed(fn, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(argv):
+    rows = int(argv[1]) if len(argv) > 1 else 50000
+    repeats = int(argv[2]) if len(argv) > 2 else 5
+    app = Flask(__name__)
+    default_provider = DefaultJSONProvider(app)
+    stdlib_provider = AppJSONProvider(app, use_orjson=False)
+    orjson_provider = AppJSONProvider(app, use_orjson=True) if orjson is not None else None
+
+    datasets = [
+        ('payments', make_payments(rows), legacy_format_payment),
+        ('appointments', make_appointments(rows), legacy_format_appointment),
+    ]
+    print(f"{rows} rows, best of {repeats}")
+    for name, data, formatter in datasets:
+        results = [('legacy loop + default', timed(lambda: legacy_encode(default_provider, data, formatter), repeats))]
+        results.append(('AppJSONProvider (json)', timed(lambda: stdlib_provider.dumps_bytes(data), repeats)))
+        if orjson_provider is not None:
+            results.append(('AppJSONProvider (orjson)', timed(lambda: orjson_provider.dumps_bytes(data), repeats)))
+        baseline = results[0][1]
+        for label, seconds in results:
+            print(f"  {name:<13} {label:<26} {seconds * 1000:9.1f} ms  {baseline / seconds:5.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
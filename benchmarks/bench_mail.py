@@ -0,0 +1,191 @@
+"""Exercise the outbound mail queue (mailer.py) against a local SMTP stand-in.
+
+Starts an SMTP server on 127.0.0.1 that accepts every message (aiosmtpd when installed,
+`pip install aiosmtpd`; otherwise the stdlib smtpd module of Python 3.11 and older), and
+checks that:
+
+- every queued message arrives, over at most one SMTP session per sender thread
+- a delivery refused with a transient 451 is retried and then arrives
+- enqueue() raises MailQueueFull once the queue is at capacity
+
+Exits non-zero if a check fails.
+
+Usage:
+    python benchmarks/bench_mail.py [messages] [senders]
+"""
+import os
+import socket
+import sys
+import threading
+import time
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mailer import MailQueue, MailQueueFull
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:  # optional: fall back to the stdlib server
+    Controller = None
+
+FLUSH_TIMEOUT = 30.0
+
+
+class Inbox:
+    """Messages the stand-in accepted; refuses the first `refuse` deliveries with a 451"""
+
+    def __init__(self, refuse=0):
+        self.refuse = refuse
+        self.messages = []
+        self._lock = threading.Lock()
+
+    def receive(self, recipients, data):
+        with self._lock:
+            if self.refuse:
+                self.refuse -= 1
+                return '451 Try again later'
+            self.messages.append((recipients, data))
+            return '250 OK'
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class _AiosmtpdHandler:
+    def __init__(self, inbox):
+        self.inbox = inbox
+
+    async def handle_DATA(self, server, session, envelope):
+        return self.inbox.receive(envelope.rcpt_tos, envelope.content)
+
+
+class SMTPStandIn:
+    """Local SMTP server feeding an Inbox; use as a context manager"""
+
+    def __init__(self, inbox):
+        self.inbox = inbox
+        self.host = '127.0.0.1'
+        self.port = _free_port()
+        self._stop = None
+
+    def __enter__(self):
+        if Controller is not None:
+            controller = Controller(_AiosmtpdHandler(self.inbox), hostname=self.host, port=self.port)
+            controller.start()
+            self._stop = controller.stop
+        else:
+            self._stop = self._start_stdlib()
+        return self
+
+    def _start_stdlib(self):
+        import warnings
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            import asyncore
+            import smtpd
+
+        inbox = self.inbox
+
+        class Server(smtpd.SMTPServer):
+            def process_message(self, peer, mailfrom, rcpttos, data, **kwargs):
+                response = inbox.receive(rcpttos, data)
+                # smtpd answers 250 itself when process_message returns None
+                return None if response.startswith('250') else response
+
+        server = Server((self.host, self.port), None, decode_data=False)
+        stopping = threading.Event()
+
+        def loop():
+            while not stopping.is_set():
+                asyncore.loop(timeout=0.05, count=1)
+
+        thread = threading.Thread(target=loop, name='smtp-stand-in', daemon=True)
+        thread.start()
+
+        def stop():
+            stopping.set()
+            thread.join()
+            server.close()
+        return stop
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stop()
+
+
+def make_queue(server, senders, **kwargs):
+    return MailQueue(server.host, server.port, None, None, use_tls=False, use_auth=False,
+                     senders=senders, retry_backoff=0.05, idle_timeout=5.0, smtp_timeout=5.0, **kwargs)
+
+
+def make_message(i):
+    msg = MIMEText(f"Message {i}")
+    msg['Subject'] = f"Queue check {i}"
+    msg['From'] = 'noreply@example.com'
+    msg['To'] = f"user{i}@example.com"
+    return msg.as_string()
+
+
+def check_delivery(messages, senders):
+    inbox = Inbox()
+    with SMTPStandIn(inbox) as server:
+        mail_queue = make_queue(server, senders)
+        started = time.perf_counter()
+        for i in range(messages):
+            mail_queue.enqueue('noreply@example.com', [f"user{i}@example.com"], make_message(i))
+        drained = mail_queue.flush(FLUSH_TIMEOUT)
+        seconds = time.perf_counter() - started
+        stats = mail_queue.stats()
+    print(f"delivery: {len(inbox.messages)}/{messages} received in {seconds:.3f}s "
+          f"({messages / seconds:.0f} msg/s), {stats['connections_opened']} SMTP session(s), "
+          f"{stats['batches']} batch(es)")
+    return (drained and len(inbox.messages) == messages and stats['sent'] == messages
+            and stats['connections_opened'] <= senders)
+
+
+def check_retry():
+    inbox = Inbox(refuse=1)
+    with SMTPStandIn(inbox) as server:
+        mail_queue = make_queue(server, 1)
+        mail_queue.enqueue('noreply@example.com', ['retry@example.com'], make_message('retry'))
+        drained = mail_queue.flush(FLUSH_TIMEOUT)
+        stats = mail_queue.stats()
+    print(f"retry: {stats['retried']} retried, {stats['sent']} sent, {stats['failed']} failed")
+    return drained and stats['retried'] == 1 and stats['sent'] == 1 and len(inbox.messages) == 1
+
+
+def check_queue_full():
+    inbox = Inbox()
+    with SMTPStandIn(inbox) as server:
+        # No sender threads, so nothing drains the queue
+        mail_queue = make_queue(server, 0, max_queue=3)
+        for i in range(3):
+            mail_queue.enqueue('noreply@example.com', [f"user{i}@example.com"], make_message(i))
+        try:
+            mail_queue.enqueue('noreply@example.com', ['overflow@example.com'], make_message('overflow'))
+        except MailQueueFull:
+            rejected = True
+        else:
+            rejected = False
+    print(f"queue full: {'MailQueueFull raised' if rejected else 'no MailQueueFull'}, "
+          f"{mail_queue.stats()['rejected']} rejected")
+    return rejected
+
+
+def main(argv):
+    messages = int(argv[1]) if len(argv) > 1 else 200
+    senders = int(argv[2]) if len(argv) > 2 else 2
+    print(f"SMTP stand-in: {'aiosmtpd' if Controller is not None else 'stdlib smtpd'}")
+    results = [check_delivery(messages, senders), check_retry(), check_queue_full()]
+    if not all(results):
+        print("FAILED")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,463 @@
+"""Seed a local MySQL/MariaDB with synthetic data for the endpoint benchmarks.
+
+Creates the tables the API reads (if missing) and fills them with deterministic fake
+users, tax forms, tax form files (with realistically sized blobs), payments,
+appointments and notifications. The row counts grow linearly with the scale factor.
+Afterwards the analytics rollups are rebuilt and the indexes from db_indexes.py applied.
+
+The connection comes from the usual MYSQL_* variables. Point them at a throwaway
+database: --reset drops and recreates every seeded table.
+
+Usage:
+    python benchmarks/seed.py [--scale 1] [--blob-scale 1.0] [--seed 42] [--reset]
+"""
+import argparse
+import base64
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bcrypt
+from utils import get_db_connection
+
+# Credentials of the seeded admin; bench_endpoints.py logs in with them
+BENCH_ADMIN_EMAIL = 'bench-admin@example.com'
+BENCH_PASSWORD = 'benchmark-password'
+
+# Rows per unit of scale
+CLIENTS_PER_SCALE = 100
+FORMS_PER_CLIENT = (0, 4)
+FILES_PER_FORM = (0, 3)
+APPOINTMENTS_PER_CLIENT = (0, 3)
+NOTIFICATIONS_PER_CLIENT = (2, 15)
+
+FORM_TYPES = ['individual_tax', 'business_tax', 'company_tax', 'trust_tax', 'smsf_tax']
+FORM_STATUSES = ['draft', 'submitted', 'in_review', 'completed']
+PAYMENT_STATUSES = ['completed', 'completed', 'completed', 'pending', 'failed']
+PAYMENT_METHODS = ['card', 'bank_transfer', 'paypal']
+APPOINTMENT_STATUSES = ['confirmed', 'confirmed', 'pending', 'cancelled', 'completed']
+NOTIFICATION_TYPES = ['form_submitted', 'payment_received', 'appointment_booked', 'document_uploaded']
+
+# (content type, extension, form field, median size in KB); sizes are log-normal around the median
+FILE_KINDS = [
+    ('application/pdf', 'pdf', 'payg_summary', 180),
+    ('application/pdf', 'pdf', 'bank_statement', 420),
+    ('image/jpeg', 'jpg', 'receipt_photo', 900),
+    ('image/png', 'png', 'id_document', 350),
+]
+BLOB_SIZE_SIGMA = 0.8
+MIN_BLOB_BYTES = 4 * 1024
+MAX_BLOB_BYTES = 8 * 1024 * 1024
+
+# Rows per executemany() call, and a cap on blob bytes per call (below max_allowed_packet)
+INSERT_BATCH_SIZE = 1000
+BLOB_BATCH_BYTES = 16 * 1024 * 1024
+
+SERVICES = [
+    ('Individual tax return', '01:00:00'),
+    ('Business consultation', '01:30:00'),
+    ('BAS lodgement review', '00:45:00'),
+    ('SMSF audit preparation', '02:00:00'),
+    ('Bookkeeping check-in', '00:30:00'),
+]
+
+SCHEMA_DDL = {
+    'users': """
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            email VARCHAR(255) NOT NULL UNIQUE,
+            phone VARCHAR(50),
+            address TEXT,
+            role VARCHAR(20) NOT NULL DEFAULT 'client',
+            is_verified BOOLEAN NOT NULL DEFAULT FALSE,
+            password VARCHAR(255) NOT NULL,
+            reset_token VARCHAR(255),
+            reset_token_expiry DATETIME,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """,
+    'tax_forms': """
+        CREATE TABLE IF NOT EXISTS tax_forms (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            form_type VARCHAR(64) NOT NULL,
+            form_data JSON,
+            status VARCHAR(32) NOT NULL DEFAULT 'draft',
+            notes TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            KEY idx_tax_forms_user (user_id),
+            KEY idx_tax_forms_type (form_type)
+        )
+    """,
+    'tax_form_files': """
+        CREATE TABLE IF NOT EXISTS tax_form_files (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            tax_form_id INT NOT NULL,
+            file_name VARCHAR(255) NOT NULL,
+            file_type VARCHAR(255),
+            file_size BIGINT,
+            field_name VARCHAR(255),
+            file_blobs LONGBLOB,
+            blob_sha256 CHAR(64),
+            content_sha256 CHAR(64),
+            content_updated_at DATETIME,
+            files JSON,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            KEY idx_tax_form_files_form (tax_form_id)
+        )
+    """,
+    'form_payments': """
+        CREATE TABLE IF NOT EXISTS form_payments (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            form_id INT,
+            form_type VARCHAR(64),
+            amount DECIMAL(10, 2) NOT NULL,
+            payment_status VARCHAR(32) NOT NULL,
+            payment_method VARCHAR(32),
+            transaction_id VARCHAR(64),
+            payment_date DATETIME,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """,
+    'appointments': """
+        CREATE TABLE IF NOT EXISTS appointments (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            service_id INT NOT NULL,
+            appointment_date DATE NOT NULL,
+            appointment_time TIME NOT NULL,
+            status VARCHAR(32) NOT NULL,
+            notes TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """,
+    'notifications': """
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT,
+            type VARCHAR(64),
+            title VARCHAR(255),
+            message TEXT,
+            metadata JSON,
+            is_read BOOLEAN NOT NULL DEFAULT FALSE,
+            is_archived BOOLEAN NOT NULL DEFAULT FALSE,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+    'services': """
+        CREATE TABLE IF NOT EXISTS services (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            duration TIME NOT NULL
+        )
+    """,
+    'booking_config': """
+        CREATE TABLE IF NOT EXISTS booking_config (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            working_hours_start TIME NOT NULL,
+            working_hours_end TIME NOT NULL,
+            slot_duration INT NOT NULL,
+            buffer_between_appointments INT NOT NULL,
+            max_advance_booking_days INT NOT NULL,
+            min_advance_booking_hours INT NOT NULL,
+            max_appointments_per_day INT NOT NULL,
+            max_appointments_per_user INT NOT NULL,
+            allowed_booking_days JSON,
+            holidays JSON,
+            timezone VARCHAR(64) NOT NULL
+        )
+    """,
+    'form_pricing_configs': """
+        CREATE TABLE IF NOT EXISTS form_pricing_configs (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            form_type VARCHAR(64) NOT NULL UNIQUE,
+            pricing_options JSON,
+            add_ons JSON,
+            gst_rate DECIMAL(5, 2) NOT NULL DEFAULT 10,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """,
+}
+
+
+class BlobSource:
+    """Incompressible file content sliced out of one random buffer
+
+    Real uploads are PDFs and images, which don't compress, so neither may the fixtures.
+    """
+
+    def __init__(self, rng, size=MAX_BLOB_BYTES):
+        self._buffer = rng.randbytes(size)
+        self._rng = rng
+
+    def take(self, length):
+        start = self._rng.randrange(0, len(self._buffer) - length + 1)
+        return self._buffer[start:start + length]
+
+
+def blob_size(rng, median_kb, blob_scale):
+    size = int(rng.lognormvariate(0, BLOB_SIZE_SIGMA) * median_kb * 1024 * blob_scale)
+    return max(MIN_BLOB_BYTES, min(MAX_BLOB_BYTES, size))
+
+
+def random_datetime(rng, start, end):
+    return start + timedelta(seconds=rng.randrange(int((end - start).total_seconds())))
+
+
+def insert_rows(cursor, table, columns, rows):
+    placeholders = ', '.join(['%s'] * len(columns))
+    cursor.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows
+    )
+
+
+def create_schema(cursor, reset=False):
+    if reset:
+        for table in reversed(list(SCHEMA_DDL)):
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    for ddl in SCHEMA_DDL.values():
+        cursor.execute(ddl)
+
+
+def seed_reference_data(cursor):
+    """Services, the booking config and one pricing config per form type"""
+    cursor.execute("SELECT COUNT(*) FROM services")
+    if not cursor.fetchone()[0]:
+        insert_rows(cursor, 'services', ['name', 'duration'], SERVICES)
+    cursor.execute("SELECT COUNT(*) FROM booking_config")
+    if not cursor.fetchone()[0]:
+        insert_rows(cursor, 'booking_config', [
+            'working_hours_start', 'working_hours_end', 'slot_duration', 'buffer_between_appointments',
+            'max_advance_booking_days', 'min_advance_booking_hours', 'max_appointments_per_day',
+            'max_appointments_per_user', 'allowed_booking_days', 'holidays', 'timezone'
+        ], [('09:00:00', '17:00:00', 30, 15, 60, 24, 16, 3,
+             json.dumps(['monday', 'tuesday', 'wednesday', 'thursday', 'friday']),
+             json.dumps(['2025-12-25', '2026-01-01']), 'Australia/Sydney')])
+    rows = []
+    for index, form_type in enumerate(FORM_TYPES):
+        base = 150 + 100 * index
+        options = [
+            {'id': 'basic', 'name': 'Basic', 'price': base},
+            {'id': 'standard', 'name': 'Standard', 'price': base + 120},
+            {'id': 'premium', 'name': 'Premium', 'price': base + 300},
+        ]
+        add_ons = [
+            {'id': 'express', 'name': 'Express processing', 'price': 79},
+            {'id': 'review', 'name': 'Accountant review', 'price': 149},
+            {'id': 'amendment', 'name': 'Prior-year amendment', 'price': 199},
+        ]
+        rows.append((form_type, json.dumps(options), json.dumps(add_ons), 10))
+    cursor.executemany(
+        "INSERT IGNORE INTO form_pricing_configs (form_type, pricing_options, add_ons, gst_rate) "
+        "VALUES (%s, %s, %s, %s)", rows
+    )
+
+
+def seed(scale=1.0, blob_scale=1.0, seed_value=42, reset=False):
+    """Create the schema and insert scale * CLIENTS_PER_SCALE clients with their data
+
+    Returns:
+        dict: Number of rows inserted per table (plus total blob bytes).
+    """
+    rng = random.Random(seed_value)
+    now = datetime.now().replace(microsecond=0)
+    history_start = now - timedelta(days=730)
+    clients = max(1, int(round(scale * CLIENTS_PER_SCALE)))
+    password_hash = bcrypt.hashpw(BENCH_PASSWORD.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    counts = {}
+
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("No database connection available (check the MYSQL_* variables)")
+    cursor = conn.cursor()
+    try:
+        create_schema(cursor, reset=reset)
+        seed_reference_data(cursor)
+        cursor.execute("SELECT id FROM services ORDER BY id")
+        service_ids = [row[0] for row in cursor.fetchall()]
+        conn.commit()
+
+        # Users; a run tag keeps emails unique when seeding into a non-empty database
+        run_tag = f"{seed_value}-{int(time.time())}"
+        cursor.execute("SELECT id FROM users WHERE email = %s", (BENCH_ADMIN_EMAIL,))
+        if cursor.fetchone() is None:
+            insert_rows(cursor, 'users', ['name', 'email', 'role', 'is_verified', 'password', 'created_at'],
+                        [('Benchmark Admin', BENCH_ADMIN_EMAIL, 'admin', True, password_hash, history_start)])
+        user_rows = []
+        for i in range(clients):
+            created = random_datetime(rng, history_start, now)
+            user_rows.append((
+                f"Client {i}", f"client-{run_tag}-{i}@example.com", f"04{rng.randrange(10 ** 8):08d}",
+                f"{rng.randrange(1, 400)} Example Street, Sydney NSW 2000", 'client',
+                rng.random() < 0.9, password_hash, created, created,
+            ))
+        for start in range(0, len(user_rows), INSERT_BATCH_SIZE):
+            insert_rows(cursor, 'users', [
+                'name', 'email', 'phone', 'address', 'role', 'is_verified', 'password', 'created_at', 'updated_at'
+            ], user_rows[start:start + INSERT_BATCH_SIZE])
+        conn.commit()
+        cursor.execute("SELECT id, created_at FROM users WHERE email LIKE %s ORDER BY id", (f"client-{run_tag}-%",))
+        users = cursor.fetchall()
+        counts['users'] = len(users)
+
+        # Tax forms
+        form_rows = []
+        for user_id, user_created in users:
+            for _ in range(rng.randint(*FORMS_PER_CLIENT)):
+                created = random_datetime(rng, user_created, now)
+                form_type = rng.choice(FORM_TYPES)
+                form_data = {
+                    'financial_year': f"{created.year - 1}-{created.year}",
+                    'income': {'salary': rng.randrange(40000, 250000), 'interest': rng.randrange(0, 5000)},
+                    'deductions': [{'category': 'work_related', 'amount': rng.randrange(50, 3000)}
+                                   for _ in range(rng.randint(0, 6))],
+                    'declaration': True,
+                }
+                form_rows.append((user_id, form_type, json.dumps(form_data), rng.choice(FORM_STATUSES),
+                                  'Synthetic benchmark form', created, created))
+        for start in range(0, len(form_rows), INSERT_BATCH_SIZE):
+            insert_rows(cursor, 'tax_forms', [
+                'user_id', 'form_type', 'form_data', 'status', 'notes', 'created_at', 'updated_at'
+            ], form_rows[start:start + INSERT_BATCH_SIZE])
+        conn.commit()
+        cursor.execute(
+            "SELECT id, user_id, form_type, created_at FROM tax_forms WHERE user_id BETWEEN %s AND %s ORDER BY id",
+            (users[0][0], users[-1][0])
+        )
+        forms = cursor.fetchall()
+        counts['tax_forms'] = len(forms)
+
+        # Tax form files: the raw bytes in file_blobs, and a one-element files JSON with the base64 copy
+        blobs = BlobSource(rng)
+        batch, batch_bytes, files, blob_bytes = [], 0, 0, 0
+        for form_id, _, _, _ in forms:
+            for index in range(rng.randint(*FILES_PER_FORM)):
+                file_type, extension, field_name, median_kb = rng.choice(FILE_KINDS)
+                content = blobs.take(blob_size(rng, median_kb, blob_scale))
+                file_name = f"{field_name}_{form_id}_{index}.{extension}"
+                manifest = [{
+                    'file_name': file_name, 'file_type': file_type, 'file_size': len(content),
+                    'field_name': field_name, 'file_blob': base64.b64encode(content).decode('ascii'),
+                }]
+                batch.append((form_id, file_name, file_type, len(content), field_name, content, json.dumps(manifest)))
+                batch_bytes += len(content) * 7 // 3
+                files += 1
+                blob_bytes += len(content)
+                if batch_bytes >= BLOB_BATCH_BYTES:
+                    insert_rows(cursor, 'tax_form_files', [
+                        'tax_form_id', 'file_name', 'file_type', 'file_size', 'field_name', 'file_blobs', 'files'
+                    ], batch)
+                    conn.commit()
+                    batch, batch_bytes = [], 0
+        if batch:
+            insert_rows(cursor, 'tax_form_files', [
+                'tax_form_id', 'file_name', 'file_type', 'file_size', 'field_name', 'file_blobs', 'files'
+            ], batch)
+            conn.commit()
+        counts['tax_form_files'] = files
+        counts['blob_bytes'] = blob_bytes
+
+        # Payments: most forms are paid for at least once, some retried after a failure
+        payment_rows = []
+        for form_id, user_id, form_type, form_created in forms:
+            for _ in range(rng.choice([0, 1, 1, 1, 2])):
+                paid = random_datetime(rng, form_created, now + timedelta(seconds=1))
+                status = rng.choice(PAYMENT_STATUSES)
+                payment_rows.append((
+                    user_id, form_id, form_type, f"{rng.randrange(15000, 90000) / 100:.2f}", status,
+                    rng.choice(PAYMENT_METHODS), f"txn_{rng.getrandbits(48):012x}",
+                    paid if status == 'completed' else None, paid, paid,
+                ))
+        for start in range(0, len(payment_rows), INSERT_BATCH_SIZE):
+            insert_rows(cursor, 'form_payments', [
+                'user_id', 'form_id', 'form_type', 'amount', 'payment_status', 'payment_method',
+                'transaction_id', 'payment_date', 'created_at', 'updated_at'
+            ], payment_rows[start:start + INSERT_BATCH_SIZE])
+        conn.commit()
+        counts['form_payments'] = len(payment_rows)
+
+        # Appointments: mostly past, some upcoming so the dashboard has something to show
+        appointment_rows = []
+        today = date.today()
+        for user_id, user_created in users:
+            for _ in range(rng.randint(*APPOINTMENTS_PER_CLIENT)):
+                day = today + timedelta(days=rng.randrange(-180, 60))
+                slot = timedelta(hours=9, minutes=30 * rng.randrange(16))
+                created = random_datetime(rng, user_created, now)
+                appointment_rows.append((user_id, rng.choice(service_ids), day, str(slot),
+                                         rng.choice(APPOINTMENT_STATUSES), 'Synthetic benchmark booking',
+                                         created, created))
+        for start in range(0, len(appointment_rows), INSERT_BATCH_SIZE):
+            insert_rows(cursor, 'appointments', [
+                'user_id', 'service_id', 'appointment_date', 'appointment_time', 'status', 'notes',
+                'created_at', 'updated_at'
+            ], appointment_rows[start:start + INSERT_BATCH_SIZE])
+        conn.commit()
+        counts['appointments'] = len(appointment_rows)
+
+        # Notifications
+        notification_rows = []
+        for user_id, user_created in users:
+            for _ in range(rng.randint(*NOTIFICATIONS_PER_CLIENT)):
+                kind = rng.choice(NOTIFICATION_TYPES)
+                notification_rows.append((
+                    user_id, kind, kind.replace('_', ' ').capitalize(), f"Synthetic {kind} notification",
+                    json.dumps({'source': 'benchmark', 'reference': rng.randrange(10 ** 6)}),
+                    rng.random() < 0.6, rng.random() < 0.1, random_datetime(rng, user_created, now),
+                ))
+        for start in range(0, len(notification_rows), INSERT_BATCH_SIZE):
+            insert_rows(cursor, 'notifications', [
+                'user_id', 'type', 'title', 'message', 'metadata', 'is_read', 'is_archived', 'created_at'
+            ], notification_rows[start:start + INSERT_BATCH_SIZE])
+        conn.commit()
+        counts['notifications'] = len(notification_rows)
+        return counts
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Seed synthetic benchmark data.')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help=f"scale factor; 1 = {CLIENTS_PER_SCALE} clients and their forms, files, payments, ...")
+    parser.add_argument('--blob-scale', type=float, default=1.0, help='multiplier on the file blob sizes')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    parser.add_argument('--reset', action='store_true', help='drop and recreate the seeded tables first')
+    parser.add_argument('--skip-indexes', action='store_true', help="don't apply db_indexes.INDEXES")
+    args = parser.parse_args(argv[1:])
+
+    started = time.perf_counter()
+    counts = seed(scale=args.scale, blob_scale=args.blob_scale, seed_value=args.seed, reset=args.reset)
+    print(f"Seeded in {time.perf_counter() - started:.1f}s: "
+          + ', '.join(f"{table}={count}" for table, count in counts.items()))
+
+    from analytics import rebuild_rollups
+    rebuild_rollups()
+    from blob_migration import ensure_content_digest, backfill_content_digests
+    ensure_content_digest()
+    backfill_content_digests()
+    if not args.skip_indexes:
+        from db_indexes import apply_indexes
+        created = apply_indexes()
+        print(f"Created {len(created)} index(es): {', '.join(created) or 'none'}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
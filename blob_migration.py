@@ -0,0 +1,429 @@
+"""Move tax form file contents out of MySQL into the content-addressed blob store (blob_store.py).
+
+Afterwards each tax_form_files row keeps only digest references. file_blobs is
+replaced by the blob_sha256 column, and each entry of the files JSON has its base64
+file_blob replaced by a blob_sha256 key. The API reads both layouts, so the migration
+runs online next to it, one short transaction per row:
+
+1. read the row and write its content to the blob store (fsynced, deduplicated)
+2. re-read each stored blob and check that it hashes to its digest
+3. update the row only if it still holds the content that was copied. MySQL computes
+   SHA2(file_blobs, 256) itself, so the database confirms the checksum as well
+
+A row the API changed in the meantime is left alone and picked up by the next run.
+Migrated rows no longer match the pending filter, so an interrupted run is resumed by
+starting it again; --start-id skips ahead to the last id a run reported.
+
+The blob endpoint treats a missing blob_sha256 column as "nothing migrated yet"; `prepare`
+adds it, and `migrate` needs it. `prepare` also adds content_sha256 / content_updated_at,
+which triggers keep current on every write: the endpoint's ETag and Last-Modified for
+content still in MySQL. Rows without a stored digest are hashed per request until the
+backfill reaches them.
+
+Usage:
+    python blob_migration.py prepare   # add blob_sha256 and the content digest columns, backfill the digests
+    python blob_migration.py migrate [--batch-size N] [--pause SECONDS] [--start-id ID] [--limit N]
+    python blob_migration.py verify [--start-id ID]   # re-hash every referenced blob
+    python blob_migration.py status
+"""
+import argparse
+import base64
+import binascii
+import json
+import sys
+import time
+from mysql.connector import Error
+from blob_store import blob_store
+from config import Config
+from utils import get_db_connection
+
+# Rows that still hold file content in MySQL
+PENDING_FILTER = """(file_blobs IS NOT NULL
+    OR (JSON_VALID(files) AND JSON_CONTAINS_PATH(files, 'one', '$[*].file_blob')))"""
+
+# Rows that reference at least one blob
+MIGRATED_FILTER = """(blob_sha256 IS NOT NULL
+    OR (JSON_VALID(files) AND JSON_CONTAINS_PATH(files, 'one', '$[*].blob_sha256')))"""
+
+
+class BlobVerificationError(Exception):
+    """Raised when a blob read back from the store doesn't hash to its digest"""
+
+
+def _connect():
+    conn = get_db_connection()
+    if not conn:
+        raise Error(msg="No database connection available")
+    return conn
+
+
+def _as_text(value):
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).decode('utf-8')
+    return value
+
+
+def ensure_blob_column():
+    """Add tax_form_files.blob_sha256 if it doesn't exist yet
+
+    The nullable column is appended at the end of the table, which MySQL 8 and MariaDB
+    10.3+ do in place without copying the table.
+
+    Returns:
+        bool: True if the column was added.
+    """
+    conn = _connect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'tax_form_files' AND COLUMN_NAME = 'blob_sha256'
+        """)
+        if cursor.fetchone()[0]:
+            return False
+        print("Adding column tax_form_files.blob_sha256")
+        cursor.execute("ALTER TABLE tax_form_files ADD COLUMN blob_sha256 CHAR(64) NULL")
+        return True
+    finally:
+        cursor.close()
+        conn.close()
+
+
+# Keep content_sha256 / content_updated_at in step with file_blobs on every write, so
+# readers get a stored validator instead of hashing the LONGBLOB per request. A write
+# that leaves file_blobs unchanged keeps whatever the statement set (the backfill sets them).
+CONTENT_DIGEST_TRIGGERS = {
+    'tax_form_files_content_insert': """
+        CREATE TRIGGER tax_form_files_content_insert BEFORE INSERT ON tax_form_files FOR EACH ROW
+        SET NEW.content_sha256 = SHA2(NEW.file_blobs, 256),
+            NEW.content_updated_at = IF(NEW.file_blobs IS NULL, NULL, NOW())
+    """,
+    'tax_form_files_content_update': """
+        CREATE TRIGGER tax_form_files_content_update BEFORE UPDATE ON tax_form_files FOR EACH ROW
+        SET NEW.content_sha256 = IF(OLD.file_blobs <=> NEW.file_blobs, NEW.content_sha256, SHA2(NEW.file_blobs, 256)),
+            NEW.content_updated_at = IF(OLD.file_blobs <=> NEW.file_blobs, NEW.content_updated_at, NOW())
+    """,
+}
+
+
+def ensure_content_digest():
+    """Add tax_form_files.content_sha256 / content_updated_at and (re)install their triggers
+
+    Like blob_sha256, the nullable columns are appended in place.
+
+    Returns:
+        list: Names of the columns that were added.
+    """
+    conn = _connect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT COLUMN_NAME FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'tax_form_files'
+                AND COLUMN_NAME IN ('content_sha256', 'content_updated_at')
+        """)
+        existing = {_as_text(row[0]) for row in cursor.fetchall()}
+        added = []
+        for column, definition in (('content_sha256', 'CHAR(64) NULL'), ('content_updated_at', 'DATETIME NULL')):
+            if column not in existing:
+                print(f"Adding column tax_form_files.{column}")
+                cursor.execute(f"ALTER TABLE tax_form_files ADD COLUMN {column} {definition}")
+                added.append(column)
+        for name, ddl in CONTENT_DIGEST_TRIGGERS.items():
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(ddl)
+        return added
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def backfill_content_digests(batch_size=Config.BLOB_MIGRATION_BATCH_SIZE, pause=Config.BLOB_MIGRATION_PAUSE):
+    """Store content_sha256 for rows written before the triggers existed, batch by batch
+
+    Each batch is one short transaction in which MySQL hashes the rows itself.
+
+    Returns:
+        int: Number of rows updated.
+    """
+    conn = _connect()
+    cursor = conn.cursor()
+    total = 0
+    try:
+        while True:
+            cursor.execute(
+                """
+                UPDATE tax_form_files
+                SET content_sha256 = SHA2(file_blobs, 256), content_updated_at = COALESCE(content_updated_at, NOW())
+                WHERE content_sha256 IS NULL AND file_blobs IS NOT NULL
+                ORDER BY id
+                LIMIT %s
+                """,
+                (batch_size,)
+            )
+            updated = cursor.rowcount
+            conn.commit()
+            total += updated
+            if updated < batch_size:
+                return total
+            print(f"Stored content digests for {total} row(s)")
+            if pause:
+                time.sleep(pause)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _store_verified(store, data, counts):
+    """Write `data` to the store, read it back and check its digest"""
+    digest, size, created = store.put_bytes(data)
+    if not store.verify(digest):
+        raise BlobVerificationError(f"blob {digest} failed verification after writing")
+    counts['blobs'] += 1
+    counts['bytes'] += size
+    if not created:
+        counts['deduplicated'] += 1
+    return digest
+
+
+def migrate_row(conn, row_id, store=blob_store):
+    """Move one row's content to the blob store
+
+    Returns:
+        tuple: (outcome, counts). outcome is 'migrated', 'changed' (modified
+        concurrently, left for the next run) or 'skipped' (nothing to move, or the row
+        is gone). counts has the blobs written, deduplicated blobs and bytes.
+    """
+    counts = {'blobs': 0, 'deduplicated': 0, 'bytes': 0}
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT file_blobs, files FROM tax_form_files WHERE id = %s", (row_id,))
+        row = cursor.fetchone()
+        conn.commit()
+        if row is None:
+            return 'skipped', counts
+        file_blobs, files = row
+
+        assignments, assignment_params = [], []
+        guards, guard_params = [], []
+        if file_blobs is not None:
+            digest = _store_verified(store, bytes(file_blobs), counts)
+            assignments += ["blob_sha256 = %s", "file_blobs = NULL"]
+            assignment_params.append(digest)
+            guards.append("SHA2(file_blobs, 256) = %s")
+            guard_params.append(digest)
+
+        files_text = _as_text(files)
+        try:
+            entries = json.loads(files_text) if files_text else None
+        except ValueError:
+            entries = None
+        if isinstance(entries, list) and any(isinstance(e, dict) and 'file_blob' in e for e in entries):
+            for entry in entries:
+                if not isinstance(entry, dict) or 'file_blob' not in entry:
+                    continue
+                file_blob = entry.pop('file_blob')
+                if file_blob is None:
+                    continue
+                try:
+                    data = base64.b64decode(file_blob, validate=True)
+                except (binascii.Error, TypeError) as e:
+                    raise ValueError(f"invalid base64 in files entry '{entry.get('file_name')}': {e}")
+                entry['blob_sha256'] = _store_verified(store, data, counts)
+                entry.setdefault('file_size', len(data))
+            assignments.append("files = %s")
+            assignment_params.append(json.dumps(entries))
+            # Compared as JSON values, so this works for JSON and TEXT columns alike
+            guards.append("JSON_EXTRACT(files, '$') = CAST(%s AS JSON)")
+            guard_params.append(files_text)
+
+        if not assignments:
+            return 'skipped', counts
+        cursor.execute(
+            f"UPDATE tax_form_files SET {', '.join(assignments)} WHERE id = %s AND {' AND '.join(guards)}",
+            (*assignment_params, row_id, *guard_params)
+        )
+        updated = cursor.rowcount
+        conn.commit()
+        return ('migrated' if updated else 'changed'), counts
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def migrate(batch_size=Config.BLOB_MIGRATION_BATCH_SIZE, pause=Config.BLOB_MIGRATION_PAUSE,
+            start_id=0, limit=None, store=blob_store):
+    """Migrate pending rows with id > start_id in id order, batch by batch
+
+    Each batch only looks up the ids of pending rows; rows are then read and updated one
+    at a time, so at most one row's content is held in memory and locks are brief.
+    `pause` seconds between batches leave room for the live workload.
+
+    Returns:
+        dict: Counters for rows, migrated, changed, skipped, failed, blobs,
+        deduplicated and bytes, plus last_id (where a later run can resume).
+    """
+    stats = {'rows': 0, 'migrated': 0, 'changed': 0, 'skipped': 0, 'failed': 0,
+             'blobs': 0, 'deduplicated': 0, 'bytes': 0, 'last_id': start_id}
+    conn = _connect()
+    try:
+        while limit is None or stats['rows'] < limit:
+            size = batch_size if limit is None else min(batch_size, limit - stats['rows'])
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT id FROM tax_form_files WHERE id > %s AND {PENDING_FILTER} ORDER BY id LIMIT %s",
+                (stats['last_id'], size)
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+            conn.commit()
+            if not ids:
+                break
+
+            for row_id in ids:
+                try:
+                    outcome, counts = migrate_row(conn, row_id, store)
+                except (BlobVerificationError, ValueError, OSError) as e:
+                    print(f"Failed to migrate tax_form_files row {row_id}: {e}")
+                    outcome, counts = 'failed', {}
+                except Error as e:
+                    print(f"Failed to migrate tax_form_files row {row_id}: {e}")
+                    outcome, counts = 'failed', {}
+                    # The connection may be unusable after a database error
+                    conn.close()
+                    conn = _connect()
+                stats['rows'] += 1
+                stats[outcome] += 1
+                for key, value in counts.items():
+                    stats[key] += value
+                stats['last_id'] = row_id
+
+            print(f"Migrated through id {stats['last_id']}: {stats['migrated']} row(s), "
+                  f"{stats['blobs']} blob(s) ({stats['deduplicated']} deduplicated), {stats['bytes']} bytes, "
+                  f"{stats['changed']} changed concurrently, {stats['failed']} failed")
+            if pause:
+                time.sleep(pause)
+        return stats
+    finally:
+        conn.close()
+
+
+def verify(start_id=0, batch_size=Config.BLOB_MIGRATION_BATCH_SIZE, store=blob_store):
+    """Re-hash every blob referenced by rows with id > start_id
+
+    Blobs shared by several rows are hashed once.
+
+    Returns:
+        dict: Counters for rows, blobs, missing and corrupt.
+    """
+    stats = {'rows': 0, 'blobs': 0, 'missing': 0, 'corrupt': 0}
+    checked = set()
+    last_id = start_id
+    conn = _connect()
+    try:
+        while True:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT id, blob_sha256, files FROM tax_form_files "
+                f"WHERE id > %s AND {MIGRATED_FILTER} ORDER BY id LIMIT %s",
+                (last_id, batch_size)
+            )
+            rows = cursor.fetchall()
+            cursor.close()
+            conn.commit()
+            if not rows:
+                break
+            for row_id, blob_sha256, files in rows:
+                last_id = row_id
+                stats['rows'] += 1
+                digests = [blob_sha256] if blob_sha256 else []
+                try:
+                    entries = json.loads(_as_text(files) or 'null')
+                except ValueError:
+                    entries = None
+                if isinstance(entries, list):
+                    digests += [e['blob_sha256'] for e in entries if isinstance(e, dict) and e.get('blob_sha256')]
+                for digest in digests:
+                    if digest in checked:
+                        continue
+                    checked.add(digest)
+                    stats['blobs'] += 1
+                    actual = store.hash_file(digest)
+                    if actual is None:
+                        stats['missing'] += 1
+                        print(f"MISSING blob {digest} (tax_form_files row {row_id})")
+                    elif actual != digest:
+                        stats['corrupt'] += 1
+                        print(f"CORRUPT blob {digest} hashes to {actual} (tax_form_files row {row_id})")
+        return stats
+    finally:
+        conn.close()
+
+
+def migration_status():
+    """Count rows still holding content in MySQL and rows referencing blobs"""
+    conn = _connect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+            SELECT COUNT(*), COALESCE(SUM(LENGTH(file_blobs)), 0) + COALESCE(SUM(LENGTH(files)), 0)
+            FROM tax_form_files WHERE {PENDING_FILTER}
+        """)
+        pending_rows, pending_bytes = cursor.fetchone()
+        cursor.execute(f"SELECT COUNT(*) FROM tax_form_files WHERE {MIGRATED_FILTER}")
+        migrated_rows = cursor.fetchone()[0]
+        return {'pending_rows': pending_rows, 'pending_bytes': int(pending_bytes), 'migrated_rows': migrated_rows}
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Move tax form file contents into the blob store.')
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('prepare', help='add the blob_sha256 and content digest columns, backfill the digests')
+    migrate_parser = commands.add_parser('migrate', help='move pending rows to the blob store')
+    migrate_parser.add_argument('--batch-size', type=int, default=Config.BLOB_MIGRATION_BATCH_SIZE)
+    migrate_parser.add_argument('--pause', type=float, default=Config.BLOB_MIGRATION_PAUSE,
+                                help='seconds to sleep between batches')
+    migrate_parser.add_argument('--start-id', type=int, default=0, help='only rows with a larger id')
+    migrate_parser.add_argument('--limit', type=int, help='stop after this many rows')
+    verify_parser = commands.add_parser('verify', help='re-hash every referenced blob')
+    verify_parser.add_argument('--start-id', type=int, default=0, help='only rows with a larger id')
+    commands.add_parser('status', help='count pending and migrated rows')
+    args = parser.parse_args(argv[1:])
+
+    if args.command == 'prepare':
+        added = ensure_blob_column()
+        print("Added tax_form_files.blob_sha256" if added else "tax_form_files.blob_sha256 already exists")
+        ensure_content_digest()
+        print(f"Stored content digests for {backfill_content_digests()} row(s)")
+        return 0
+    if args.command == 'migrate':
+        ensure_blob_column()
+        stats = migrate(batch_size=args.batch_size, pause=args.pause, start_id=args.start_id, limit=args.limit)
+        print(f"Done: {stats}")
+        return 1 if stats['failed'] else 0
+    if args.command == 'verify':
+        stats = verify(start_id=args.start_id)
+        print(f"Verified {stats['blobs']} blob(s) referenced by {stats['rows']} row(s): "
+              f"{stats['missing']} missing, {stats['corrupt']} corrupt")
+        return 1 if stats['missing'] or stats['corrupt'] else 0
+    if args.command == 'status':
+        status = migration_status()
+        print(f"Pending: {status['pending_rows']} row(s), ~{status['pending_bytes']} bytes in MySQL; "
+              f"migrated: {status['migrated_rows']} row(s)")
+        if not status['pending_rows'] and status['migrated_rows']:
+            print("Run OPTIMIZE TABLE tax_form_files to return the freed space to the filesystem")
+        return 0
+    parser.print_help()
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,135 @@
+import base64
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from config import Config
+
+DIGEST_RE = re.compile(r'^[0-9a-f]{64}$')
+
+# Bytes read per call when hashing or copying a blob
+BLOB_READ_CHUNK_SIZE = 1024 * 1024
+
+
+class BlobStore:
+    """Content-addressed file store: a blob lives at <root>/<ab>/<cd>/<sha256 digest>
+
+    Identical content is stored once, no matter how often it is uploaded. Blobs are
+    written to a temporary file under <root>/tmp, fsynced and renamed into place, so a
+    blob path either doesn't exist or holds the complete content, and a stored blob is
+    never modified afterwards.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.tmp_dir = os.path.join(root, 'tmp')
+
+    @staticmethod
+    def relative_path(digest):
+        if not isinstance(digest, str) or not DIGEST_RE.match(digest):
+            raise ValueError(f"Invalid SHA-256 digest: {digest!r}")
+        return f"{digest[:2]}/{digest[2:4]}/{digest}"
+
+    def path(self, digest):
+        return os.path.join(self.root, *self.relative_path(digest).split('/'))
+
+    def exists(self, digest):
+        return os.path.isfile(self.path(digest))
+
+    def put(self, chunks):
+        """Store the content from an iterable of byte chunks
+
+        Returns:
+            tuple: (digest, size, created); created is False when the same content was
+            already stored and the new copy was discarded.
+        """
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            hasher = hashlib.sha256()
+            size = 0
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    hasher.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            digest = hasher.hexdigest()
+            path = self.path(digest)
+            if os.path.exists(path):
+                return digest, size, False
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # mkstemp creates 0600 files; the front proxy must be able to read blobs too
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+            tmp_path = None
+            _fsync_directory(os.path.dirname(path))
+            return digest, size, True
+        finally:
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except FileNotFoundError:
+                    pass
+
+    def put_bytes(self, data):
+        """Store `data`; see put()"""
+        return self.put([data])
+
+    def put_file(self, f, chunk_size=BLOB_READ_CHUNK_SIZE):
+        """Store the rest of the binary file object `f`; see put()"""
+        return self.put(iter(lambda: f.read(chunk_size), b''))
+
+    def open(self, digest):
+        return open(self.path(digest), 'rb')
+
+    @contextmanager
+    def mapped(self, digest):
+        """Map a blob into memory read-only, so it can be encoded without copying it first"""
+        with self.open(digest) as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # mmap rejects empty files
+                yield b''
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+    def read_base64(self, digest):
+        """Return a blob's content base64-encoded (the format of the files JSON)"""
+        with self.mapped(digest) as data:
+            return base64.b64encode(data).decode('ascii')
+
+    def hash_file(self, digest):
+        """Re-hash a stored blob; returns its actual digest, or None if it is missing"""
+        hasher = hashlib.sha256()
+        try:
+            with self.open(digest) as f:
+                for chunk in iter(lambda: f.read(BLOB_READ_CHUNK_SIZE), b''):
+                    hasher.update(chunk)
+        except FileNotFoundError:
+            return None
+        return hasher.hexdigest()
+
+    def verify(self, digest):
+        """Return True if the blob exists and its content still hashes to `digest`"""
+        return self.hash_file(digest) == digest
+
+
+def _fsync_directory(path):
+    """Persist a rename: the new directory entry is durable once the directory is synced"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+blob_store = BlobStore(Config.BLOB_STORE_DIR)
@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+
+class TTLCache:
+    """Thread-safe, size-bounded in-process cache with per-entry expiry
+
+    Entries expire `ttl` seconds after they are stored (or at an explicit `expires_at`
+    monotonic deadline) and the least recently used entry is evicted once `maxsize`
+    is reached.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None, expires_at=None):
+        """Store a value; `expires_at` (a time.monotonic() deadline) overrides `ttl`"""
+        if expires_at is None:
+            ttl = self.ttl if ttl is None else ttl
+            expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return default if entry is None else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+class VersionStamp:
+    """A version token shared by the worker processes on one host through a small file
+
+    bump() atomically replaces the file, so every process sees a new (inode, mtime, size)
+    on its next os.stat() and knows its cached copy is stale. A missing file is a valid
+    version of its own.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def key(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def bump(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(uuid.uuid4().hex)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            # Other processes fall back to their TTL
+            print(f"Error bumping version stamp {self.path}: {e}")
+
+
+class CachedEntry:
+    def __init__(self, value, etag, stamp_key, expires_at):
+        self.value = value
+        self.etag = etag
+        self.stamp_key = stamp_key
+        self.expires_at = expires_at
+        self.loaded_at = datetime.now(timezone.utc).replace(microsecond=0)
+
+
+class CachedResource:
+    """Process-local cache of one loaded value (e.g. a small config table)
+
+    The value is reloaded after invalidate(), after another process bumps the shared
+    VersionStamp, or after `ttl` seconds as a backstop for changes made outside the app.
+    Concurrent misses share a single load. Each entry carries a content hash as its ETag
+    and the time it was loaded. Cached values are shared between requests and must be
+    treated as read-only.
+    """
+
+    def __init__(self, name, loader, ttl=300, stamp=None):
+        self.name = name
+        self._loader = loader
+        self.ttl = ttl
+        self._stamp = stamp
+        self._entry = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.invalidations = 0
+
+    def _stamp_key(self):
+        return self._stamp.key() if self._stamp else None
+
+    def _is_fresh(self, entry):
+        return (entry is not None
+                and (entry.expires_at is None or entry.expires_at > time.monotonic())
+                and entry.stamp_key == self._stamp_key())
+
+    def get(self):
+        """Return the current CachedEntry, loading it if needed, or None if the loader fails"""
+        entry = self._entry
+        if self._is_fresh(entry):
+            self.hits += 1
+            return entry
+        with self._lock:
+            entry = self._entry
+            if self._is_fresh(entry):
+                self.hits += 1
+                return entry
+            # Read the stamp before loading so a bump during the load forces another one
+            stamp_key = self._stamp_key()
+            value = self._loader()
+            if value is None:
+                return None
+            self.loads += 1
+            entry = CachedEntry(
+                value, content_etag(value), stamp_key,
+                time.monotonic() + self.ttl if self.ttl else None
+            )
+            self._entry = entry
+            return entry
+
+    def invalidate(self):
+        """Drop the cached value here and in every process sharing the version stamp"""
+        self._entry = None
+        self.invalidations += 1
+        if self._stamp:
+            self._stamp.bump()
+
+    def stats(self):
+        entry = self._entry
+        return {
+            'name': self.name,
+            'cached': entry is not None,
+            'etag': entry.etag if entry else None,
+            'loaded_at': entry.loaded_at.isoformat() if entry else None,
+            'hits': self.hits,
+            'loads': self.loads,
+            'invalidations': self.invalidations,
+        }
+
+
+def content_etag(value):
+    """Stable hash of a JSON-like value, for use as an ETag"""
+    raw = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
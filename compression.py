@@ -0,0 +1,103 @@
+import zlib
+from flask import request
+from config import Config
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Only text-like payloads are worth compressing; PDFs, images and archives already are
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+    'text/css',
+    'text/csv',
+    'text/html',
+    'text/plain',
+    'text/xml',
+}
+
+
+def _gzip_compressor():
+    # wbits 16 + MAX_WBITS writes a gzip header (with a zero mtime, so output is deterministic)
+    compressor = zlib.compressobj(Config.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def _brotli_compressor():
+    compressor = brotli.Compressor(quality=Config.COMPRESSION_BROTLI_QUALITY)
+    return compressor.process, compressor.flush, compressor.finish
+
+
+COMPRESSORS = {'gzip': _gzip_compressor}
+if brotli is not None:
+    COMPRESSORS['br'] = _brotli_compressor
+
+
+def choose_encoding():
+    """Pick the best encoding the client accepts (br preferred, then gzip), or None"""
+    encoding = request.accept_encodings.best_match(['br', 'gzip'] if brotli is not None else ['gzip'])
+    return encoding if encoding in COMPRESSORS else None
+
+
+def _is_compressible(response):
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return False
+    if response.status_code != 200 or request.method == 'HEAD':
+        return False
+    if 'Content-Encoding' in response.headers or 'no-transform' in response.headers.get('Cache-Control', ''):
+        return False
+    # send_file responses keep their zero-copy file wrapper
+    return not response.direct_passthrough
+
+
+def _compress_stream(chunks, encoding):
+    """Compress an iterable of str/bytes chunks, flushing after each so streaming isn't delayed"""
+    compress, flush, finish = COMPRESSORS[encoding]()
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if chunk:
+                data = compress(chunk) + flush()
+                if data:
+                    yield data
+        yield finish()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def compress_response(response):
+    """after_request hook: compress text-like responses the client accepts gzip/brotli for
+
+    Buffered bodies smaller than COMPRESSION_MIN_SIZE are left alone. Streamed responses
+    are compressed chunk by chunk as they are generated.
+    """
+    if not Config.COMPRESSION_ENABLED or not _is_compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < Config.COMPRESSION_MIN_SIZE:
+            return response
+        compress, _, finish = COMPRESSORS[encoding]()
+        response.set_data(compress(data) + finish())
+
+    response.headers['Content-Encoding'] = encoding
+    # The compressed bytes differ from the identity representation
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
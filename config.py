@@ -9,16 +9,95 @@ class Config:
     MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD', 'Accverse@1234')
     MYSQL_DB = os.getenv('MYSQL_DB', 'Accverse')
     MYSQL_PORT = int(os.getenv('MYSQL_PORT', 3306))
+
+    # Connection pool settings
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))  # idle connections kept open
+    DB_POOL_MAX_OVERFLOW = int(os.getenv('DB_POOL_MAX_OVERFLOW', 10))  # extra connections allowed under load
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))  # seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))  # replace connections older than this (seconds)
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'  # ping connections on borrow
+    DB_POOL_WARMUP = int(os.getenv('DB_POOL_WARMUP', 2))  # connections each server worker opens before serving
+
+    # Production server (see gunicorn.conf.py)
+    SERVER_BIND = os.getenv('SERVER_BIND', '0.0.0.0:5000')
+    SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', os.cpu_count() or 1))  # worker processes
+    SERVER_THREADS = int(os.getenv('SERVER_THREADS', 4))  # concurrent requests per worker
+    SERVER_PRELOAD = os.getenv('SERVER_PRELOAD', 'true').lower() == 'true'  # import the app once, before forking
+    SERVER_TIMEOUT = int(os.getenv('SERVER_TIMEOUT', 60))  # seconds before a stuck worker is restarted
+    SERVER_GRACEFUL_TIMEOUT = int(os.getenv('SERVER_GRACEFUL_TIMEOUT', 30))  # seconds to drain on SIGTERM/SIGHUP
+    SERVER_KEEPALIVE = int(os.getenv('SERVER_KEEPALIVE', 5))  # seconds an idle keep-alive connection is held
+    SERVER_MAX_REQUESTS = int(os.getenv('SERVER_MAX_REQUESTS', 0))  # restart a worker after this many (0 = never)
+    SERVER_MAX_REQUESTS_JITTER = int(os.getenv('SERVER_MAX_REQUESTS_JITTER', 0))  # spreads those restarts out
+
+    # SQL profiler (see sql_profiler.py)
+    SQL_PROFILER_ENABLED = os.getenv('SQL_PROFILER_ENABLED', 'true').lower() == 'true'
+    SQL_SLOW_QUERY_MS = float(os.getenv('SQL_SLOW_QUERY_MS', 200))  # log executions slower than this
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', 10))  # same statement per request
+    SQL_PROFILER_SAMPLES = int(os.getenv('SQL_PROFILER_SAMPLES', 1000))  # recent timings kept for p50/p95
+    SQL_PROFILER_DEBUG_HEADER = os.getenv('SQL_PROFILER_DEBUG_HEADER', 'false').lower() == 'true'  # X-SQL-Profile
+
+    # Rows fetched per round trip when streaming unpaged list endpoints
+    STREAM_BATCH_SIZE = int(os.getenv('STREAM_BATCH_SIZE', 500))
+    # Response compression (see compression.py); brotli is used when the package is installed
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))  # bytes; smaller bodies are sent as is
+    COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 5))
+    # Encode JSON responses with orjson when it is installed (see serialization.py)
+    JSON_USE_ORJSON = os.getenv('JSON_USE_ORJSON', 'true').lower() == 'true'
     
     # File upload settings
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', '/opt/app/accverse-backend/uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size 
+    FILE_MANIFEST_CACHE_SIZE = int(os.getenv('FILE_MANIFEST_CACHE_SIZE', 1024))  # forms with a cached file manifest
+    FILE_MANIFEST_CACHE_TTL = int(os.getenv('FILE_MANIFEST_CACHE_TTL', 300))  # seconds
+    UPLOADS_DIR = os.getenv('UPLOADS_DIR', '/opt/app/accverse-backend/uploads/tax_forms').rstrip('/\\')  # /uploads/tax_forms
+    UPLOAD_SENDFILE_MODE = os.getenv('UPLOAD_SENDFILE_MODE', '').lower()  # '', 'x-accel-redirect' (nginx) or 'x-sendfile'
+    UPLOAD_ACCEL_REDIRECT_PREFIX = os.getenv('UPLOAD_ACCEL_REDIRECT_PREFIX', '/protected-uploads/tax_forms')  # nginx internal location
+    UPLOAD_STAT_CACHE_SIZE = int(os.getenv('UPLOAD_STAT_CACHE_SIZE', 4096))  # uploaded files with a cached stat
+    UPLOAD_STAT_CACHE_TTL = int(os.getenv('UPLOAD_STAT_CACHE_TTL', 30))  # seconds
+    # Content-addressed blob store for file contents (see blob_store.py and blob_migration.py)
+    BLOB_STORE_DIR = os.getenv('BLOB_STORE_DIR', os.path.join(UPLOAD_FOLDER, 'blobs'))
+    BLOB_ACCEL_REDIRECT_PREFIX = os.getenv('BLOB_ACCEL_REDIRECT_PREFIX', '/protected-blobs')  # nginx internal location
+    BLOB_MIGRATION_BATCH_SIZE = int(os.getenv('BLOB_MIGRATION_BATCH_SIZE', 50))  # rows per migration batch
+    BLOB_MIGRATION_PAUSE = float(os.getenv('BLOB_MIGRATION_PAUSE', 0.1))  # seconds between batches
 
     EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
     EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
     EMAIL_USER = os.getenv('EMAIL_USER', 'kaurnancy186@gmail.com')
     EMAIL_PASS = os.getenv('EMAIL_PASS', 'pwnc mmiy rfkn gttd')
+    EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'true').lower() == 'true'  # STARTTLS after connecting
+    EMAIL_USE_AUTH = os.getenv('EMAIL_USE_AUTH', 'true').lower() == 'true'  # login with EMAIL_USER / EMAIL_PASS
+
+    # Outbound mail queue (see mailer.py)
+    EMAIL_SENDER_THREADS = int(os.getenv('EMAIL_SENDER_THREADS', 1))  # each keeps its own SMTP session
+    EMAIL_QUEUE_SIZE = int(os.getenv('EMAIL_QUEUE_SIZE', 1000))
+    EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', 20))  # messages sent per session wake-up
+    EMAIL_MAX_RETRIES = int(os.getenv('EMAIL_MAX_RETRIES', 3))
+    EMAIL_RETRY_BACKOFF = float(os.getenv('EMAIL_RETRY_BACKOFF', 2))  # seconds, doubled on each retry
+    EMAIL_IDLE_TIMEOUT = float(os.getenv('EMAIL_IDLE_TIMEOUT', 60))  # close idle SMTP sessions after this
+    EMAIL_SHUTDOWN_FLUSH_TIMEOUT = float(os.getenv('EMAIL_SHUTDOWN_FLUSH_TIMEOUT', 5))  # seconds at exit
+    
+    # Cached reference data: worker processes share invalidations through version stamp files here
+    CACHE_VERSION_DIR = os.getenv('CACHE_VERSION_DIR', '/tmp/accverse-cache-versions')
+    PRICING_CACHE_TTL = int(os.getenv('PRICING_CACHE_TTL', 300))  # seconds, backstop for out-of-band edits
+    REFERENCE_CACHE_TTL = int(os.getenv('REFERENCE_CACHE_TTL', 300))  # seconds, services and booking config
+    PRICING_QUOTE_BATCH_LIMIT = int(os.getenv('PRICING_QUOTE_BATCH_LIMIT', 1000))  # selections per batch quote
+
+    # Seconds between background recomputations of the dashboard widget snapshot. This is also how
+    # stale the widgets can get: payments, tax forms, users and appointments are written outside this
+    # app, so only service edits (and POST /api/dashboard/main_widgets/refresh) trigger an early refresh
+    DASHBOARD_REFRESH_INTERVAL = int(os.getenv('DASHBOARD_REFRESH_INTERVAL', 60))
+    # Seconds between background catch-ups of the analytics rollup tables
+    ANALYTICS_CATCH_UP_INTERVAL = int(os.getenv('ANALYTICS_CATCH_UP_INTERVAL', 60))
     
     # JWT Configuration
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'your-secret-key-change-this-in-production-please-make-it-long-and-random')
-    JWT_ACCESS_TOKEN_EXPIRES = int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 86400))  # 24 hours in seconds
\ No newline at end of file
+    JWT_ACCESS_TOKEN_EXPIRES = int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 86400))  # 24 hours in seconds
+    JWT_CACHE_SIZE = int(os.getenv('JWT_CACHE_SIZE', 10000))  # verified tokens kept in memory
+    JWT_CACHE_DEFAULT_TTL = int(os.getenv('JWT_CACHE_DEFAULT_TTL', 300))  # seconds, for tokens without `exp`
+
+    # bcrypt worker pool used by /api/login and /api/reset-password
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))  # concurrent bcrypt operations
+    PASSWORD_HASH_QUEUE_SIZE = int(os.getenv('PASSWORD_HASH_QUEUE_SIZE', 8))  # waiting operations before rejecting
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 5))  # seconds a request waits for its result
\ No newline at end of file
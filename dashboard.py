@@ -0,0 +1,94 @@
+import copy
+import threading
+from datetime import datetime, timezone
+from config import Config
+from methods import get_dashboard_main_widgets_data
+
+
+class DashboardSnapshot:
+    """Keeps the dashboard widget payload in memory, recomputed in the background
+
+    A daemon thread recomputes the payload every `interval` seconds, or sooner after
+    invalidate(). Requests read the last good snapshot instead of running the aggregate
+    queries themselves; only the very first request of a process computes it inline.
+    """
+
+    def __init__(self, compute, interval):
+        self._compute = compute
+        self.interval = interval
+        self._snapshot = None
+        self._lock = threading.Lock()  # serializes recomputation
+        self._wake = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self.refresh_count = 0
+        self.failure_count = 0
+        self.last_error = None
+
+    def start(self):
+        """Start the background refresh thread if it isn't running yet"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='dashboard-snapshot', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.refresh()
+
+    def refresh(self):
+        """Recompute the payload now; keeps the previous snapshot if the computation fails
+
+        Returns:
+            dict: The current snapshot (new or previous), or None if none was ever computed.
+        """
+        with self._lock:
+            try:
+                data = self._compute()
+                error = 'no data returned'
+            except Exception as e:
+                data = None
+                error = str(e)
+            if data is None:
+                self.failure_count += 1
+                self.last_error = error
+                print(f"Dashboard snapshot refresh failed: {error}")
+                return self._snapshot
+            data['generated_at'] = datetime.now(timezone.utc).isoformat()
+            self._snapshot = data
+            self.refresh_count += 1
+            self.last_error = None
+            return data
+
+    def get(self):
+        """Return a copy of the latest snapshot, computing it first if there is none"""
+        self.start()
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.refresh()
+        return copy.deepcopy(snapshot) if snapshot is not None else None
+
+    def invalidate(self):
+        """Ask the background thread to recompute as soon as possible"""
+        self.start()
+        self._wake.set()
+
+    @property
+    def is_ready(self):
+        return self._snapshot is not None
+
+
+main_widgets_snapshot = DashboardSnapshot(get_dashboard_main_widgets_data, Config.DASHBOARD_REFRESH_INTERVAL)
+
+
+def invalidate_dashboard_snapshot():
+    """Invalidation hook for code that changes payments, users, appointments or services
+
+    Call it after committing such a write; changes made outside this app show up within
+    Config.DASHBOARD_REFRESH_INTERVAL seconds.
+    """
+    main_widgets_snapshot.invalidate()
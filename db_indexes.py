@@ -0,0 +1,132 @@
+"""Composite indexes the API's queries rely on, plus an EXPLAIN-based check that they are used.
+
+Usage:
+    python db_indexes.py apply   # create any missing indexes
+    python db_indexes.py check   # EXPLAIN the dashboard queries and verify their index choice
+"""
+import sys
+from mysql.connector import Error
+from utils import get_db_connection
+from methods import (
+    DASHBOARD_TOTAL_CLIENTS_QUERY, DASHBOARD_MONTHLY_REVENUE_QUERY, DASHBOARD_PENDING_PAYMENTS_QUERY,
+    DASHBOARD_NEW_CLIENTS_QUERY, DASHBOARD_REVENUE_TREND_QUERY, DASHBOARD_UPCOMING_APPOINTMENTS_QUERY
+)
+
+# (table, index name, columns)
+INDEXES = [
+    # Dashboard aggregates
+    ('form_payments', 'idx_form_payments_status_date', ['payment_status', 'payment_date', 'amount']),
+    ('users', 'idx_users_role_created', ['role', 'created_at', 'id']),
+    ('appointments', 'idx_appointments_date_time', ['appointment_date', 'appointment_time', 'id']),
+    # Keyset pagination
+    ('notifications', 'idx_notifications_user_created', ['user_id', 'created_at', 'id']),
+    ('notifications', 'idx_notifications_created', ['created_at', 'id']),
+    ('users', 'idx_users_created', ['created_at', 'id']),
+    ('form_payments', 'idx_form_payments_created', ['created_at', 'id']),
+    # Analytics rollups (per-day recomputation, change log triggers on tax_forms)
+    ('form_payments', 'idx_form_payments_date', ['payment_date', 'amount']),
+    ('form_payments', 'idx_form_payments_form', ['form_id']),
+    # Change-fingerprint probes for conditional GETs
+    ('tax_forms', 'idx_tax_forms_user_updated', ['user_id', 'updated_at']),
+    ('form_payments', 'idx_form_payments_user_updated', ['user_id', 'updated_at']),
+    ('appointments', 'idx_appointments_updated', ['updated_at']),
+    ('notifications', 'idx_notifications_user_flags', ['user_id', 'is_read', 'is_archived']),
+]
+
+# (description, query, {table or alias in EXPLAIN output: expected index})
+DASHBOARD_QUERY_PLANS = [
+    ('total clients', DASHBOARD_TOTAL_CLIENTS_QUERY, {'users': 'idx_users_role_created'}),
+    ('monthly revenue', DASHBOARD_MONTHLY_REVENUE_QUERY, {'form_payments': 'idx_form_payments_status_date'}),
+    ('pending payments', DASHBOARD_PENDING_PAYMENTS_QUERY, {'form_payments': 'idx_form_payments_status_date'}),
+    ('new clients', DASHBOARD_NEW_CLIENTS_QUERY, {'users': 'idx_users_role_created'}),
+    ('revenue trend', DASHBOARD_REVENUE_TREND_QUERY, {'analytics_daily_revenue': 'PRIMARY'}),
+    ('upcoming appointments', DASHBOARD_UPCOMING_APPOINTMENTS_QUERY, {'a': 'idx_appointments_date_time'}),
+]
+
+
+def create_index_sql(table, name, columns):
+    return f"CREATE INDEX {name} ON {table} ({', '.join(columns)})"
+
+
+def apply_indexes():
+    """Create every index in INDEXES that doesn't exist yet
+
+    Returns:
+        list: Names of the indexes that were created.
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise Error(msg="No database connection available")
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+            SELECT DISTINCT TABLE_NAME AS table_name, INDEX_NAME AS index_name
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE()
+        """)
+        existing = {(row['table_name'], row['index_name']) for row in cursor.fetchall()}
+        created = []
+        for table, name, columns in INDEXES:
+            if (table, name) in existing:
+                continue
+            sql = create_index_sql(table, name, columns)
+            print(f"Creating index: {sql}")
+            cursor.execute(sql)
+            created.append(name)
+        return created
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def check_dashboard_query_plans():
+    """EXPLAIN each dashboard query and compare the chosen index with the expected one
+
+    Returns:
+        list: One dict per checked table with query, table, expected, key, type, rows and ok.
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise Error(msg="No database connection available")
+    cursor = conn.cursor(dictionary=True)
+    results = []
+    try:
+        for description, query, expected in DASHBOARD_QUERY_PLANS:
+            cursor.execute(f"EXPLAIN {query}")
+            plan = {row['table']: row for row in cursor.fetchall()}
+            for table, index_name in expected.items():
+                row = plan.get(table, {})
+                results.append({
+                    'query': description,
+                    'table': table,
+                    'expected': index_name,
+                    'key': row.get('key'),
+                    'type': row.get('type'),
+                    'rows': row.get('rows'),
+                    'ok': row.get('key') == index_name and row.get('type') != 'ALL',
+                })
+        return results
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else 'check'
+    if command == 'apply':
+        created = apply_indexes()
+        print(f"Created {len(created)} index(es): {', '.join(created) or 'none'}")
+        return 0
+    if command == 'check':
+        results = check_dashboard_query_plans()
+        for result in results:
+            status = 'OK  ' if result['ok'] else 'FAIL'
+            print(f"{status} {result['query']:<24} {result['table']:<14} key={result['key']} "
+                  f"(expected {result['expected']}) type={result['type']} rows={result['rows']}")
+        return 0 if all(result['ok'] for result in results) else 1
+    print(__doc__)
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
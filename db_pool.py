@@ -0,0 +1,380 @@
+import threading
+import time
+import weakref
+import mysql.connector
+from mysql.connector import Error
+from config import Config
+from metrics import record_query, record_connection_wait
+from sql_profiler import profiler
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available within the wait timeout
+
+    Not a mysql.connector Error, so the `except Error` handlers around queries let it
+    through and the route answers 503 instead of treating it as a failed query.
+    """
+
+
+class InstrumentedCursor:
+    """Cursor proxy that reports query count and DB time to metrics and each statement to the SQL profiler"""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self._trace = None
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def _execute(self, method, operation, args, kwargs):
+        profiler.finish(self._trace)
+        self._trace = None
+        started = time.perf_counter()
+        try:
+            return method(operation, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            record_query(elapsed, True)
+            self._trace = profiler.record_execute(operation, elapsed)
+
+    def _fetch(self, method, args, kwargs):
+        started = time.perf_counter()
+        rows = None
+        try:
+            rows = method(*args, **kwargs)
+            return rows
+        finally:
+            elapsed = time.perf_counter() - started
+            record_query(elapsed, False)
+            if rows is None:
+                count = 0
+            elif isinstance(rows, list):
+                count = len(rows)
+            else:
+                count = 1
+            profiler.record_fetch(self._trace, elapsed, count)
+
+    def execute(self, operation, *args, **kwargs):
+        return self._execute(self._raw.execute, operation, args, kwargs)
+
+    def executemany(self, operation, *args, **kwargs):
+        return self._execute(self._raw.executemany, operation, args, kwargs)
+
+    def fetchone(self):
+        return self._fetch(self._raw.fetchone, (), {})
+
+    def fetchmany(self, *args, **kwargs):
+        return self._fetch(self._raw.fetchmany, args, kwargs)
+
+    def fetchall(self):
+        return self._fetch(self._raw.fetchall, (), {})
+
+    def finish_trace(self):
+        profiler.finish(self._trace)
+        self._trace = None
+
+    def close(self):
+        self.finish_trace()
+        return self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class PooledConnection:
+    """Proxy around a MySQL connection that returns it to the pool on close()
+
+    Call sites keep using the connection exactly like a plain mysql.connector
+    connection: cursor(), commit(), rollback() and close() all work as before. A proxy
+    that is garbage collected without close() (e.g. an exception skipped it) still
+    returns its connection, and the pool counts it as reclaimed.
+    """
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._closed = False
+        self._cursors = []
+        self._finalizer = weakref.finalize(self, pool._reclaim, raw, created_at)
+        self._finalizer.atexit = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        cursor = InstrumentedCursor(self._raw.cursor(*args, **kwargs))
+        self._cursors.append(cursor)
+        return cursor
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        # Statements on cursors that were never closed are complete now too
+        for cursor in self._cursors:
+            cursor.finish_trace()
+        self._cursors = []
+        self._finalizer.detach()
+        self._pool._release(self._raw, self._created_at)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return f"<PooledConnection raw={self._raw!r} closed={self._closed}>"
+
+
+class ConnectionPool:
+    """Thread-safe MySQL connection pool with overflow, health checks and recycling
+
+    Args:
+        connect_kwargs (dict): Arguments passed to mysql.connector.connect.
+        size (int): Number of idle connections kept open between requests.
+        max_overflow (int): Extra connections allowed above `size` under load. They are
+            closed instead of being kept idle when returned.
+        timeout (float): Seconds to wait for a free connection before raising PoolTimeoutError.
+        recycle (int): Connections older than this many seconds are replaced on borrow.
+            0 disables recycling.
+        pre_ping (bool): Ping idle connections when they are borrowed and replace dead ones.
+    """
+
+    def __init__(self, connect_kwargs, size=5, max_overflow=10, timeout=10.0, recycle=1800, pre_ping=True):
+        self._connect_kwargs = connect_kwargs
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+
+        self._cond = threading.Condition()
+        self._idle = []  # list of (raw_connection, created_at), most recently returned last
+        self._in_use = 0
+        self._waiting = 0
+
+        self._created = 0
+        self._recycled = 0
+        self._discarded = 0
+        self._failed_pings = 0
+        self._timeouts = 0
+        self._reclaimed = 0
+        self._acquisitions = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    @property
+    def max_connections(self):
+        return self.size + self.max_overflow
+
+    def acquire(self):
+        """Borrow a connection, waiting at most `timeout` seconds for one to free up"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    raw, created_at = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._in_use < self.max_connections:
+                    raw, created_at = None, None
+                    self._in_use += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"Timed out after {self.timeout}s waiting for a database connection "
+                        f"(pool size={self.size}, max_overflow={self.max_overflow}, in use={self._in_use})"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+        # Connect / validate outside the lock so slow handshakes don't block other borrowers
+        try:
+            if raw is not None:
+                raw, created_at = self._checkout_idle(raw, created_at)
+            if raw is None:
+                raw = self._connect()
+                created_at = time.monotonic()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        waited = time.monotonic() - started
+        record_connection_wait(waited)
+        with self._cond:
+            self._acquisitions += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        return PooledConnection(self, raw, created_at)
+
+    def _checkout_idle(self, raw, created_at):
+        """Validate an idle connection, returning (None, None) if it must be replaced"""
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            self._close_quietly(raw)
+            with self._cond:
+                self._recycled += 1
+            return None, None
+        if self.pre_ping:
+            try:
+                raw.ping(reconnect=False)
+            except Exception:
+                self._close_quietly(raw)
+                with self._cond:
+                    self._failed_pings += 1
+                return None, None
+        return raw, created_at
+
+    def _connect(self):
+        raw = mysql.connector.connect(**self._connect_kwargs)
+        with self._cond:
+            self._created += 1
+        return raw
+
+    def _release(self, raw, created_at):
+        """Return a connection to the pool, discarding it if it can't be reset"""
+        keep = True
+        try:
+            # End any open transaction (and drain unread results) so the next
+            # borrower starts from a clean snapshot.
+            raw.rollback()
+        except Exception:
+            keep = False
+
+        with self._cond:
+            self._in_use -= 1
+            if keep and len(self._idle) < self.size:
+                self._idle.append((raw, created_at))
+                raw = None
+            elif not keep:
+                self._discarded += 1
+            self._cond.notify()
+
+        if raw is not None:
+            self._close_quietly(raw)
+
+    def _reclaim(self, raw, created_at):
+        """Return the connection of a proxy that was dropped without close()"""
+        with self._cond:
+            self._reclaimed += 1
+        print("Reclaimed a pooled MySQL connection that was never closed")
+        self._release(raw, created_at)
+
+    @staticmethod
+    def _close_quietly(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def warm_up(self, count=None):
+        """Open idle connections ahead of the first requests, up to `count` (at most `size`)
+
+        Returns:
+            int: Number of connections opened.
+        """
+        target = self.size if count is None else min(count, self.size)
+        opened = 0
+        while True:
+            with self._cond:
+                if self._in_use + len(self._idle) >= target:
+                    break
+                self._in_use += 1  # reserve the slot while connecting
+            try:
+                raw = self._connect()
+            except Exception:
+                with self._cond:
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+            self._release(raw, time.monotonic())
+            opened += 1
+        return opened
+
+    def dispose(self):
+        """Close every idle connection; borrowed connections are closed when returned"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for raw, _ in idle:
+            self._close_quietly(raw)
+
+    def stats(self):
+        """Return a snapshot of pool usage counters"""
+        with self._cond:
+            acquisitions = self._acquisitions
+            return {
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'overflow': max(0, self._in_use + len(self._idle) - self.size),
+                'created': self._created,
+                'recycled': self._recycled,
+                'discarded': self._discarded,
+                'failed_pings': self._failed_pings,
+                'timeouts': self._timeouts,
+                'reclaimed': self._reclaimed,
+                'acquisitions': acquisitions,
+                'total_wait_seconds': round(self._total_wait, 6),
+                'avg_wait_seconds': round(self._total_wait / acquisitions, 6) if acquisitions else 0.0,
+                'max_wait_seconds': round(self._max_wait, 6),
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    connect_kwargs={
+                        'host': Config.MYSQL_HOST,
+                        'user': Config.MYSQL_USER,
+                        'password': Config.MYSQL_PASSWORD,
+                        'database': Config.MYSQL_DB,
+                        'port': Config.MYSQL_PORT,
+                    },
+                    size=Config.DB_POOL_SIZE,
+                    max_overflow=Config.DB_POOL_MAX_OVERFLOW,
+                    timeout=Config.DB_POOL_TIMEOUT,
+                    recycle=Config.DB_POOL_RECYCLE,
+                    pre_ping=Config.DB_POOL_PRE_PING,
+                )
+    return _pool
+
+
+def get_pool_stats():
+    """Return usage counters for the process-wide pool"""
+    return get_pool().stats()
+
+
+def reset_after_fork():
+    """Forget the pool inherited from the parent process; call first thing in a forked worker
+
+    The parent's sockets are left alone, since closing them from the child would end
+    the parent's sessions. The worker opens its own connections on demand.
+    """
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
@@ -0,0 +1,47 @@
+"""Gunicorn settings for production, taken from Config (see the SERVER_* variables).
+
+Usage:
+    gunicorn -c gunicorn.conf.py
+
+Each worker process handles SERVER_THREADS requests at a time. With SERVER_PRELOAD the
+app is imported once in the master and forked. Each worker then gets its own DB pool
+and warms it up, and primes its caches, before it accepts requests. SIGHUP replaces
+the workers gracefully. SIGTERM stops accepting connections and drains in-flight
+requests for up to SERVER_GRACEFUL_TIMEOUT seconds.
+"""
+from config import Config
+
+wsgi_app = 'wsgi:app'
+bind = Config.SERVER_BIND
+workers = Config.SERVER_WORKERS
+worker_class = 'gthread'
+threads = Config.SERVER_THREADS
+preload_app = Config.SERVER_PRELOAD
+timeout = Config.SERVER_TIMEOUT
+graceful_timeout = Config.SERVER_GRACEFUL_TIMEOUT
+keepalive = Config.SERVER_KEEPALIVE
+max_requests = Config.SERVER_MAX_REQUESTS
+max_requests_jitter = Config.SERVER_MAX_REQUESTS_JITTER
+
+
+def post_fork(server, worker):
+    import db_pool
+    from readiness import worker_readiness
+
+    # Never share the master's connections (or a lock it held while forking)
+    db_pool.reset_after_fork()
+
+    # Report draining from SIGTERM on, while in-flight requests finish
+    handle_exit = worker.handle_exit
+
+    def handle_exit_and_drain(sig, frame):
+        worker_readiness.mark_draining()
+        handle_exit(sig, frame)
+
+    worker.handle_exit = handle_exit_and_drain
+
+
+def post_worker_init(worker):
+    # Runs before the worker's first accept(); connections wait in the listen backlog meanwhile
+    from readiness import worker_readiness
+    worker_readiness.warm_up()
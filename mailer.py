@@ -0,0 +1,244 @@
+import atexit
+import queue
+import smtplib
+import threading
+import time
+from config import Config
+
+
+class MailQueueFull(Exception):
+    """Raised when the outbound mail queue can't accept more messages"""
+
+
+class OutboundMessage:
+    def __init__(self, from_addr, to_addrs, message):
+        self.from_addr = from_addr
+        self.to_addrs = to_addrs
+        self.message = message
+        self.attempts = 0
+
+
+class MailQueue:
+    """In-process outbound mail queue drained by background SMTP sender threads
+
+    Each sender keeps its own authenticated SMTP session open and reuses it for every
+    message, closing it after `idle_timeout` seconds without work. Up to `batch_size`
+    queued messages are sent per wake-up on the same session. Failed deliveries are
+    retried with exponential backoff (`retry_backoff` * 2 ** attempt seconds) up to
+    `max_retries` times.
+    """
+
+    def __init__(self, host, port, username, password, use_tls=True, use_auth=True, senders=1,
+                 max_queue=1000, batch_size=20, max_retries=3, retry_backoff=2.0, idle_timeout=60.0,
+                 smtp_timeout=30.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.use_auth = use_auth
+        self.senders = senders
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.idle_timeout = idle_timeout
+        self.smtp_timeout = smtp_timeout
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self._threads_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._scheduled_retries = 0
+        self.queued = 0
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.rejected = 0
+        self.batches = 0
+        self.connections_opened = 0
+        self.last_error = None
+        self._total_send_seconds = 0.0
+
+    def start(self):
+        """Start the sender threads if they aren't running yet"""
+        with self._threads_lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.senders:
+                thread = threading.Thread(
+                    target=self._sender_loop, name=f"mail-sender-{len(self._threads)}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def enqueue(self, from_addr, to_addrs, message):
+        """Queue a message for delivery and return immediately
+
+        Args:
+            from_addr (str): Envelope sender.
+            to_addrs (list): Envelope recipients.
+            message (str): The full message, e.g. MIMEText(...).as_string().
+
+        Raises:
+            MailQueueFull: If the queue is at capacity.
+        """
+        self.start()
+        try:
+            self._queue.put_nowait(OutboundMessage(from_addr, to_addrs, message))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise MailQueueFull('Outbound mail queue is full')
+        with self._lock:
+            self.queued += 1
+
+    def flush(self, timeout=None):
+        """Wait until every queued message (including pending retries) is delivered or dropped
+
+        Returns:
+            bool: True if the queue drained before the timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                idle = self._scheduled_retries == 0 and self._queue.unfinished_tasks == 0
+            if idle:
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.smtp_timeout)
+        if self.use_tls:
+            smtp.starttls()
+        if self.use_auth:
+            smtp.login(self.username, self.password)
+        with self._lock:
+            self.connections_opened += 1
+        return smtp
+
+    @staticmethod
+    def _close(smtp):
+        if smtp is None:
+            return
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def _next_batch(self):
+        """Block until a message is available, then grab up to batch_size without waiting"""
+        batch = [self._queue.get(timeout=self.idle_timeout)]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _deliver(self, smtp, item):
+        """Send one message, reconnecting once if the reused session was dropped"""
+        if smtp is None:
+            smtp = self._connect()
+        try:
+            smtp.sendmail(item.from_addr, item.to_addrs, item.message)
+        except smtplib.SMTPServerDisconnected:
+            self._close(smtp)
+            smtp = self._connect()
+            smtp.sendmail(item.from_addr, item.to_addrs, item.message)
+        return smtp
+
+    def _sender_loop(self):
+        smtp = None
+        while True:
+            try:
+                batch = self._next_batch()
+            except queue.Empty:
+                # Idle: don't hold the SMTP session open indefinitely
+                self._close(smtp)
+                smtp = None
+                continue
+
+            with self._lock:
+                self.batches += 1
+            for item in batch:
+                started = time.monotonic()
+                try:
+                    smtp = self._deliver(smtp, item)
+                    with self._lock:
+                        self.sent += 1
+                        self._total_send_seconds += time.monotonic() - started
+                except Exception as e:
+                    self._close(smtp)
+                    smtp = None
+                    self._handle_failure(item, e)
+                finally:
+                    self._queue.task_done()
+
+    def _handle_failure(self, item, error):
+        item.attempts += 1
+        with self._lock:
+            self.last_error = str(error)
+        if item.attempts > self.max_retries:
+            with self._lock:
+                self.failed += 1
+            print(f"Failed to send email to {', '.join(item.to_addrs)} after {item.attempts} attempts: {error}")
+            return
+        delay = self.retry_backoff * (2 ** (item.attempts - 1))
+        print(f"Email to {', '.join(item.to_addrs)} failed ({error}); retrying in {delay:.1f}s")
+        with self._lock:
+            self.retried += 1
+            self._scheduled_retries += 1
+        timer = threading.Timer(delay, self._requeue, args=(item,))
+        timer.daemon = True
+        timer.start()
+
+    def _requeue(self, item):
+        try:
+            self._queue.put(item, timeout=self.smtp_timeout)
+        except queue.Full:
+            with self._lock:
+                self.failed += 1
+            print(f"Dropping email to {', '.join(item.to_addrs)}: queue is full")
+        finally:
+            with self._lock:
+                self._scheduled_retries -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'scheduled_retries': self._scheduled_retries,
+                'senders': self.senders,
+                'queued': self.queued,
+                'sent': self.sent,
+                'failed': self.failed,
+                'retried': self.retried,
+                'rejected': self.rejected,
+                'batches': self.batches,
+                'connections_opened': self.connections_opened,
+                'avg_send_seconds': round(self._total_send_seconds / self.sent, 6) if self.sent else 0.0,
+                'last_error': self.last_error,
+            }
+
+
+mail_queue = MailQueue(
+    host=Config.EMAIL_HOST,
+    port=Config.EMAIL_PORT,
+    username=Config.EMAIL_USER,
+    password=Config.EMAIL_PASS,
+    use_tls=Config.EMAIL_USE_TLS,
+    use_auth=Config.EMAIL_USE_AUTH,
+    senders=Config.EMAIL_SENDER_THREADS,
+    max_queue=Config.EMAIL_QUEUE_SIZE,
+    batch_size=Config.EMAIL_BATCH_SIZE,
+    max_retries=Config.EMAIL_MAX_RETRIES,
+    retry_backoff=Config.EMAIL_RETRY_BACKOFF,
+    idle_timeout=Config.EMAIL_IDLE_TIMEOUT,
+)
+
+# Give queued mail a short chance to go out when the process exits
+atexit.register(mail_queue.flush, Config.EMAIL_SHUTDOWN_FLUSH_TIMEOUT)
@@ -1,15 +1,169 @@
-from utils import get_db_connection, format_tax_form_response
-from mysql.connector import Error
+from utils import get_db_connection, format_tax_form_response, encode_cursor
+from cache import TTLCache, CachedResource, VersionStamp
+from blob_store import blob_store
+from analytics import rollup_refresher, get_client_growth_rollup
+from mailer import mail_queue
+from mysql.connector import Error, errorcode
 import json
 import os
-from decimal import Decimal
-from datetime import timedelta, datetime, timezone
-import smtplib
+from datetime import date, timedelta, datetime, timezone
+import calendar
 from email.mime.text import MIMEText
 from config import Config
 
+# Maximum number of form ids bound into a single IN (...) clause
+TAX_FORM_FILES_BATCH_SIZE = 500
+
+# Columns returned for file listings; file_blobs and the files JSON (with its
+# embedded base64 payloads) are only read when a single file is requested.
+TAX_FORM_FILE_METADATA_COLUMNS = ['id', 'tax_form_id', 'file_name', 'file_type', 'file_size', 'field_name']
+
+def tax_form_file_blob_url(file_id):
+    """URL clients use to fetch a file's content on demand"""
+    return f"/api/tax-form-files/blob/{file_id}"
+
+def load_tax_form_files(cursor, form_ids, metadata_only=True, batch_size=TAX_FORM_FILES_BATCH_SIZE):
+    """Fetch the files for many tax forms at once, grouped by tax_form_id
+
+    Runs one `IN (...)` query per batch of `batch_size` ids instead of one query per form.
+    Every requested id is present in the result, mapped to an empty list if it has no files.
+
+    With metadata_only (the default) only TAX_FORM_FILE_METADATA_COLUMNS are read and each
+    file gets a `blob_url` for loading its content lazily; pass metadata_only=False for full rows.
+    """
+    columns = ', '.join(TAX_FORM_FILE_METADATA_COLUMNS) if metadata_only else '*'
+    unique_ids = list(dict.fromkeys(form_ids))
+    files_by_form = {form_id: [] for form_id in unique_ids}
+    for start in range(0, len(unique_ids), batch_size):
+        batch = unique_ids[start:start + batch_size]
+        placeholders = ', '.join(['%s'] * len(batch))
+        query = f"""
+            SELECT {columns} FROM tax_form_files 
+            WHERE tax_form_id IN ({placeholders})
+        """
+        cursor.execute(query, tuple(batch))
+        for file in cursor.fetchall():
+            if metadata_only:
+                file['blob_url'] = tax_form_file_blob_url(file['id'])
+            files_by_form.setdefault(file['tax_form_id'], []).append(file)
+    return files_by_form
+
+def attach_tax_form_files(cursor, tax_forms):
+    """Set tax_form['files'] on every form using batched queries"""
+    files_by_form = load_tax_form_files(cursor, [tax_form['id'] for tax_form in tax_forms])
+    for tax_form in tax_forms:
+        tax_form['files'] = files_by_form.get(tax_form['id'], [])
+
+
+# Bytes per SUBSTRING statement when streaming content out of MySQL. InnoDB materializes
+# the whole LONGBLOB for each statement, so chunks are large: a file at MAX_CONTENT_LENGTH
+# (16 MB) takes 8 of them, under the SQL profiler's N+1 threshold.
+TAX_FORM_FILE_CHUNK_SIZE = 2 * 1024 * 1024
+
+# Columns added by `blob_migration.py prepare`: (expression, fallback before it has run).
+# A row without a stored digest (written before the triggers, not yet backfilled) is hashed.
+TAX_FORM_FILE_PREPARED_COLUMNS = {
+    'blob_sha256': ('blob_sha256', 'NULL'),
+    'content_sha256': ('COALESCE(content_sha256, SHA2(file_blobs, 256))', 'SHA2(file_blobs, 256)'),
+    'content_updated_at': ('content_updated_at', 'NULL'),
+}
+
+TAX_FORM_FILE_INFO_QUERY = """
+    SELECT id, file_name, file_type, LENGTH(file_blobs) AS blob_size, {prepared_columns}
+    FROM tax_form_files
+    WHERE id = %s
+"""
+
+
+def _tax_form_file_info_query(existing_columns=None):
+    """The metadata query, using fallbacks for prepared columns missing from `existing_columns`"""
+    expressions = []
+    for column, (expression, fallback) in TAX_FORM_FILE_PREPARED_COLUMNS.items():
+        if existing_columns is not None and column not in existing_columns:
+            expression = fallback
+        expressions.append(f"{expression} AS {column}")
+    return TAX_FORM_FILE_INFO_QUERY.format(prepared_columns=', '.join(expressions))
+
+
+class TaxFormFileSnapshot:
+    """A tax_form_files row read inside one consistent snapshot
+
+    open() (or `with`) reads `info`: the row's name, type, byte size, the SHA-256 of its
+    content and when the content last changed (None if the row doesn't exist). Both
+    validators are stored by the tax_form_files triggers, so revalidating doesn't hash
+    the LONGBLOB. iter_range() then streams a byte range of the content from the same
+    snapshot in TAX_FORM_FILE_CHUNK_SIZE pieces, so a body always matches the validators
+    and memory stays flat. The pooled connection is held until close().
+
+    blob_sha256 is set once the content has moved to the blob store (blob_size and
+    content_sha256 are then NULL).
+    """
+
+    def __init__(self, file_id):
+        self.file_id = file_id
+        self.info = None
+        self._conn = None
+
+    def open(self):
+        self._conn = get_db_connection()
+        if not self._conn:
+            raise Error(msg="No database connection available")
+        try:
+            self._conn.start_transaction(consistent_snapshot=True, readonly=True)
+            cursor = self._conn.cursor(dictionary=True)
+            try:
+                cursor.execute(_tax_form_file_info_query(), (self.file_id,))
+            except Error as e:
+                if e.errno != errorcode.ER_BAD_FIELD_ERROR:
+                    raise
+                # `blob_migration.py prepare` hasn't run yet: fall back for the missing columns
+                cursor.execute("SHOW COLUMNS FROM tax_form_files")
+                existing_columns = {row['Field'] for row in cursor.fetchall()}
+                cursor.execute(_tax_form_file_info_query(existing_columns), (self.file_id,))
+            self.info = cursor.fetchone()
+            cursor.close()
+        except Exception:
+            self.close()
+            raise
+        return self
+
+    def iter_range(self, start, stop, chunk_size=TAX_FORM_FILE_CHUNK_SIZE):
+        """Yield bytes [start, stop) of the file's content; closes the snapshot when done"""
+        try:
+            position = start
+            while position < stop:
+                cursor = self._conn.cursor()
+                # SUBSTRING positions are 1-based
+                cursor.execute(
+                    "SELECT SUBSTRING(file_blobs, %s, %s) FROM tax_form_files WHERE id = %s",
+                    (position + 1, min(chunk_size, stop - position), self.file_id)
+                )
+                row = cursor.fetchone()
+                cursor.close()
+                chunk = bytes(row[0]) if row and row[0] is not None else b''
+                if not chunk:
+                    break
+                yield chunk
+                position += len(chunk)
+        finally:
+            self.close()
+
+    def close(self):
+        """Release the connection; safe to call more than once"""
+        if self._conn is not None:
+            # close() rolls back, which ends the read-only snapshot
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
 def get_user_tax_forms(user_id):
     """Get all tax forms for a specific user"""
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -26,27 +180,23 @@ def get_user_tax_forms(user_id):
         cursor.execute(query, (user_id,))
         tax_forms = cursor.fetchall()
         
-        # Get associated files for each tax form
-        for tax_form in tax_forms:
-            files_query = """
-                SELECT * FROM tax_form_files 
-                WHERE tax_form_id = %s
-            """
-            cursor.execute(files_query, (tax_form['id'],))
-            files = cursor.fetchall()
-            tax_form['files'] = files
+        # Get associated files for all tax forms in batched queries
+        attach_tax_form_files(cursor, tax_forms)
             
         cursor.close()
-        conn.close()
         
-        return [format_tax_form_response(form) for form in tax_forms]
+        return [format_tax_form_response(form, form['files']) for form in tax_forms]
         
     except Error as e:
         print(f"Error fetching tax forms: {e}")
         return None
+    finally:
+        if conn:
+            conn.close()
 
 def get_tax_form_by_id(form_id):
     """Get a specific tax form by ID"""
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -64,25 +214,22 @@ def get_tax_form_by_id(form_id):
         
         if tax_form:
             # Get associated files
-            files_query = """
-                SELECT * FROM tax_form_files 
-                WHERE tax_form_id = %s
-            """
-            cursor.execute(files_query, (form_id,))
-            files = cursor.fetchall()
-            tax_form['files'] = files
+            attach_tax_form_files(cursor, [tax_form])
             
         cursor.close()
-        conn.close()
         
-        return format_tax_form_response(tax_form) if tax_form else None
+        return format_tax_form_response(tax_form, tax_form['files']) if tax_form else None
         
     except Error as e:
         print(f"Error fetching tax form: {e}")
         return None
+    finally:
+        if conn:
+            conn.close()
 
 def get_tax_forms_by_type(user_id, form_type):
     """Get tax forms of a specific type for a user"""
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -99,128 +246,329 @@ def get_tax_forms_by_type(user_id, form_type):
         cursor.execute(query, (user_id, form_type))
         tax_forms = cursor.fetchall()
         
-        # Get associated files for each tax form
-        for tax_form in tax_forms:
-            files_query = """
-                SELECT * FROM tax_form_files 
-                WHERE tax_form_id = %s
-            """
-            cursor.execute(files_query, (tax_form['id'],))
-            files = cursor.fetchall()
-            tax_form['files'] = files
+        # Get associated files for all tax forms in batched queries
+        attach_tax_form_files(cursor, tax_forms)
             
         cursor.close()
-        conn.close()
         
-        return [format_tax_form_response(form) for form in tax_forms]
+        return [format_tax_form_response(form, form['files']) for form in tax_forms]
         
     except Error as e:
         print(f"Error fetching tax forms: {e}")
         return None
+    finally:
+        if conn:
+            conn.close()
+
+def keyset_condition(columns, values):
+    """Build a WHERE fragment selecting rows after `values` in `ORDER BY columns DESC` order
 
-def get_all_users():
-    """Get all users from the database"""
+    For columns (a, b) this expands to `(a < %s OR (a = %s AND b < %s))`, which MySQL
+    can resolve as a range scan on a composite index over the same columns.
+
+    Returns:
+        tuple: (sql, params)
+    """
+    clauses = []
+    params = []
+    for i, column in enumerate(columns):
+        parts = [f"{prev} = %s" for prev in columns[:i]] + [f"{column} < %s"]
+        clauses.append(f"({' AND '.join(parts)})")
+        params.extend(values[:i + 1])
+    return f"({' OR '.join(clauses)})", params
+
+def fetch_keyset_page(base_query, params, sort_columns, limit, cursor=None, row_formatter=None):
+    """Run one page of a keyset-paginated query ordered by `sort_columns` DESC
+
+    Args:
+        base_query (str): SELECT ending in a WHERE clause (use `WHERE 1=1` if there is no filter).
+        params (list): Parameters for base_query.
+        sort_columns (list): Qualified columns forming a unique sort key, e.g. ['fp.created_at', 'fp.id'].
+            The selected row must expose each of them under its unqualified name.
+        limit (int): Page size.
+        cursor (list): Values from decode_cursor for the last row of the previous page, or empty/None.
+        row_formatter (callable): Optional per-row conversion applied after the cursor is taken.
+
+    Returns:
+        dict: {'items': [...], 'next_cursor': str or None, 'has_more': bool}, or None on error.
+    """
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
             return None
-            
-        cursor = conn.cursor(dictionary=True)
-        
-        query = """
-            SELECT id, name, email, phone, address, role, is_verified, created_at, updated_at 
-            FROM users 
-            ORDER BY created_at DESC
-        """
-        cursor.execute(query)
-        users = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
-        
-        return users
-        
+        query = base_query
+        params = list(params)
+        if cursor:
+            condition, condition_params = keyset_condition(sort_columns, cursor)
+            query += f" AND {condition}"
+            params.extend(condition_params)
+        # Fetch one extra row to learn whether another page exists
+        query += " ORDER BY " + ", ".join(f"{column} DESC" for column in sort_columns) + " LIMIT %s"
+        params.append(limit + 1)
+
+        db_cursor = conn.cursor(dictionary=True)
+        db_cursor.execute(query, tuple(params))
+        rows = db_cursor.fetchall()
+        db_cursor.close()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            next_cursor = encode_cursor([last[column.split('.')[-1]] for column in sort_columns])
+        if row_formatter:
+            rows = [row_formatter(row) for row in rows]
+        return {'items': rows, 'next_cursor': next_cursor, 'has_more': has_more}
     except Error as e:
-        print(f"Error fetching users: {e}")
+        print(f"Error fetching page: {e}")
         return None
+    finally:
+        if conn:
+            conn.close()
+
+class QueryBatches:
+    """Iterator over a running query's rows, read in fetchmany batches
+
+    close() releases the cursor and the pooled connection whether or not iteration
+    ever started (HEAD requests and early client disconnects never read the body);
+    it also runs once the rows are exhausted or reading them fails.
+    """
+
+    def __init__(self, conn, cursor, batch_size, row_formatter=None):
+        self._conn = conn
+        self._cursor = cursor
+        self._batch_size = batch_size
+        self._row_formatter = row_formatter
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._closed:
+            raise StopIteration
+        try:
+            rows = self._cursor.fetchmany(self._batch_size)
+        except Exception:
+            self.close()
+            raise
+        if not rows:
+            self.close()
+            raise StopIteration
+        return [self._row_formatter(row) for row in rows] if self._row_formatter else rows
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._cursor.close()
+        except Error:
+            pass
+        self._conn.close()
+
+def iter_query_batches(query, params=(), row_formatter=None, batch_size=None):
+    """Run a query and return a QueryBatches iterator over its rows
 
-def get_all_clients():
-    """Get all users with the 'client' role"""
+    The query is executed immediately (returning None if that fails) but rows are only
+    read from MySQL as the iterator is consumed, so a whole table is never held in memory.
+    The pooled connection is returned when the iterator is exhausted or closed.
+    """
+    batch_size = batch_size or Config.STREAM_BATCH_SIZE
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
             return None
-        cursor = conn.cursor(dictionary=True)
-        query = "SELECT * FROM users WHERE role = 'client' ORDER BY created_at DESC"
-        cursor.execute(query)
-        clients = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return clients
+        db_cursor = conn.cursor(dictionary=True)
+        db_cursor.execute(query, tuple(params))
     except Error as e:
-        print(f"Error fetching clients: {e}")
+        print(f"Error streaming query: {e}")
+        if conn:
+            conn.close()
         return None
+    except Exception:
+        if conn:
+            conn.close()
+        raise
+    return QueryBatches(conn, db_cursor, batch_size, row_formatter)
+
+USERS_QUERY = """
+    SELECT id, name, email, phone, address, role, is_verified, created_at, updated_at 
+    FROM users 
+    WHERE 1=1
+"""
+
+CLIENTS_QUERY = "SELECT * FROM users WHERE role = 'client'"
+
+APPOINTMENTS_QUERY = "SELECT * FROM appointments WHERE 1=1"
+
+ALL_FORM_PAYMENTS_QUERY = """
+    SELECT fp.*, tf.form_type as form_type_name
+    FROM form_payments fp
+    LEFT JOIN tax_forms tf ON fp.form_id = tf.id
+    WHERE 1=1
+"""
 
-def get_all_appointments():
+def get_all_users(limit=None, cursor=None):
+    """Get all users from the database
+
+    With `limit`, returns one keyset page on (created_at, id) as
+    {'items', 'next_cursor', 'has_more'}; otherwise returns an iterator of row batches
+    for streaming. Returns None on error.
+    """
+    if limit is not None:
+        return fetch_keyset_page(USERS_QUERY, [], ['created_at', 'id'], limit, cursor)
+    return iter_query_batches(USERS_QUERY + " ORDER BY created_at DESC")
+
+def get_all_clients(limit=None, cursor=None):
+    """Get all users with the 'client' role (paged or streamed, see get_all_users)"""
+    if limit is not None:
+        return fetch_keyset_page(CLIENTS_QUERY, [], ['created_at', 'id'], limit, cursor)
+    return iter_query_batches(CLIENTS_QUERY + " ORDER BY created_at DESC")
+
+def get_all_appointments(limit=None, cursor=None):
+    """Get all appointments, newest first (paged on (appointment_date, appointment_time, id) or streamed)"""
+    if limit is not None:
+        return fetch_keyset_page(APPOINTMENTS_QUERY, [], ['appointment_date', 'appointment_time', 'id'], limit, cursor)
+    return iter_query_batches(APPOINTMENTS_QUERY + " ORDER BY appointment_date DESC, appointment_time DESC")
+
+_file_manifest_cache = TTLCache(maxsize=Config.FILE_MANIFEST_CACHE_SIZE, ttl=Config.FILE_MANIFEST_CACHE_TTL)
+
+def get_form_file_manifest(form_id, refresh=False):
+    """Get the parsed list of files stored in a form's `files` JSON, without their blobs
+
+    The manifest is projected server-side with JSON_TABLE, so the base64 payloads never
+    leave MySQL, and cached per form. Each entry records the tax_form_files row id and
+    its position in the JSON array so a single blob can be extracted later, and the
+    blob_sha256 of content that was moved to the blob store.
+
+    tax_form_files is written outside this app (uploads come through the client-facing
+    service, and blob_migration.py runs as a separate process), so there is no write
+    path to invalidate from: a cached manifest can lag by up to FILE_MANIFEST_CACHE_TTL
+    seconds. get_form_file() refreshes it once when an entry is missing or stale.
+
+    Returns:
+        dict: {'files': [entry, ...], 'by_name': {file_name: entry}}, or None on error.
+    """
+    cache_key = str(form_id)
+    if not refresh:
+        manifest = _file_manifest_cache.get(cache_key)
+        if manifest is not None:
+            return manifest
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
             return None
         cursor = conn.cursor(dictionary=True)
-        query = "SELECT * FROM appointments ORDER BY appointment_date DESC, appointment_time DESC"
-        cursor.execute(query)
-        appointments = cursor.fetchall()
+        query = """
+            SELECT f.id AS row_id, jt.file_index, jt.file_name, jt.file_type, jt.file_size, jt.field_name,
+                jt.blob_sha256
+            FROM tax_form_files f,
+                JSON_TABLE(f.files, '$[*]' COLUMNS (
+                    file_index FOR ORDINALITY,
+                    file_name VARCHAR(255) PATH '$.file_name',
+                    file_type VARCHAR(255) PATH '$.file_type',
+                    file_size BIGINT PATH '$.file_size',
+                    field_name VARCHAR(255) PATH '$.field_name',
+                    blob_sha256 CHAR(64) PATH '$.blob_sha256'
+                )) AS jt
+            WHERE f.tax_form_id = %s AND JSON_VALID(f.files)
+            ORDER BY f.id, jt.file_index
+        """
+        cursor.execute(query, (form_id,))
+        entries = cursor.fetchall()
         cursor.close()
-        conn.close()
-        # Convert timedelta fields to string
-        for apt in appointments:
-            for k, v in apt.items():
-                if isinstance(v, timedelta):
-                    # Convert to string in HH:MM:SS format
-                    apt[k] = str(v)
-        return appointments
     except Error as e:
-        print(f"Error fetching appointments: {e}")
+        print(f"Error fetching file manifest: {e}")
         return None
+    finally:
+        if conn:
+            conn.close()
+
+    by_name = {}
+    for entry in entries:
+        # FOR ORDINALITY is 1-based, JSON array paths are 0-based
+        entry['file_index'] -= 1
+        by_name.setdefault(entry['file_name'], entry)
+    manifest = {'files': entries, 'by_name': by_name}
+    _file_manifest_cache.set(cache_key, manifest)
+    return manifest
 
 def get_files_for_form(form_id: str):
-    print(f"Fetching files for form_id: {form_id}")
+    """List the files attached to a form (metadata only)"""
+    manifest = get_form_file_manifest(form_id)
+    if manifest is None:
+        return []
+    return [
+        {
+            'file_name': entry['file_name'],
+            'file_type': entry['file_type'],
+            'file_size': entry['file_size'],
+            'field_name': entry['field_name'],
+            'form_id': form_id
+        }
+        for entry in manifest['files']
+    ]
+
+def _extract_form_file_blob(entry):
+    """Read one file's base64 payload out of the files JSON by its array position"""
     conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    query = "SELECT files FROM tax_form_files WHERE tax_form_id = %s"
-    print(f"Executing query: {query} with form_id={form_id}")
-    cursor.execute(query, (form_id,))
-    rows = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    
-    all_files = []
-    print(f"Found {len(rows)} rows")
-    
-    for row in rows:
-        if row and row['files']:
-            try:
-                print(f"Processing row with files: {row['files'][:100]}...")  # Print first 100 chars for debugging
-                files_list = json.loads(row['files'])
-                if isinstance(files_list, list):
-                    for file in files_list:
-                        # Keep only necessary fields
-                        file_info = {
-                            'file_name': file.get('file_name'),
-                            'file_type': file.get('file_type'),
-                            'file_size': file.get('file_size'),
-                            'field_name': file.get('field_name'),
-                            'form_id': form_id
-                        }
-                        all_files.append(file_info)
-            except Exception as e:
-                print(f"Error parsing files JSON: {e}")
-                print(f"Problematic row: {row}")
-    
-    print(f"Returning {len(all_files)} files")
-    return all_files
+    if not conn:
+        return None
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT JSON_EXTRACT(files, %s) FROM tax_form_files WHERE id = %s AND JSON_UNQUOTE(JSON_EXTRACT(files, %s)) = %s",
+            (f"$[{entry['file_index']}].file_blob", entry['row_id'], f"$[{entry['file_index']}].file_name", entry['file_name'])
+        )
+        row = cursor.fetchone()
+        cursor.close()
+        return row
+    finally:
+        conn.close()
+
+def get_form_file(form_id, file_name):
+    """Get a single file (including its base64 blob) from a form's files JSON
+
+    Only the requested element is extracted, so sibling files are never transferred or
+    decoded. Entries moved to the blob store are encoded from the memory-mapped blob. A
+    cache miss or a stale manifest entry triggers one manifest refresh.
+
+    Returns:
+        dict: file_blob, file_type and file_name, or None if the file doesn't exist.
+    """
+    try:
+        for refresh in (False, True):
+            manifest = get_form_file_manifest(form_id, refresh=refresh)
+            if manifest is None:
+                return None
+            entry = manifest['by_name'].get(file_name)
+            if entry is None:
+                continue
+            if entry['blob_sha256']:
+                file_blob = blob_store.read_base64(entry['blob_sha256'])
+            else:
+                row = _extract_form_file_blob(entry)
+                if row is None or (row[0] is None and not refresh):
+                    # Missing, or moved to the blob store since the manifest was cached
+                    continue
+                file_blob = json.loads(row[0]) if row[0] is not None else None
+            return {
+                'file_blob': file_blob,
+                'file_type': entry['file_type'],
+                'file_name': entry['file_name']
+            }
+        return None
+    except (Error, OSError) as e:
+        print(f"Error fetching form file: {e}")
+        return None
 
 def get_all_services():
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -230,21 +578,83 @@ def get_all_services():
         cursor.execute(query)
         services = cursor.fetchall()
         cursor.close()
-        conn.close()
-        # Convert Decimal and timedelta fields
+        # Services expose TIME durations in minutes
         for s in services:
             for k, v in s.items():
-                if isinstance(v, Decimal):
-                    s[k] = float(v)
-                elif isinstance(v, timedelta):
-                    s[k] = int(v.total_seconds() // 60)  # minutes
+                if isinstance(v, timedelta):
+                    s[k] = int(v.total_seconds() // 60)
         return services
     except Error as e:
         print(f"Error fetching services: {e}")
         return None 
+    finally:
+        if conn:
+            conn.close()
+
+def _load_services():
+    conn = None
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return None
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT id, name, duration FROM services ORDER BY id")
+        services = cursor.fetchall()
+        cursor.close()
+        return services
+    except Error as e:
+        print(f"Error fetching services: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+def _load_booking_config():
+    conn = None
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return None
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT * FROM booking_config LIMIT 1")
+        config = cursor.fetchone()
+        cursor.close()
+        return config or {}
+    except Error as e:
+        print(f"Error fetching booking config: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+# Reference data that only changes through update_service / update_booking_config,
+# shared by requests and invalidated across worker processes like the pricing configs
+services_cache = CachedResource(
+    'services', _load_services, ttl=Config.REFERENCE_CACHE_TTL,
+    stamp=VersionStamp(os.path.join(Config.CACHE_VERSION_DIR, 'services'))
+)
+booking_config_cache = CachedResource(
+    'booking_config', _load_booking_config, ttl=Config.REFERENCE_CACHE_TTL,
+    stamp=VersionStamp(os.path.join(Config.CACHE_VERSION_DIR, 'booking_config'))
+)
+
+def get_services():
+    """Get the services catalogue (id, name, duration) from the reference cache (read-only)"""
+    entry = services_cache.get()
+    return entry.value if entry else None
+
+def get_service_names():
+    """Map service id -> name from the reference cache"""
+    return {service['id']: service['name'] for service in get_services() or []}
+
+def get_booking_config():
+    """Get the booking configuration row from the reference cache ({} if there is none; read-only)"""
+    entry = booking_config_cache.get()
+    return entry.value if entry else None
 
 def get_form_payments(user_id):
     """Get all form payments for a specific user"""
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -262,60 +672,26 @@ def get_form_payments(user_id):
         cursor.execute(query, (user_id,))
         payments = cursor.fetchall()
         
-        # Convert Decimal to float and format dates for JSON serialization
-        for payment in payments:
-            if isinstance(payment['amount'], Decimal):
-                payment['amount'] = float(payment['amount'])
-            # Format date fields
-            if payment.get('payment_date'):
-                payment['payment_date'] = payment['payment_date'].isoformat()
-            if payment.get('created_at'):
-                payment['created_at'] = payment['created_at'].isoformat()
-            if payment.get('updated_at'):
-                payment['updated_at'] = payment['updated_at'].isoformat()
-        
         cursor.close()
-        conn.close()
         
         return payments
         
     except Error as e:
         print(f"Error fetching form payments: {e}")
         return None 
+    finally:
+        if conn:
+            conn.close()
 
-def get_all_form_payments():
-    """Get all form payments for all users"""
-    try:
-        conn = get_db_connection()
-        if not conn:
-            return None
-        cursor = conn.cursor(dictionary=True)
-        query = """
-            SELECT fp.*, tf.form_type as form_type_name
-            FROM form_payments fp
-            LEFT JOIN tax_forms tf ON fp.form_id = tf.id
-            ORDER BY fp.created_at DESC
-        """
-        cursor.execute(query)
-        payments = cursor.fetchall()
-        for payment in payments:
-            if isinstance(payment['amount'], Decimal):
-                payment['amount'] = float(payment['amount'])
-            if payment.get('payment_date'):
-                payment['payment_date'] = payment['payment_date'].isoformat()
-            if payment.get('created_at'):
-                payment['created_at'] = payment['created_at'].isoformat()
-            if payment.get('updated_at'):
-                payment['updated_at'] = payment['updated_at'].isoformat()
-        cursor.close()
-        conn.close()
-        return payments
-    except Error as e:
-        print(f"Error fetching all form payments: {e}")
-        return None
+def get_all_form_payments(limit=None, cursor=None):
+    """Get all form payments for all users (paged on (created_at, id) or streamed, see get_all_users)"""
+    if limit is not None:
+        return fetch_keyset_page(ALL_FORM_PAYMENTS_QUERY, [], ['fp.created_at', 'fp.id'], limit, cursor)
+    return iter_query_batches(ALL_FORM_PAYMENTS_QUERY + " ORDER BY fp.created_at DESC")
 
 def get_all_tax_forms_by_type(form_type):
     """Get all tax forms of a specific type for all users"""
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -328,24 +704,20 @@ def get_all_tax_forms_by_type(form_type):
         """
         cursor.execute(query, (form_type,))
         tax_forms = cursor.fetchall()
-        # Get associated files for each tax form
-        for tax_form in tax_forms:
-            files_query = """
-                SELECT * FROM tax_form_files 
-                WHERE tax_form_id = %s
-            """
-            cursor.execute(files_query, (tax_form['id'],))
-            files = cursor.fetchall()
-            tax_form['files'] = files
+        # Get associated files for all tax forms in batched queries
+        attach_tax_form_files(cursor, tax_forms)
         cursor.close()
-        conn.close()
-        return [format_tax_form_response(form) for form in tax_forms]
+        return [format_tax_form_response(form, form['files']) for form in tax_forms]
     except Error as e:
         print(f"Error fetching all tax forms by type: {e}")
         return None
+    finally:
+        if conn:
+            conn.close()
 
-def get_form_pricing_configs():
-    """Get all form pricing configurations"""
+def _load_form_pricing_configs():
+    """Read and parse every row of form_pricing_configs"""
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -360,37 +732,39 @@ def get_form_pricing_configs():
         cursor.execute(query)
         configs = cursor.fetchall()
         
-        # Convert JSON strings to Python objects and Decimal to float
+        # Convert JSON strings to Python objects
         for config in configs:
             if config.get('pricing_options'):
                 config['pricing_options'] = json.loads(config['pricing_options'])
-                # Convert Decimal to float in pricing options
-                for option in config['pricing_options']:
-                    if isinstance(option.get('price'), Decimal):
-                        option['price'] = float(option['price'])
-            
             if config.get('add_ons'):
                 config['add_ons'] = json.loads(config['add_ons'])
-                # Convert Decimal to float in add-ons
-                for addon in config['add_ons']:
-                    if isinstance(addon.get('price'), Decimal):
-                        addon['price'] = float(addon['price'])
-            
-            # Convert Decimal to float in main config
-            if isinstance(config.get('gst_rate'), Decimal):
-                config['gst_rate'] = float(config['gst_rate'])
         
         cursor.close()
-        conn.close()
         
         return configs
         
     except Error as e:
         print(f"Error fetching form pricing configs: {e}")
         return None
+    finally:
+        if conn:
+            conn.close()
+
+# Parsed pricing configs, shared by requests until update_form_pricing_config() (in any
+# worker process) bumps the version stamp
+form_pricing_configs_cache = CachedResource(
+    'form_pricing_configs', _load_form_pricing_configs, ttl=Config.PRICING_CACHE_TTL,
+    stamp=VersionStamp(os.path.join(Config.CACHE_VERSION_DIR, 'form_pricing_configs'))
+)
+
+def get_form_pricing_configs():
+    """Get all form pricing configurations (cached; treat the result as read-only)"""
+    entry = form_pricing_configs_cache.get()
+    return entry.value if entry else None
 
 def update_form_pricing_config(config_id, data):
     """Update a form pricing configuration"""
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -426,86 +800,150 @@ def update_form_pricing_config(config_id, data):
         
         cursor.execute(query, tuple(values))
         conn.commit()
+        form_pricing_configs_cache.invalidate()
         
         # Get the updated record
         select_query = "SELECT * FROM form_pricing_configs WHERE id = %s"
         cursor.execute(select_query, (config_id,))
         updated_config = cursor.fetchone()
         
-        # Convert JSON strings back to Python objects and Decimal to float
+        # Convert JSON strings back to Python objects
         if updated_config.get('pricing_options'):
             updated_config['pricing_options'] = json.loads(updated_config['pricing_options'])
-            # Convert Decimal to float in pricing options
-            for option in updated_config['pricing_options']:
-                if isinstance(option.get('price'), Decimal):
-                    option['price'] = float(option['price'])
-        
         if updated_config.get('add_ons'):
             updated_config['add_ons'] = json.loads(updated_config['add_ons'])
-            # Convert Decimal to float in add-ons
-            for addon in updated_config['add_ons']:
-                if isinstance(addon.get('price'), Decimal):
-                    addon['price'] = float(addon['price'])
-        
-        # Convert Decimal to float in main config
-        if isinstance(updated_config.get('gst_rate'), Decimal):
-            updated_config['gst_rate'] = float(updated_config['gst_rate'])
         
         cursor.close()
-        conn.close()
         
         return updated_config
         
     except Error as e:
         print(f"Error updating form pricing config: {e}")
         return None 
+    finally:
+        if conn:
+            conn.close()
+
+NOTIFICATION_FLAGS_CHECKSUM = "BIT_XOR(CRC32(CONCAT_WS(',', id, is_read, is_archived)))"
+
+# Cheap single-row probes whose result changes whenever the data behind the matching
+# list endpoint does; used to answer conditional GETs before running the real query
+FINGERPRINT_QUERIES = {
+    'user_tax_forms': """
+        SELECT MAX(tf.updated_at), COUNT(DISTINCT tf.id), COUNT(f.id), MAX(f.id)
+        FROM tax_forms tf
+        LEFT JOIN tax_form_files f ON f.tax_form_id = tf.id
+        WHERE tf.user_id = %s
+    """,
+    # The listing returns each payment's tax form type, so form changes count too
+    'user_form_payments': """
+        SELECT MAX(fp.updated_at), COUNT(*), MAX(tf.updated_at), COUNT(tf.id)
+        FROM form_payments fp
+        LEFT JOIN tax_forms tf ON fp.form_id = tf.id
+        WHERE fp.user_id = %s
+    """,
+    'appointments': "SELECT MAX(updated_at), COUNT(*) FROM appointments",
+    # Read/archived flags don't show up in MAX(id)/COUNT(*): an order-independent checksum
+    # covers them, whoever writes them (idx_notifications_user_flags makes it index-only)
+    'notifications': f"SELECT MAX(id), COUNT(*), {NOTIFICATION_FLAGS_CHECKSUM} FROM notifications",
+    'user_notifications': f"SELECT MAX(id), COUNT(*), {NOTIFICATION_FLAGS_CHECKSUM} FROM notifications WHERE user_id = %s",
+}
+
+notifications_version = VersionStamp(os.path.join(Config.CACHE_VERSION_DIR, 'notifications'))
 
-def get_notifications(user_id=None, limit=50, offset=0, include_archived=False):
-    """Get notifications for a user or all notifications if user_id is None"""
+def get_change_fingerprint(name, params=()):
+    """Run the FINGERPRINT_QUERIES probe `name`
+
+    Returns:
+        list: The probe's row (plus the notifications version for notification probes),
+        or None on error, in which case callers should serve the full response.
+    """
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
             return None
-            
-        cursor = conn.cursor(dictionary=True)
-        
-        query = """
-            SELECT n.*, u.name as user_name 
-            FROM notifications n
-            LEFT JOIN users u ON n.user_id = u.id
-            WHERE 1=1
-        """
-        params = []
+        cursor = conn.cursor()
+        cursor.execute(FINGERPRINT_QUERIES[name], tuple(params))
+        fingerprint = list(cursor.fetchone() or [])
+        cursor.close()
+        if name in ('notifications', 'user_notifications'):
+            fingerprint.append(notifications_version.key())
+        return fingerprint
+    except Error as e:
+        print(f"Error computing {name} fingerprint: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+def _parse_notification_metadata(notification):
+    if notification.get('metadata'):
+        notification['metadata'] = json.loads(notification['metadata'])
+    return notification
+
+def get_notifications(user_id=None, limit=50, offset=0, include_archived=False, cursor=None):
+    """Get notifications for a user or all notifications if user_id is None
+
+    Two paging modes are supported:
+        - offset (default): `LIMIT limit OFFSET offset`, returns a list.
+        - keyset: pass `cursor` (a list of [created_at, id] values from decode_cursor, or an
+          empty list for the first page). Rows are selected after the cursor position on
+          (created_at, id), so every page costs the same as the first. Returns
+          {'items': [...], 'next_cursor': str or None, 'has_more': bool}.
+    """
+    query = """
+        SELECT n.*, u.name as user_name 
+        FROM notifications n
+        LEFT JOIN users u ON n.user_id = u.id
+        WHERE 1=1
+    """
+    params = []
+    
+    if user_id is not None:
+        query += " AND n.user_id = %s"
+        params.append(user_id)
         
-        if user_id is not None:
-            query += " AND n.user_id = %s"
-            params.append(user_id)
-            
-        if not include_archived:
-            query += " AND n.is_archived = FALSE"
+    if not include_archived:
+        query += " AND n.is_archived = FALSE"
+
+    if cursor is not None:
+        return fetch_keyset_page(
+            query, params, ['n.created_at', 'n.id'], limit, cursor,
+            row_formatter=_parse_notification_metadata
+        )
+
+    conn = None
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return None
             
+        db_cursor = conn.cursor(dictionary=True)
+        
         query += " ORDER BY n.created_at DESC LIMIT %s OFFSET %s"
         params.extend([limit, offset])
         
-        cursor.execute(query, tuple(params))
-        notifications = cursor.fetchall()
+        db_cursor.execute(query, tuple(params))
+        notifications = db_cursor.fetchall()
         
         # Convert JSON strings to Python objects
-        for notification in notifications:
-            if notification.get('metadata'):
-                notification['metadata'] = json.loads(notification['metadata'])
+        notifications = [_parse_notification_metadata(notification) for notification in notifications]
         
-        cursor.close()
-        conn.close()
+        db_cursor.close()
         
         return notifications
         
     except Error as e:
         print(f"Error fetching notifications: {e}")
         return None
+    finally:
+        if conn:
+            conn.close()
 
 def mark_notification_read(notification_id):
     """Mark a notification as read"""
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -520,6 +958,7 @@ def mark_notification_read(notification_id):
         """
         cursor.execute(query, (notification_id,))
         conn.commit()
+        notifications_version.bump()
         
         # Get the updated notification
         select_query = "SELECT * FROM notifications WHERE id = %s"
@@ -530,16 +969,19 @@ def mark_notification_read(notification_id):
             notification['metadata'] = json.loads(notification['metadata'])
         
         cursor.close()
-        conn.close()
         
         return notification
         
     except Error as e:
         print(f"Error marking notification as read: {e}")
         return None
+    finally:
+        if conn:
+            conn.close()
 
 def archive_notification(notification_id):
     """Archive a notification"""
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -554,18 +996,22 @@ def archive_notification(notification_id):
         """
         cursor.execute(query, (notification_id,))
         conn.commit()
+        notifications_version.bump()
         
         cursor.close()
-        conn.close()
         
         return True
         
     except Error as e:
         print(f"Error archiving notification: {e}")
         return None
+    finally:
+        if conn:
+            conn.close()
 
 def unarchive_notification(notification_id):
     """Unarchive a notification"""
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -580,6 +1026,7 @@ def unarchive_notification(notification_id):
         """
         cursor.execute(query, (notification_id,))
         conn.commit()
+        notifications_version.bump()
         
         # Get the updated notification
         select_query = "SELECT * FROM notifications WHERE id = %s"
@@ -590,16 +1037,19 @@ def unarchive_notification(notification_id):
             notification['metadata'] = json.loads(notification['metadata'])
         
         cursor.close()
-        conn.close()
         
         return notification
         
     except Error as e:
         print(f"Error unarchiving notification: {e}")
         return None 
+    finally:
+        if conn:
+            conn.close()
 
 def mark_all_notifications_read(user_id=None):
     """Mark all unread notifications for a user as read, or all if user_id is None"""
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -620,18 +1070,22 @@ def mark_all_notifications_read(user_id=None):
 
         cursor.execute(query, tuple(params))
         conn.commit()
+        notifications_version.bump()
         
         cursor.close()
-        conn.close()
         
         return True
         
     except Error as e:
         print(f"Error marking all notifications as read: {e}")
         return None 
+    finally:
+        if conn:
+            conn.close()
 
 def get_user_by_email(email):
     """Get a user by email (including password hash and role)"""
+    conn = None
     try:
         conn = get_db_connection()
         if not conn:
@@ -646,58 +1100,73 @@ def get_user_by_email(email):
         cursor.execute(query, (email,))
         user = cursor.fetchone()
         cursor.close()
-        conn.close()
         return user
-    except Exception as e:
+    except Error as e:
         print(f"Error fetching user by email: {e}")
         return None 
+    finally:
+        if conn:
+            conn.close()
 
 def set_reset_token(user_id, token, expiry):
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE users SET reset_token=%s, reset_token_expiry=%s WHERE id=%s",
-        (token, expiry, user_id)
-    )
-    conn.commit()
-    cursor.close()
-    conn.close()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE users SET reset_token=%s, reset_token_expiry=%s WHERE id=%s",
+            (token, expiry, user_id)
+        )
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
 
 def get_user_by_reset_token(token):
     conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute(
-        "SELECT * FROM users WHERE reset_token=%s",
-        (token,)
-    )
-    user = cursor.fetchone()
-    cursor.close()
-    conn.close()
-    return user
+    try:
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute(
+            "SELECT * FROM users WHERE reset_token=%s",
+            (token,)
+        )
+        user = cursor.fetchone()
+        cursor.close()
+        return user
+    finally:
+        conn.close()
 
 def clear_reset_token(user_id):
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE users SET reset_token=NULL, reset_token_expiry=NULL WHERE id=%s",
-        (user_id,)
-    )
-    conn.commit()
-    cursor.close()
-    conn.close()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE users SET reset_token=NULL, reset_token_expiry=NULL WHERE id=%s",
+            (user_id,)
+        )
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
 
 def update_user_password(user_id, hashed_password):
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE users SET password=%s WHERE id=%s",
-        (hashed_password, user_id)
-    )
-    conn.commit()
-    cursor.close()
-    conn.close()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE users SET password=%s WHERE id=%s",
+            (hashed_password, user_id)
+        )
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
 
 def send_reset_email(email, token):
+    """Queue the password reset email
+
+    Raises:
+        MailQueueFull: If the outbound mail queue can't take the message.
+    """
     reset_link = f"http://localhost:8080/reset-password?token={token}"
     subject = "Password Reset Request"
     body = f"""
@@ -717,17 +1186,87 @@ def send_reset_email(email, token):
     msg['From'] = Config.EMAIL_USER
     msg['To'] = email
 
-    try:
-        with smtplib.SMTP(Config.EMAIL_HOST, Config.EMAIL_PORT) as server:
-            server.starttls()
-            server.login(Config.EMAIL_USER, Config.EMAIL_PASS)
-            server.sendmail(Config.EMAIL_USER, [email], msg.as_string())
-        print(f"Reset email sent to {email}")
-    except Exception as e:
-        print(f"Failed to send email: {e}") 
+    # Delivered by the background senders in mailer.py; this only queues the message
+    mail_queue.enqueue(Config.EMAIL_USER, [email], msg.as_string())
+    print(f"Reset email queued for {email}")
+
+# Dashboard aggregate queries. Every predicate compares a bare column against a constant
+# range (half-open [start, end) date boundaries) so MySQL can use the indexes listed in
+# db_indexes.py; wrapping the column in MONTH()/YEAR()/TIMESTAMP() would force full scans.
+MONTH_START_SQL = "(LAST_DAY(CURDATE() - INTERVAL 1 MONTH) + INTERVAL 1 DAY)"
+PREV_MONTH_START_SQL = "(LAST_DAY(CURDATE() - INTERVAL 2 MONTH) + INTERVAL 1 DAY)"
+NEXT_MONTH_START_SQL = "(LAST_DAY(CURDATE()) + INTERVAL 1 DAY)"
+
+DASHBOARD_TOTAL_CLIENTS_QUERY = "SELECT COUNT(*) as total FROM users WHERE role = 'client'"
+
+DASHBOARD_MONTHLY_REVENUE_QUERY = f"""
+    SELECT
+        COALESCE(SUM(CASE WHEN payment_date >= {MONTH_START_SQL} THEN amount ELSE 0 END), 0) as current_month_revenue,
+        COALESCE(SUM(CASE WHEN payment_date < {MONTH_START_SQL} THEN amount ELSE 0 END), 0) as prev_month_revenue
+    FROM form_payments
+    WHERE payment_status = 'completed'
+        AND payment_date >= {PREV_MONTH_START_SQL}
+        AND payment_date < {NEXT_MONTH_START_SQL}
+"""
+
+DASHBOARD_PENDING_PAYMENTS_QUERY = """
+    SELECT COALESCE(SUM(amount), 0) as total_pending
+    FROM form_payments
+    WHERE payment_status = 'pending'
+"""
+
+DASHBOARD_NEW_CLIENTS_QUERY = f"""
+    SELECT
+        COUNT(CASE WHEN created_at >= {MONTH_START_SQL} THEN id END) as current_month_clients,
+        COUNT(CASE WHEN created_at < {MONTH_START_SQL} THEN id END) as prev_month_clients
+    FROM users
+    WHERE role = 'client'
+        AND created_at >= {PREV_MONTH_START_SQL}
+        AND created_at < {NEXT_MONTH_START_SQL}
+"""
+
+# Read from the daily revenue rollup (see analytics.py) instead of aggregating form_payments
+DASHBOARD_REVENUE_TREND_QUERY = """
+    SELECT
+        day as date,
+        SUM(total_amount) as revenue
+    FROM analytics_daily_revenue
+    WHERE day >= CURDATE() - INTERVAL 14 DAY
+    GROUP BY day
+    ORDER BY day ASC
+"""
+
+# The same trend aggregated from form_payments, while `analytics.py rebuild` hasn't run yet
+DASHBOARD_REVENUE_TREND_FALLBACK_QUERY = """
+    SELECT
+        DATE(payment_date) as date,
+        SUM(amount) as revenue
+    FROM form_payments
+    WHERE payment_date >= CURDATE() - INTERVAL 14 DAY
+    GROUP BY DATE(payment_date)
+    ORDER BY date ASC
+"""
+
+# The leading range on appointment_date drives the index scan; rows for today are then
+# filtered on appointment_time, and the ORDER BY follows the index so only 5 rows are read.
+DASHBOARD_UPCOMING_APPOINTMENTS_QUERY = """
+    SELECT
+        a.id,
+        TIMESTAMP(a.appointment_date, a.appointment_time) as start_time,
+        u.name as user_name,
+        s.name as service_name
+    FROM appointments a
+    JOIN users u ON a.user_id = u.id
+    JOIN services s ON a.service_id = s.id
+    WHERE a.appointment_date >= CURDATE()
+        AND (a.appointment_date > CURDATE() OR a.appointment_time > CURTIME())
+    ORDER BY a.appointment_date ASC, a.appointment_time ASC
+    LIMIT 5
+"""
 
 def get_dashboard_main_widgets_data():
     """Fetches data for the main dashboard widgets: stats, revenue trend, and upcoming appointments."""
+    rollup_refresher.start()
     conn = get_db_connection()
     if not conn:
         return None
@@ -738,29 +1277,17 @@ def get_dashboard_main_widgets_data():
         # 1. Dashboard Stats
         
         # Total clients (users with role 'client')
-        cursor.execute("SELECT COUNT(*) as total FROM users WHERE role = 'client';")
+        cursor.execute(DASHBOARD_TOTAL_CLIENTS_QUERY)
         total_users = cursor.fetchone()['total']
 
-        # Monthly Revenue & Pending Payments (Current and Previous Month)
-        query = """
-            SELECT
-                SUM(CASE WHEN payment_status = 'completed' AND MONTH(payment_date) = MONTH(CURDATE()) AND YEAR(payment_date) = YEAR(CURDATE()) THEN amount ELSE 0 END) as current_month_revenue,
-                SUM(CASE WHEN payment_status = 'completed' AND MONTH(payment_date) = MONTH(CURDATE() - INTERVAL 1 MONTH) AND YEAR(payment_date) = YEAR(CURDATE() - INTERVAL 1 MONTH) THEN amount ELSE 0 END) as prev_month_revenue,
-                SUM(CASE WHEN payment_status = 'pending' THEN amount ELSE 0 END) as total_pending
-            FROM form_payments;
-        """
-        cursor.execute(query)
+        # Monthly Revenue (Current and Previous Month) & Pending Payments
+        cursor.execute(DASHBOARD_MONTHLY_REVENUE_QUERY)
         payment_stats = cursor.fetchone()
+        cursor.execute(DASHBOARD_PENDING_PAYMENTS_QUERY)
+        payment_stats.update(cursor.fetchone())
 
         # New clients (Current and Previous Month)
-        query = """
-            SELECT
-                COUNT(CASE WHEN MONTH(created_at) = MONTH(CURDATE()) AND YEAR(created_at) = YEAR(CURDATE()) THEN id END) as current_month_clients,
-                COUNT(CASE WHEN MONTH(created_at) = MONTH(CURDATE() - INTERVAL 1 MONTH) AND YEAR(created_at) = YEAR(CURDATE() - INTERVAL 1 MONTH) THEN id END) as prev_month_clients
-            FROM users
-            WHERE role = 'client';
-        """
-        cursor.execute(query)
+        cursor.execute(DASHBOARD_NEW_CLIENTS_QUERY)
         client_stats = cursor.fetchone()
 
         def get_change(current, previous):
@@ -780,17 +1307,12 @@ def get_dashboard_main_widgets_data():
         }
         
         # 2. Revenue Trend (last 14 days)
-        # Using DATE() is common for MySQL to group by the date part of a datetime column.
-        revenue_query = """
-            SELECT
-                DATE(payment_date) as date,
-                SUM(amount) as revenue
-            FROM form_payments
-            WHERE payment_date >= DATE_SUB(CURDATE(), INTERVAL 14 DAY)
-            GROUP BY DATE(payment_date)
-            ORDER BY date ASC;
-        """
-        cursor.execute(revenue_query)
+        try:
+            cursor.execute(DASHBOARD_REVENUE_TREND_QUERY)
+        except Error as e:
+            if e.errno != errorcode.ER_NO_SUCH_TABLE:
+                raise
+            cursor.execute(DASHBOARD_REVENUE_TREND_FALLBACK_QUERY)
         revenue_data = cursor.fetchall()
 
         # Create a complete 14-day date range to ensure the chart is continuous
@@ -806,21 +1328,7 @@ def get_dashboard_main_widgets_data():
         revenue_trend.reverse() # Order from oldest to newest
 
         # 3. Upcoming Appointments (next 5)
-        # Combine appointment_date and appointment_time to create a full datetime for comparison
-        appointments_query = """
-            SELECT
-                a.id,
-                TIMESTAMP(a.appointment_date, a.appointment_time) as start_time,
-                u.name as user_name,
-                s.name as service_name
-            FROM appointments a
-            JOIN users u ON a.user_id = u.id
-            JOIN services s ON a.service_id = s.id
-            WHERE TIMESTAMP(a.appointment_date, a.appointment_time) > NOW()
-            ORDER BY start_time ASC
-            LIMIT 5;
-        """
-        cursor.execute(appointments_query)
+        cursor.execute(DASHBOARD_UPCOMING_APPOINTMENTS_QUERY)
         upcoming_appointments = cursor.fetchall()
         
         return {
@@ -836,40 +1344,25 @@ def get_dashboard_main_widgets_data():
         conn.close() 
 
 def get_client_growth_data():
-    """Fetches client growth data for the last 6 months."""
-    conn = get_db_connection()
-    if not conn:
-        return None
-    cursor = conn.cursor(dictionary=True)
-    try:
-        # Get client counts grouped by month for the last 6 months
-        query = """
-            SELECT
-                DATE_FORMAT(created_at, '%Y-%m') as month,
-                COUNT(id) as new_clients
-            FROM users
-            WHERE role = 'client' AND created_at >= DATE_SUB(CURDATE(), INTERVAL 6 MONTH)
-            GROUP BY month
-            ORDER BY month ASC;
-        """
-        cursor.execute(query)
-        client_growth = cursor.fetchall()
-        
-        # Format for the chart on the frontend
-        # Example: { "month": "Jun", "clients": 202 }
-        formatted_data = []
-        for row in client_growth:
-            # Convert '2023-06' to 'Jun'
-            month_abbr = datetime.strptime(row['month'], '%Y-%m').strftime('%b')
-            formatted_data.append({
-                "month": month_abbr,
-                "clients": row['new_clients']
-            })
-            
-        return formatted_data
-    except Exception as e:
-        print(f"Error fetching client growth data: {e}")
+    """Fetches client growth data for the last 6 months from the daily client rollup."""
+    today = date.today()
+    # Same day six months ago, clamped to the end of shorter months
+    year, month = divmod(today.year * 12 + today.month - 1 - 6, 12)
+    month += 1
+    start = date(year, month, min(today.day, calendar.monthrange(year, month)[1]))
+
+    client_growth = get_client_growth_rollup(start, today, 'month')
+    if client_growth is None:
         return None
-    finally:
-        cursor.close()
-        conn.close() 
\ No newline at end of file
+
+    # Format for the chart on the frontend
+    # Example: { "month": "Jun", "clients": 202 }
+    formatted_data = []
+    for row in client_growth:
+        # Convert '2023-06-01' to 'Jun'
+        month_abbr = datetime.strptime(row['period'], '%Y-%m-%d').strftime('%b')
+        formatted_data.append({
+            "month": month_abbr,
+            "clients": row['new_clients']
+        })
+    return formatted_data
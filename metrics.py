@@ -0,0 +1,227 @@
+import bisect
+import contextvars
+import threading
+import time
+from flask import request
+
+# Request latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# DB queries issued by one request (a high count usually means an N+1 loop)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# Work done outside a request (dashboard refresh thread, analytics catch-up, ...)
+BACKGROUND_ROUTE = '(background)'
+
+
+class Histogram:
+    """Fixed-bucket histogram; not thread-safe on its own (MetricsRegistry locks around it)"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            total += count
+            yield bound, total
+
+
+class RequestMetrics:
+    """Counters for the request currently being handled"""
+
+    __slots__ = ('started', 'db_queries', 'db_seconds', 'connection_wait_seconds', 'serialization_seconds')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.connection_wait_seconds = 0.0
+        self.serialization_seconds = 0.0
+
+
+class RouteStats:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.statuses = {}
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.connection_wait_seconds = 0.0
+        self.serialization_seconds = 0.0
+
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class MetricsRegistry:
+    """Per-route request, DB and serialization metrics for this worker process
+
+    Each request gets a RequestMetrics in a context variable. The DB pool, its cursors
+    and the JSON provider add to it through record_*(). Totals are folded into the
+    route's stats when the response is closed, so streamed bodies are included.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}  # (route, method) -> RouteStats
+        self._background = RouteStats()
+
+    def _stats(self, route, method):
+        stats = self._routes.get((route, method))
+        if stats is None:
+            stats = self._routes[(route, method)] = RouteStats()
+        return stats
+
+    def start_request(self):
+        metrics = RequestMetrics()
+        _current.set(metrics)
+        return metrics
+
+    def finish_request(self, metrics, route, method, status):
+        elapsed = time.perf_counter() - metrics.started
+        with self._lock:
+            stats = self._stats(route, method)
+            stats.latency.observe(elapsed)
+            stats.queries.observe(metrics.db_queries)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.db_queries += metrics.db_queries
+            stats.db_seconds += metrics.db_seconds
+            stats.connection_wait_seconds += metrics.connection_wait_seconds
+            stats.serialization_seconds += metrics.serialization_seconds
+        if _current.get() is metrics:
+            _current.set(None)
+
+    def record_query(self, seconds, executed=True):
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.db_queries += executed
+            metrics.db_seconds += seconds
+            return
+        with self._lock:
+            self._background.db_queries += executed
+            self._background.db_seconds += seconds
+
+    def record_connection_wait(self, seconds):
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.connection_wait_seconds += seconds
+            return
+        with self._lock:
+            self._background.connection_wait_seconds += seconds
+
+    def record_serialization(self, seconds):
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.serialization_seconds += seconds
+
+    def route_totals(self, route, method):
+        """Cumulative request and DB totals for one route (zeros if it hasn't been hit)"""
+        with self._lock:
+            stats = self._routes.get((route, method))
+            if stats is None:
+                return {'requests': 0, 'db_queries': 0, 'db_seconds': 0.0}
+            return {'requests': stats.latency.count, 'db_queries': stats.db_queries, 'db_seconds': stats.db_seconds}
+
+    def render_prometheus(self):
+        """Render every metric in the Prometheus text exposition format"""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = []
+
+            def header(name, kind, help_text):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+            def histogram(name, attr):
+                for (route, method), stats in routes:
+                    hist = getattr(stats, attr)
+                    labels = f'route="{_escape(route)}",method="{method}"'
+                    for bound, count in hist.cumulative():
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                    lines.append(f"{name}_sum{{{labels}}} {hist.sum:.6f}")
+                    lines.append(f"{name}_count{{{labels}}} {hist.count}")
+
+            def counter(name, attr, fmt):
+                for (route, method), stats in routes + [((BACKGROUND_ROUTE, ''), self._background)]:
+                    labels = f'route="{_escape(route)}",method="{method}"'
+                    lines.append(f"{name}{{{labels}}} {format(getattr(stats, attr), fmt)}")
+
+            header('http_request_duration_seconds', 'histogram', 'Request latency until the response body is sent.')
+            histogram('http_request_duration_seconds', 'latency')
+
+            header('http_requests_total', 'counter', 'Requests by route, method and status code.')
+            for (route, method), stats in routes:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(
+                        f'http_requests_total{{route="{_escape(route)}",method="{method}",status="{status}"}} {count}'
+                    )
+
+            header('http_request_db_queries', 'histogram', 'DB queries executed per request.')
+            histogram('http_request_db_queries', 'queries')
+
+            header('db_queries_total', 'counter', 'DB queries executed.')
+            counter('db_queries_total', 'db_queries', 'd')
+            header('db_query_seconds_total', 'counter', 'Time spent executing queries and fetching rows.')
+            counter('db_query_seconds_total', 'db_seconds', '.6f')
+            header('db_connection_wait_seconds_total', 'counter', 'Time spent acquiring pooled connections.')
+            counter('db_connection_wait_seconds_total', 'connection_wait_seconds', '.6f')
+            header('json_serialization_seconds_total', 'counter', 'Time spent encoding JSON responses.')
+            counter('json_serialization_seconds_total', 'serialization_seconds', '.6f')
+
+        lines.extend(_pool_gauges())
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _pool_gauges():
+    from db_pool import get_pool_stats
+    try:
+        stats = get_pool_stats()
+    except Exception as e:
+        print(f"Error reading pool stats for metrics: {e}")
+        return []
+    lines = []
+    for key, help_text in (('in_use', 'Borrowed connections.'), ('idle', 'Idle pooled connections.'),
+                           ('waiting', 'Threads waiting for a connection.')):
+        lines.append(f"# HELP db_pool_{key} {help_text}")
+        lines.append(f"# TYPE db_pool_{key} gauge")
+        lines.append(f"db_pool_{key} {stats[key]}")
+    return lines
+
+
+registry = MetricsRegistry()
+record_query = registry.record_query
+record_connection_wait = registry.record_connection_wait
+record_serialization = registry.record_serialization
+
+
+def _before_request():
+    registry.start_request()
+
+
+def _after_request(response):
+    metrics = _current.get()
+    if metrics is None:
+        return response
+    route = request.url_rule.rule if request.url_rule is not None else '(unmatched)'
+    method = request.method
+    status = response.status_code
+    response.call_on_close(lambda: registry.finish_request(metrics, route, method, status))
+    return response
+
+
+def init_app(app):
+    """Record metrics for every request handled by `app`"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
@@ -0,0 +1,113 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import bcrypt
+from config import Config
+
+
+class PasswordWorkerBusy(Exception):
+    """Raised when the password hashing queue is full or a job doesn't finish in time"""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated, size-capped thread pool
+
+    At most `workers` hashes run at once (bcrypt releases the GIL, so they don't block
+    other request threads) and at most `max_queue` more may wait. Anything beyond that is
+    rejected immediately with PasswordWorkerBusy instead of tying up request workers.
+    """
+
+    def __init__(self, workers, max_queue, timeout):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._total_hash_seconds = 0.0
+        self._max_hash_seconds = 0.0
+        self._total_wait_seconds = 0.0
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordWorkerBusy('Password hashing queue is full')
+        queued_at = time.monotonic()
+        with self._lock:
+            self._pending += 1
+
+        def job():
+            started = time.monotonic()
+            with self._lock:
+                self._pending -= 1
+                self._running += 1
+                self._total_wait_seconds += started - queued_at
+            try:
+                return fn(*args)
+            finally:
+                elapsed = time.monotonic() - started
+                with self._lock:
+                    self._running -= 1
+                    self.completed += 1
+                    self._total_hash_seconds += elapsed
+                    self._max_hash_seconds = max(self._max_hash_seconds, elapsed)
+                self._slots.release()
+
+        try:
+            future = self._get_executor().submit(job)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+            raise
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self.timed_out += 1
+            raise PasswordWorkerBusy('Password hashing timed out')
+
+    def check_password(self, password, hashed):
+        """Return True if `password` matches the bcrypt hash `hashed`"""
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+
+    def hash_password(self, password):
+        """Return a new bcrypt hash of `password` as a string"""
+        return self._run(lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8'))
+
+    def stats(self):
+        with self._lock:
+            completed = self.completed
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'queue_depth': self._pending,
+                'running': self._running,
+                'completed': completed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'avg_hash_seconds': round(self._total_hash_seconds / completed, 6) if completed else 0.0,
+                'max_hash_seconds': round(self._max_hash_seconds, 6),
+                'avg_wait_seconds': round(self._total_wait_seconds / completed, 6) if completed else 0.0,
+            }
+
+
+password_hasher = PasswordHasher(
+    workers=Config.PASSWORD_HASH_WORKERS,
+    max_queue=Config.PASSWORD_HASH_QUEUE_SIZE,
+    timeout=Config.PASSWORD_HASH_TIMEOUT,
+)
@@ -0,0 +1,190 @@
+import threading
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from methods import form_pricing_configs_cache
+
+CENTS = Decimal('0.01')
+
+# Keys an option / add-on can be referenced by in a quote request
+ITEM_KEYS = ('id', 'name', 'label')
+
+
+class PricingError(ValueError):
+    """Raised when a quote references an unknown form type, option or add-on, or the stored pricing is invalid"""
+
+
+def _to_decimal(value):
+    """Convert a stored price or rate; raises PricingError if it isn't a finite number"""
+    if value is None or value == '':
+        return Decimal('0')
+    if isinstance(value, bool):
+        raise PricingError(f"Invalid amount {value!r} in pricing config")
+    try:
+        result = value if isinstance(value, Decimal) else Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        raise PricingError(f"Invalid amount {value!r} in pricing config")
+    if not result.is_finite():
+        raise PricingError(f"Invalid amount {value!r} in pricing config")
+    return result
+
+
+def _money(value):
+    try:
+        return value.quantize(CENTS, rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        raise PricingError(f"Amount {value} is out of range")
+
+
+def _gst_fraction(rate):
+    """gst_rate is stored as a percentage (DECIMAL(5,2), e.g. 10.00 for 10%)"""
+    return _to_decimal(rate) / 100
+
+
+def _index_items(items):
+    """Map every reference key (id, name, label; case-insensitive) of each item to (name, price)"""
+    index = {}
+    for item in items or []:
+        if not isinstance(item, dict):
+            continue
+        name = item.get('name') or item.get('label') or item.get('id')
+        entry = (name, _to_decimal(item.get('price')))
+        for key in ITEM_KEYS:
+            if item.get(key) is not None:
+                index.setdefault(str(item[key]).strip().lower(), entry)
+    return index
+
+
+class CompiledPricing:
+    """One form type's pricing config reduced to dictionary lookups"""
+
+    __slots__ = ('form_type', 'options', 'add_ons', 'gst_rate')
+
+    def __init__(self, config):
+        self.form_type = config['form_type']
+        self.options = _index_items(config.get('pricing_options'))
+        self.add_ons = _index_items(config.get('add_ons'))
+        self.gst_rate = _gst_fraction(config.get('gst_rate'))
+
+    def quote(self, option, add_ons=None):
+        option_entry = self.options.get(str(option).strip().lower())
+        if option_entry is None:
+            raise PricingError(f"Unknown pricing option '{option}' for form type '{self.form_type}'")
+        if isinstance(add_ons, str):
+            add_ons = [add_ons]
+        elif add_ons is not None and not isinstance(add_ons, list):
+            raise PricingError('add_ons must be a string or a list')
+        selected_add_ons = []
+        seen = set()
+        subtotal = option_entry[1]
+        for add_on in add_ons or ():
+            key = str(add_on).strip().lower()
+            if key in seen:
+                continue
+            add_on_entry = self.add_ons.get(key)
+            if add_on_entry is None:
+                raise PricingError(f"Unknown add-on '{add_on}' for form type '{self.form_type}'")
+            seen.add(key)
+            selected_add_ons.append({'name': add_on_entry[0], 'price': add_on_entry[1]})
+            subtotal += add_on_entry[1]
+        subtotal = _money(subtotal)
+        gst = _money(subtotal * self.gst_rate)
+        return {
+            'form_type': self.form_type,
+            'option': {'name': option_entry[0], 'price': option_entry[1]},
+            'add_ons': selected_add_ons,
+            'subtotal': subtotal,
+            'gst_rate': self.gst_rate,
+            'gst': gst,
+            'total': subtotal + gst,
+        }
+
+
+class InvalidPricing:
+    """Stands in for a form type whose stored pricing config can't be compiled"""
+
+    __slots__ = ('form_type', 'message')
+
+    def __init__(self, form_type, message):
+        self.form_type = form_type
+        self.message = message
+
+    def quote(self, option, add_ons=None):
+        raise PricingError(self.message)
+
+
+def _compile(config):
+    try:
+        return CompiledPricing(config)
+    except PricingError as e:
+        print(f"Invalid pricing config for form type '{config['form_type']}': {e}")
+        return InvalidPricing(config['form_type'], f"Pricing for form type '{config['form_type']}' is misconfigured")
+
+
+class QuoteEngine:
+    """Computes quotes from the cached pricing configs without touching MySQL
+
+    The configs are compiled once per cache entry. A new entry appears after
+    update_form_pricing_config() (in any worker process) or the cache TTL, and is
+    compiled on the next quote.
+    """
+
+    def __init__(self, cache):
+        self._cache = cache
+        self._source = None
+        self._compiled = {}
+        self._lock = threading.Lock()
+        self.compilations = 0
+
+    def _pricing(self):
+        entry = self._cache.get()
+        if entry is None:
+            return None
+        if entry is not self._source:
+            with self._lock:
+                if entry is not self._source:
+                    self._compiled = {config['form_type']: _compile(config) for config in entry.value}
+                    self._source = entry
+                    self.compilations += 1
+        return self._compiled
+
+    def quote(self, form_type, option, add_ons=None):
+        """Price one form type / option / add-on selection
+
+        Returns:
+            dict: Quote with subtotal, gst and total (Decimal), or None if configs can't be loaded.
+
+        Raises:
+            PricingError: On an unknown form type, option or add-on, add_ons that aren't a
+            string or list, or a form type whose stored prices can't be read.
+        """
+        pricing = self._pricing()
+        if pricing is None:
+            return None
+        compiled = pricing.get(form_type)
+        if compiled is None:
+            raise PricingError(f"Unknown form type '{form_type}'")
+        return compiled.quote(option, add_ons)
+
+    def quote_many(self, requests):
+        """Price a list of {'form_type', 'option', 'add_ons'} requests
+
+        Returns:
+            list: One quote or {'error': ...} per request, or None if configs can't be loaded.
+        """
+        pricing = self._pricing()
+        if pricing is None:
+            return None
+        results = []
+        for request_data in requests:
+            try:
+                if not isinstance(request_data, dict):
+                    raise PricingError('Each quote request must be an object')
+                compiled = pricing.get(request_data.get('form_type'))
+                if compiled is None:
+                    raise PricingError(f"Unknown form type '{request_data.get('form_type')}'")
+                results.append(compiled.quote(request_data.get('option'), request_data.get('add_ons')))
+            except PricingError as e:
+                results.append({'error': str(e)})
+        return results
+
+
+quote_engine = QuoteEngine(form_pricing_configs_cache)
@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+from config import Config
+from db_pool import get_pool, get_pool_stats
+from methods import form_pricing_configs_cache, services_cache, booking_config_cache
+from dashboard import main_widgets_snapshot
+
+# Reference data every worker loads before it starts serving
+REFERENCE_CACHES = (form_pricing_configs_cache, services_cache, booking_config_cache)
+
+
+class WorkerReadiness:
+    """Warm-up and shutdown state of this worker process, reported by /readyz
+
+    warm_up() opens DB_POOL_WARMUP pooled connections, loads the reference caches and
+    computes the dashboard snapshot, so the first requests after a deploy don't pay for
+    it. A worker that failed to warm up retries on the next readiness check. After
+    SIGTERM (shutdown, or SIGHUP replacing the workers) the worker reports draining.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.warmed = False
+        self.draining = False
+        self.warm_up_seconds = None
+        self.connections_opened = 0
+        self.last_error = None
+
+    def warm_up(self):
+        """Prepare the pool and caches; returns True if the worker is warmed up"""
+        with self._lock:
+            if self.warmed:
+                return True
+            started = time.perf_counter()
+            try:
+                self.connections_opened += get_pool().warm_up(Config.DB_POOL_WARMUP)
+                missing = [cache.name for cache in REFERENCE_CACHES if cache.get() is None]
+                if missing:
+                    raise RuntimeError(f"could not load {', '.join(missing)}")
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Worker {os.getpid()} warm-up failed: {e}")
+                return False
+            if main_widgets_snapshot.get() is None:
+                # Not fatal: the dashboard computes its snapshot on first use instead
+                print(f"Worker {os.getpid()} could not precompute the dashboard snapshot")
+            self.warm_up_seconds = round(time.perf_counter() - started, 3)
+            self.last_error = None
+            self.warmed = True
+            print(f"Worker {os.getpid()} warmed up in {self.warm_up_seconds}s "
+                  f"({self.connections_opened} connection(s) opened)")
+            return True
+
+    def mark_draining(self):
+        self.draining = True
+
+    def check(self):
+        """Return (ready, details) for the readiness probe"""
+        warmed = self.warmed or (not self.draining and self.warm_up())
+        # get() reloads expired entries, so this also notices a database that went away
+        caches = {cache.name: cache.get() is not None for cache in REFERENCE_CACHES}
+        pool = get_pool_stats()
+        ready = warmed and not self.draining and all(caches.values())
+        if self.draining:
+            status = 'draining'
+        elif not warmed:
+            status = 'warming'
+        else:
+            status = 'ready' if ready else 'degraded'
+        return ready, {
+            'status': status,
+            'pid': os.getpid(),
+            'warm_up_seconds': self.warm_up_seconds,
+            'last_error': self.last_error,
+            'caches': caches,
+            'pool': {key: pool[key] for key in ('size', 'in_use', 'idle', 'waiting', 'timeouts')},
+        }
+
+
+worker_readiness = WorkerReadiness()
@@ -0,0 +1,121 @@
+import base64
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from time import perf_counter
+from flask.json.provider import DefaultJSONProvider
+from config import Config
+from metrics import record_serialization
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib encoder
+    orjson = None
+
+
+def format_timedelta(value):
+    """Format a timedelta (how MySQL TIME columns are returned) as zero-padded [-]HH:MM:SS"""
+    total_seconds = int(value.total_seconds())
+    sign = '-' if total_seconds < 0 else ''
+    total_seconds = abs(total_seconds)
+    hours, remainder = divmod(total_seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{sign}{hours:02}:{minutes:02}:{seconds:02}"
+
+
+def _encode_datetime(value):
+    return value.isoformat()
+
+
+def _encode_time(value):
+    return value.strftime('%H:%M:%S')
+
+
+def _encode_bytes(value):
+    return base64.b64encode(value).decode('ascii')
+
+
+def _encode_set(value):
+    return list(value)
+
+
+# Exact type -> encoder for the values MySQL rows contain. Looked up once per
+# non-native value instead of each query function walking its rows.
+ENCODERS = {
+    Decimal: float,
+    datetime: _encode_datetime,
+    date: _encode_datetime,
+    time: _encode_time,
+    timedelta: format_timedelta,
+    bytes: _encode_bytes,
+    bytearray: _encode_bytes,
+    set: _encode_set,
+    frozenset: _encode_set,
+}
+
+
+def encode_value(value):
+    """`default` hook shared by both encoders: convert one non-JSON value"""
+    encoder = ENCODERS.get(type(value))
+    if encoder is None:
+        # Subclasses (e.g. pendulum datetimes), then Flask's own fallbacks (UUID, dataclasses, ...)
+        for value_type, candidate in ENCODERS.items():
+            if isinstance(value, value_type):
+                encoder = candidate
+                break
+        else:
+            return DefaultJSONProvider.default(value)
+    return encoder(value)
+
+
+class AppJSONProvider(DefaultJSONProvider):
+    """JSON provider that encodes DB row values (Decimal, datetime, date, time, TIME
+    timedeltas, bytes) in a single pass, using orjson when it is installed.
+
+    Dates and datetimes are ISO 8601, times and timedeltas HH:MM:SS, Decimals floats and
+    bytes base64.
+    """
+
+    default = staticmethod(encode_value)
+
+    def __init__(self, app, use_orjson=None):
+        super().__init__(app)
+        if use_orjson is None:
+            use_orjson = Config.JSON_USE_ORJSON
+        self.use_orjson = bool(use_orjson and orjson is not None)
+
+    def _orjson_options(self, indent):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def _encode(self, obj, indent):
+        if self.use_orjson:
+            return orjson.dumps(obj, default=encode_value, option=self._orjson_options(indent))
+        if indent:
+            return super().dumps(obj, indent=2).encode('utf-8')
+        return super().dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    def dumps_bytes(self, obj, indent=False):
+        """Serialize `obj` to UTF-8 JSON bytes"""
+        started = perf_counter()
+        try:
+            return self._encode(obj, indent)
+        finally:
+            record_serialization(perf_counter() - started)
+
+    def dumps(self, obj, **kwargs):
+        if self.use_orjson and not kwargs:
+            return self.dumps_bytes(obj).decode('utf-8')
+        started = perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            record_serialization(perf_counter() - started)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent=indent) + b'\n', mimetype=self.mimetype)
@@ -0,0 +1,256 @@
+import contextvars
+import functools
+import hashlib
+import re
+import threading
+import time
+from collections import deque
+from flask import request
+from config import Config
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_PLACEHOLDER_RE = re.compile(r"%\(\w+\)s|%s")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+BACKGROUND_ROUTE = '(background)'
+OTHER_FINGERPRINT = '(other)'
+
+
+@functools.lru_cache(maxsize=4096)
+def fingerprint(statement):
+    """Normalize a SQL statement so executions that differ only in values group together
+
+    Literals and placeholders become `?`, `IN (...)` lists of any length collapse, and
+    whitespace is squeezed.
+    """
+    if isinstance(statement, (bytes, bytearray)):
+        statement = statement.decode('utf-8', 'replace')
+    normalized = _STRING_RE.sub('?', statement)
+    normalized = _PLACEHOLDER_RE.sub('?', normalized)
+    normalized = _NUMBER_RE.sub('?', normalized)
+    normalized = _WHITESPACE_RE.sub(' ', normalized).strip()
+    return _IN_LIST_RE.sub('IN (...)', normalized)
+
+
+def fingerprint_id(value):
+    return hashlib.sha1(value.encode('utf-8')).hexdigest()[:12]
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class FingerprintStats:
+    def __init__(self, text, samples):
+        self.text = text
+        self.id = fingerprint_id(text)
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.slow = 0
+        self.routes = {}
+        self.durations = deque(maxlen=samples)  # most recent executions, for percentiles
+
+    def to_dict(self):
+        durations = sorted(self.durations)
+        return {
+            'id': self.id,
+            'fingerprint': self.text,
+            'count': self.count,
+            'total_ms': round(self.total_seconds * 1000, 3),
+            'avg_ms': round(self.total_seconds * 1000 / self.count, 3) if self.count else 0.0,
+            'p50_ms': round(_percentile(durations, 0.50) * 1000, 3),
+            'p95_ms': round(_percentile(durations, 0.95) * 1000, 3),
+            'max_ms': round(self.max_seconds * 1000, 3),
+            'rows': self.rows,
+            'slow': self.slow,
+            'routes': dict(sorted(self.routes.items(), key=lambda item: -item[1])),
+        }
+
+
+class QueryTrace:
+    """One execution of a statement, completed when its cursor moves on or is closed"""
+
+    __slots__ = ('fingerprint', 'route', 'seconds', 'rows', 'finished')
+
+    def __init__(self, fingerprint_text, route, seconds):
+        self.fingerprint = fingerprint_text
+        self.route = route
+        self.seconds = seconds
+        self.rows = 0
+        self.finished = False
+
+
+class RequestProfile:
+    __slots__ = ('route', 'queries', 'seconds', 'counts')
+
+    def __init__(self, route):
+        self.route = route
+        self.queries = 0
+        self.seconds = 0.0
+        self.counts = {}  # fingerprint -> executions in this request
+
+
+_current = contextvars.ContextVar('sql_profile', default=None)
+
+
+class SQLProfiler:
+    """Aggregates every statement run through the pool's cursors by fingerprint
+
+    Tracks count, time (with p50/p95 over the last `samples` executions), rows returned
+    and the routes issuing it. Executions slower than `slow_query_ms` are logged with
+    their route. A request that runs one fingerprint more than `n_plus_one_threshold`
+    times is logged as a likely N+1 loop.
+    """
+
+    def __init__(self, enabled=True, slow_query_ms=200, n_plus_one_threshold=10, samples=1000,
+                 max_fingerprints=500, history=100):
+        self.enabled = enabled
+        self.slow_query_ms = slow_query_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.samples = samples
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.slow_queries = deque(maxlen=history)
+        self.n_plus_one = deque(maxlen=history)
+
+    def _fingerprint_stats(self, text):
+        stats = self._stats.get(text)
+        if stats is None:
+            if len(self._stats) >= self.max_fingerprints:
+                text = OTHER_FINGERPRINT
+                stats = self._stats.get(text)
+            if stats is None:
+                stats = self._stats[text] = FingerprintStats(text, self.samples)
+        return stats
+
+    def start_request(self, route):
+        profile = RequestProfile(route)
+        _current.set(profile)
+        return profile
+
+    def finish_request(self, profile):
+        if _current.get() is profile:
+            _current.set(None)
+        for text, count in profile.counts.items():
+            if count > self.n_plus_one_threshold:
+                print(f"Possible N+1 on {profile.route}: {count} executions of [{fingerprint_id(text)}] {text}")
+                with self._lock:
+                    self.n_plus_one.append({
+                        'route': profile.route,
+                        'id': fingerprint_id(text),
+                        'fingerprint': text,
+                        'executions': count,
+                        'at': time.time(),
+                    })
+
+    def record_execute(self, statement, seconds):
+        """Record a statement's execution; returns the QueryTrace that fetches add to"""
+        if not self.enabled:
+            return None
+        text = fingerprint(statement)
+        profile = _current.get()
+        route = profile.route if profile is not None else BACKGROUND_ROUTE
+        if profile is not None:
+            profile.queries += 1
+            profile.seconds += seconds
+            profile.counts[text] = profile.counts.get(text, 0) + 1
+        return QueryTrace(text, route, seconds)
+
+    def record_fetch(self, trace, seconds, rows):
+        if trace is None or trace.finished:
+            return
+        trace.seconds += seconds
+        trace.rows += rows
+        profile = _current.get()
+        if profile is not None:
+            profile.seconds += seconds
+
+    def finish(self, trace):
+        """Fold a completed execution into its fingerprint's stats"""
+        if trace is None or trace.finished:
+            return
+        trace.finished = True
+        slow = trace.seconds * 1000 >= self.slow_query_ms
+        with self._lock:
+            stats = self._fingerprint_stats(trace.fingerprint)
+            stats.count += 1
+            stats.total_seconds += trace.seconds
+            stats.max_seconds = max(stats.max_seconds, trace.seconds)
+            stats.rows += trace.rows
+            stats.durations.append(trace.seconds)
+            stats.routes[trace.route] = stats.routes.get(trace.route, 0) + 1
+            if slow:
+                stats.slow += 1
+                self.slow_queries.append({
+                    'route': trace.route,
+                    'id': stats.id,
+                    'fingerprint': trace.fingerprint,
+                    'ms': round(trace.seconds * 1000, 3),
+                    'rows': trace.rows,
+                    'at': time.time(),
+                })
+        if slow:
+            print(f"Slow query ({trace.seconds * 1000:.1f} ms, {trace.rows} rows) on {trace.route}: {trace.fingerprint}")
+
+    def report(self, limit=50, order_by='total_ms'):
+        with self._lock:
+            fingerprints = [stats.to_dict() for stats in self._stats.values()]
+            slow_queries = list(self.slow_queries)
+            n_plus_one = list(self.n_plus_one)
+        fingerprints.sort(key=lambda item: item.get(order_by, 0), reverse=True)
+        return {
+            'enabled': self.enabled,
+            'slow_query_ms': self.slow_query_ms,
+            'n_plus_one_threshold': self.n_plus_one_threshold,
+            'fingerprints': fingerprints[:limit],
+            'slow_queries': slow_queries,
+            'n_plus_one': n_plus_one,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.slow_queries.clear()
+            self.n_plus_one.clear()
+
+
+profiler = SQLProfiler(
+    enabled=Config.SQL_PROFILER_ENABLED,
+    slow_query_ms=Config.SQL_SLOW_QUERY_MS,
+    n_plus_one_threshold=Config.SQL_N_PLUS_ONE_THRESHOLD,
+    samples=Config.SQL_PROFILER_SAMPLES,
+)
+
+
+def _before_request():
+    if profiler.enabled:
+        profiler.start_request(request.url_rule.rule if request.url_rule is not None else '(unmatched)')
+
+
+def _after_request(response):
+    profile = _current.get()
+    if profile is None:
+        return response
+    if Config.SQL_PROFILER_DEBUG_HEADER:
+        # Queries run while a streamed body is generated aren't included
+        repeated = max(profile.counts.items(), key=lambda item: item[1], default=(None, 0))
+        value = f"queries={profile.queries}; db_ms={profile.seconds * 1000:.3f}"
+        if repeated[0] is not None:
+            value += f"; max_repeat={repeated[1]}x{fingerprint_id(repeated[0])}"
+        response.headers['X-SQL-Profile'] = value
+    response.call_on_close(lambda: profiler.finish_request(profile))
+    return response
+
+
+def init_app(app):
+    """Profile the SQL run by every request handled by `app`"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
@@ -0,0 +1,167 @@
+import mimetypes
+import os
+import posixpath
+import stat
+from collections import namedtuple
+from datetime import datetime, timezone
+from urllib.parse import quote
+from flask import request, Response
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from werkzeug.security import safe_join
+from werkzeug.wsgi import wrap_file
+from blob_store import blob_store
+from cache import TTLCache
+from config import Config
+from utils import is_not_modified, content_disposition_header
+
+# How the file bytes are sent: by this process, or by the front proxy after an auth-only response
+SENDFILE_MODES = ('', 'x-accel-redirect', 'x-sendfile')
+
+UploadInfo = namedtuple('UploadInfo', ['path', 'relative_path', 'size', 'mtime_ns', 'last_modified', 'etag', 'mimetype'])
+
+# path -> UploadInfo; uploads are write-once, so short-lived entries are safe
+_stat_cache = TTLCache(maxsize=Config.UPLOAD_STAT_CACHE_SIZE, ttl=Config.UPLOAD_STAT_CACHE_TTL)
+
+if Config.UPLOAD_SENDFILE_MODE not in SENDFILE_MODES:
+    print(f"Unknown UPLOAD_SENDFILE_MODE '{Config.UPLOAD_SENDFILE_MODE}'; uploads are served by the app")
+
+
+def _upload_info(path, relative_path, st):
+    return UploadInfo(
+        path=path,
+        relative_path=relative_path,
+        size=st.st_size,
+        mtime_ns=st.st_mtime_ns,
+        last_modified=datetime.fromtimestamp(st.st_mtime_ns // 1_000_000_000, timezone.utc),
+        # mtime and size only (no inode), so every host sharing the upload volume agrees
+        etag=f"{st.st_mtime_ns:x}-{st.st_size:x}",
+        mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream',
+    )
+
+
+def resolve_upload(directory, filename):
+    """Look up `filename` under `directory`, using the stat cache
+
+    Returns:
+        UploadInfo: The file's path and validators, or None if the name escapes
+        `directory` or isn't a regular file.
+    """
+    relative_path = filename.replace('\\', '/')
+    path = safe_join(directory, relative_path)
+    if path is None:
+        return None
+    info = _stat_cache.get(path)
+    if info is None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        info = _upload_info(path, posixpath.normpath(relative_path), st)
+        _stat_cache.set(path, info)
+    return info
+
+
+def _file_response(info):
+    """Stream the file from this process; werkzeug handles Range and If-Range"""
+    f = open(info.path, 'rb')
+    try:
+        st = os.fstat(f.fileno())
+        if st.st_size != info.size or st.st_mtime_ns != info.mtime_ns:
+            # Replaced since it was cached; describe the file actually being sent
+            info = _upload_info(info.path, info.relative_path, st)
+            _stat_cache.set(info.path, info)
+    except Exception:
+        f.close()
+        raise
+    response = Response(wrap_file(request.environ, f), mimetype=info.mimetype, direct_passthrough=True)
+    response.content_length = info.size
+    return info, response
+
+
+def serve_upload(directory, filename, mode=None):
+    """Respond with an uploaded file, or return None if it doesn't exist
+
+    Unchanged files get 304 Not Modified from the cached stat alone. In the
+    x-accel-redirect and x-sendfile modes the response carries only headers, and
+    the front proxy sends the bytes itself (with sendfile). Otherwise the file is
+    sent from this process through wsgi.file_wrapper, which also uses sendfile.
+    """
+    mode = Config.UPLOAD_SENDFILE_MODE if mode is None else mode
+    info = resolve_upload(directory, filename)
+    if info is None:
+        return None
+
+    if is_not_modified(etag=info.etag, last_modified=info.last_modified):
+        response = Response(status=304)
+    elif mode == 'x-accel-redirect':
+        response = Response(mimetype=info.mimetype)
+        response.headers['X-Accel-Redirect'] = (
+            f"{Config.UPLOAD_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{quote(info.relative_path)}"
+        )
+    elif mode == 'x-sendfile':
+        response = Response(mimetype=info.mimetype)
+        response.headers['X-Sendfile'] = info.path
+    else:
+        try:
+            info, response = _file_response(info)
+        except FileNotFoundError:
+            _stat_cache.pop(info.path)
+            return None
+
+    return _finish_file_response(
+        response, info.etag, info.last_modified, posixpath.basename(info.relative_path), info.size
+    )
+
+
+def serve_blob(digest, mimetype=None, file_name=None, last_modified=None, mode=None):
+    """Respond with a blob from the blob store, or return None if it is missing
+
+    The digest is the ETag: blobs never change, so a matching If-None-Match gets 304
+    without touching the disk. The sendfile modes work as in serve_upload(), with the
+    proxy mapping BLOB_ACCEL_REDIRECT_PREFIX to BLOB_STORE_DIR.
+    """
+    mode = Config.UPLOAD_SENDFILE_MODE if mode is None else mode
+    mimetype = mimetype or 'application/octet-stream'
+    size = None
+    if is_not_modified(etag=digest, last_modified=last_modified):
+        response = Response(status=304)
+    elif mode == 'x-accel-redirect':
+        response = Response(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = (
+            f"{Config.BLOB_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{blob_store.relative_path(digest)}"
+        )
+    elif mode == 'x-sendfile':
+        response = Response(mimetype=mimetype)
+        response.headers['X-Sendfile'] = blob_store.path(digest)
+    else:
+        try:
+            f = blob_store.open(digest)
+        except FileNotFoundError:
+            return None
+        try:
+            size = os.fstat(f.fileno()).st_size
+        except Exception:
+            f.close()
+            raise
+        response = Response(wrap_file(request.environ, f), mimetype=mimetype, direct_passthrough=True)
+        response.content_length = size
+    return _finish_file_response(response, digest, last_modified, file_name or digest, size)
+
+
+def _finish_file_response(response, etag, last_modified, file_name, size):
+    """Add validators and headers; a body sent by this process also gets Range support"""
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['Content-Disposition'] = content_disposition_header('inline', file_name)
+    if response.direct_passthrough:
+        try:
+            response.make_conditional(request.environ, accept_ranges=True, complete_length=size)
+        except RequestedRangeNotSatisfiable:
+            response.close()
+            response = Response(status=416)
+            response.headers['Content-Range'] = f"bytes */{size}"
+    return response
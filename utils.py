@@ -1,22 +1,26 @@
-import mysql.connector
 from mysql.connector import Error
 from config import Config
+from db_pool import get_pool, PoolTimeoutError
+from cache import TTLCache
+import base64
+import hashlib
 import json
+import time
 import jwt
 from functools import wraps
-from flask import request, jsonify
-from datetime import datetime, timedelta, timezone
+from flask import request, jsonify, current_app, Response, stream_with_context
+from werkzeug.http import is_resource_modified
+from urllib.parse import quote
+from datetime import date, datetime, timedelta, timezone
 
 def get_db_connection():
+    """Borrow a connection from the pool; close() on it returns it to the pool
+
+    Returns None if MySQL can't be reached. PoolTimeoutError (every connection busy for
+    DB_POOL_TIMEOUT seconds) is raised to the caller, and the app answers it with 503.
+    """
     try:
-        connection = mysql.connector.connect(
-            host=Config.MYSQL_HOST,
-            user=Config.MYSQL_USER,
-            password=Config.MYSQL_PASSWORD,
-            database=Config.MYSQL_DB,
-            port=Config.MYSQL_PORT
-        )
-        return connection
+        return get_pool().acquire()
     except Error as e:
         print(f"Error connecting to MySQL: {e}")
         return None
@@ -50,6 +54,92 @@ def format_tax_form_response(tax_form, files=None):
         
     return response
 
+def _encode_cursor_value(value):
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'$d': value.isoformat()}
+    if isinstance(value, timedelta):
+        return {'$td': value.total_seconds()}
+    return value
+
+def _decode_cursor_value(value):
+    if not isinstance(value, dict):
+        return value
+    if '$dt' in value:
+        return datetime.fromisoformat(value['$dt'])
+    if '$d' in value:
+        return date.fromisoformat(value['$d'])
+    if '$td' in value:
+        return timedelta(seconds=value['$td'])
+    raise ValueError('unknown cursor value type')
+
+def encode_cursor(values):
+    """Encode keyset pagination values (e.g. created_at, id) into an opaque cursor string"""
+    encoded = [_encode_cursor_value(v) for v in values]
+    raw = json.dumps(encoded, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor back into its list of values
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        encoded = json.loads(raw)
+        if not isinstance(encoded, list):
+            raise ValueError('cursor must encode a list')
+        return [_decode_cursor_value(v) for v in encoded]
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError(f'Invalid cursor: {e}')
+
+def get_pagination_args(cursor_length, default_limit=50, max_limit=1000):
+    """Read `limit` and `cursor` query parameters for keyset-paginated list endpoints
+
+    Returns:
+        tuple: (limit, cursor) where cursor is a list of decoded values (empty for the first
+        page), or (None, None) when neither parameter is present and the caller should
+        return the whole collection.
+
+    Raises:
+        ValueError: If limit or cursor is invalid.
+    """
+    if 'limit' not in request.args and 'cursor' not in request.args:
+        return None, None
+    limit = request.args.get('limit', default_limit, type=int)
+    if limit is None or limit < 1:
+        raise ValueError('limit must be a positive integer')
+    limit = min(limit, max_limit)
+    cursor = decode_cursor(request.args['cursor']) if request.args.get('cursor') else []
+    if cursor and len(cursor) != cursor_length:
+        raise ValueError('cursor does not match this endpoint')
+    return limit, cursor
+
+def stream_json_array(batches):
+    """Stream an iterable of row batches as a single JSON array response
+
+    Rows are serialized with the app's JSON provider as they arrive, so the first bytes are
+    sent immediately and memory stays bounded by one batch. If `batches` has a close()
+    method it is called when the response is closed, even if the body was never read
+    (HEAD requests, clients that disconnect early).
+    """
+    def generate():
+        yield '['
+        first = True
+        for batch in batches:
+            if not batch:
+                continue
+            chunk = ','.join(current_app.json.dumps(row) for row in batch)
+            yield chunk if first else ',' + chunk
+            first = False
+        yield ']'
+    response = Response(stream_with_context(generate()), mimetype='application/json')
+    if hasattr(batches, 'close'):
+        response.call_on_close(batches.close)
+    return response
+
 def generate_jwt_token(user_id, email, role):
     """Generate JWT token for authenticated user"""
     try:
@@ -66,8 +156,33 @@ def generate_jwt_token(user_id, email, role):
         print(f"Error generating JWT token: {e}")
         return None
 
-def verify_jwt_token(token):
-    """Verify and decode JWT token"""
+# Verified token payloads keyed by the token's SHA-256 digest; each entry expires at the token's `exp`
+_token_cache = TTLCache(maxsize=Config.JWT_CACHE_SIZE, ttl=Config.JWT_CACHE_DEFAULT_TTL)
+_token_revocation_checks = []
+_revoked_token_hits = 0
+
+def _token_digest(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def register_token_revocation_check(check):
+    """Register a callable check(payload, token_digest) -> bool that returns True for revoked tokens
+
+    Checks run on every request, including cache hits, so they must be cheap (e.g. a set
+    lookup); revoked tokens get the same 401 as invalid ones.
+    """
+    _token_revocation_checks.append(check)
+
+def invalidate_cached_token(token):
+    """Drop a token from the verified-token cache (e.g. on logout or revocation)"""
+    _token_cache.pop(_token_digest(token))
+
+def get_token_cache_stats():
+    """Return hit/miss/eviction counters of the verified-token cache"""
+    stats = _token_cache.stats()
+    stats['revoked'] = _revoked_token_hits
+    return stats
+
+def _decode_jwt_token(token):
     try:
         payload = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=['HS256'])
         return payload
@@ -79,6 +194,33 @@ def verify_jwt_token(token):
         print(f"Error verifying JWT token: {e}")
         return {'error': 'Token verification failed'}
 
+def verify_jwt_token(token):
+    """Verify and decode JWT token
+
+    Successfully verified payloads are cached until the token's `exp`, so repeated requests
+    with the same bearer token skip signature verification. Failures are never cached.
+    """
+    global _revoked_token_hits
+    digest = _token_digest(token)
+    payload = _token_cache.get(digest)
+    if payload is None:
+        payload = _decode_jwt_token(token)
+        if 'error' in payload:
+            return payload
+        exp = payload.get('exp')
+        if exp is not None:
+            remaining = exp - time.time()
+            if remaining > 0:
+                _token_cache.set(digest, payload, expires_at=time.monotonic() + remaining)
+        else:
+            _token_cache.set(digest, payload)
+
+    for check in _token_revocation_checks:
+        if check(payload, digest):
+            _revoked_token_hits += 1
+            return {'error': 'Token has been revoked'}
+    return dict(payload)
+
 def jwt_required(roles=None):
     """Decorator to require JWT authentication for routes
     
@@ -118,6 +260,8 @@ def jwt_required(roles=None):
                 
                 return f(*args, **kwargs)
                 
+            except PoolTimeoutError:
+                raise
             except Exception as e:
                 print(f"JWT validation error: {e}")
                 return jsonify({'error': 'Authentication failed'}), 401
@@ -135,4 +279,81 @@ def client_or_admin_required(f):
 
 def get_current_user():
     """Get current authenticated user from request context"""
-    return getattr(request, 'current_user', None)
\ No newline at end of file
+    return getattr(request, 'current_user', None)
+
+def is_not_modified(etag=None, last_modified=None):
+    """Check the request's If-None-Match / If-Modified-Since against the resource's validators"""
+    return not is_resource_modified(request.environ, etag=etag, last_modified=last_modified)
+
+def cached_json_response(entry, value=None):
+    """Serve a CachedResource entry as JSON with ETag and Last-Modified validators
+
+    Answers 304 Not Modified when the request's If-None-Match / If-Modified-Since still
+    match. `value` overrides the body (defaults to entry.value).
+    """
+    if is_not_modified(etag=entry.etag, last_modified=entry.loaded_at):
+        response = Response(status=304)
+    else:
+        response = jsonify(entry.value if value is None else value)
+    response.set_etag(entry.etag)
+    response.last_modified = entry.loaded_at
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def fingerprint_etag(fingerprint, *scope):
+    """Weak ETag value for a change fingerprint of the current request's resource
+
+    The request path and query string, and any extra `scope` values (e.g. a user id the
+    view forces), are hashed in with the fingerprint. Returns None if `fingerprint` is None.
+    """
+    if fingerprint is None:
+        return None
+    raw = json.dumps([request.path, request.query_string.decode('latin-1'), fingerprint, *scope], default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def conditional_response(etag):
+    """Return a 304 response if the client's If-None-Match matches the weak `etag`, else None"""
+    if etag is None or not is_not_modified(etag=etag):
+        return None
+    return with_weak_etag(Response(status=304), etag)
+
+def with_weak_etag(response, etag):
+    """Attach a weak ETag (if any) to a response that clients must revalidate"""
+    if etag is not None and response.status_code in (200, 304):
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def content_disposition_header(disposition, file_name):
+    """Build a Content-Disposition value, using RFC 5987 encoding for non-ASCII names"""
+    if not file_name:
+        return disposition
+    try:
+        file_name.encode('ascii')
+        escaped = file_name.replace('\\', '\\\\').replace('"', '\\"')
+        return f'{disposition}; filename="{escaped}"'
+    except UnicodeEncodeError:
+        return f"{disposition}; filename*=UTF-8''{quote(file_name, safe='')}"
+
+def resolve_byte_range(total_length, etag=None, last_modified=None):
+    """Resolve the request's Range header against a resource of `total_length` bytes
+
+    Returns:
+        tuple: (start, stop) for a satisfiable single byte range, None to send the whole
+        resource (no Range header, a stale If-Range, or a multi-range request), or False
+        when the range can't be satisfied and a 416 should be returned.
+    """
+    byte_range = request.range
+    if byte_range is None:
+        return None
+
+    if_range = request.if_range
+    if if_range.etag is not None and if_range.etag != etag:
+        return None
+    if if_range.date is not None and (last_modified is None or last_modified.replace(microsecond=0) > if_range.date.replace(tzinfo=None)):
+        return None
+
+    if byte_range.units != 'bytes' or len(byte_range.ranges) != 1:
+        return None
+    resolved = byte_range.range_for_length(total_length)
+    return resolved if resolved is not None else False
\ No newline at end of file
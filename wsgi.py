@@ -0,0 +1,4 @@
+"""WSGI entry point for production servers, e.g. `gunicorn -c gunicorn.conf.py` (see gunicorn.conf.py)"""
+from app import app
+
+application = app